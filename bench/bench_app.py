@@ -0,0 +1,156 @@
+# bench_app
+"""アプリ全体のベンチマーク（Streamlit AppTest で todo_app_gsheet_1.4.py を動かす）
+
+    python bench/bench_app.py [1 呼び出しあたりの遅延(秒)] [エラー率]
+
+TODO_BACKEND=fake で疑似シートにつなぎ、操作ごとに
+リランの所要時間・API 呼び出し回数・送受信バイト数を件数別に出す。
+書き込み待ち行列に溜まった分は、その操作の分として最後に送る（flush）。
+errors は画面に出たエラー・例外と flush で起きた（注入した）API エラーの回数。
+flush はアプリと同じく todo_quota.QUOTA を通し（429 などは中で再試行）、それでも失敗したら送れるまで送り直す。
+"""
+
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+os.environ["TODO_BACKEND"] = "fake"
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from bench_memory import _values  # noqa: E402
+from todo_cache import TASK_CACHE  # noqa: E402
+from todo_fake import APIError, get_fake_backend  # noqa: E402
+from todo_feed import FEED  # noqa: E402
+from todo_quota import QUOTA  # noqa: E402
+
+APP = ROOT / "todo_app_gsheet_1.4.py"
+SIZES = [100, 1000, 5000]
+TIMEOUT = 600
+
+
+def _setting(name: str) -> str:
+    m = re.search(rf'^{name} = "(.*?)"', APP.read_text(encoding="utf-8"), re.M)
+    return m.group(1)
+
+
+KEY, TITLE = _setting("SPREADSHEET_KEY"), _setting("SHEET_NAME")
+
+
+def _first_task_id(at) -> str:
+    return next(c.key[3:] for c in at.checkbox if c.key and c.key.startswith("chk"))
+
+
+def _button(at, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+# 操作名 -> AppTest を 1 操作ぶん動かす関数
+def _first_load(at):
+    at.run()
+
+
+def _rerun(at):
+    at.run()
+
+
+def _toggle_done(at):
+    at.checkbox(key=f"chk{_first_task_id(at)}").check().run()
+
+
+def _edit(at):
+    tid = _first_task_id(at)
+    at.button(key=f"edit{tid}").click().run()
+    at.text_input(key=f"edit_task_{tid}").input("編集したタスク")
+    at.button(key=f"save{tid}").click().run()
+
+
+def _add(at):
+    at.text_input(key="new_task").input("追加したタスク")
+    _button(at, "➕ 追加").click().run()
+
+
+def _move_down(at):
+    at.button(key=f"down{_first_task_id(at)}").click().run()
+
+
+def _delete(at):
+    at.button(key=f"del{_first_task_id(at)}").click().run()
+
+
+def _next_page(at):
+    at.number_input(key="page").increment().run()
+
+
+def _sort_due(at):
+    _button(at, "📅 締切日で並べ替え").click().run()
+
+
+ACTIONS = [
+    ("first_load", _first_load),
+    ("rerun", _rerun),
+    ("toggle_done", _toggle_done),
+    ("edit", _edit),
+    ("add", _add),
+    ("move_down", _move_down),
+    ("delete", _delete),
+    ("next_page", _next_page),
+    ("sort_due", _sort_due),
+]
+
+
+def run(latency: float = 0.0, error_rate: float = 0.0) -> None:
+    backend = get_fake_backend()
+    backend.faults.latency = latency
+    backend.faults.error_rate = error_rate
+    print(f"latency={latency}s error_rate={error_rate}")
+    print(f"{'tasks':>6} {'action':<12}{'ms':>9}{'calls':>7}{'errors':>7}{'sent KB':>9}{'recv KB':>9}  by method")
+    for n in SIZES:
+        backend.reset()
+        ws = backend.seed(KEY, TITLE, _values(n))
+        TASK_CACHE.invalidate(ws)
+        FEED.forget(ws)
+        ws = QUOTA.wrap(ws)
+        at = AppTest.from_file(str(APP), default_timeout=TIMEOUT)
+        for name, action in ACTIONS:
+            # 前の画面がエラー（注入した読み込み失敗）なら、表示し直してから測る
+            for _ in range(5):
+                if not (at.error or at.exception):
+                    break
+                at.run()
+            backend.api.reset()
+            t0 = time.perf_counter()
+            try:
+                action(at)
+                note = ""
+            except (KeyError, StopIteration):
+                note = "（画面がエラー表示のままで、操作する widget がなかった）"
+            queue = at.session_state["write_queue"] if "write_queue" in at.session_state else None
+            errors = len(at.error)  # 読み込み失敗などで画面に出たエラー
+            while queue is not None and len(queue):
+                try:
+                    queue.flush(ws)
+                except APIError:
+                    errors += 1  # 行列に戻っているので送り直す
+            elapsed = time.perf_counter() - t0
+            if at.exception:
+                errors += len(at.exception)
+                note += f"（例外: {at.exception[0].message}）"
+            s = backend.api
+            methods = ", ".join(f"{k}={v}" for k, v in sorted(s.calls.items()))
+            print(
+                f"{n:>6} {name:<12}{elapsed * 1000:>9.0f}{s.total_calls:>7}{errors:>7}"
+                f"{s.bytes_sent / 1024:>9.1f}{s.bytes_received / 1024:>9.1f}  {methods}{note}"
+            )
+
+
+if __name__ == "__main__":
+    run(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 0.0,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.0,
+    )
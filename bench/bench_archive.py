@@ -0,0 +1,87 @@
+# bench_archive
+"""完了タスクの履歴が本体の読み込みに与える影響（アーカイブの前後で比較）
+
+    python bench/bench_archive.py [進行中の件数] [履歴の件数]
+
+進行中のタスクと、完了から日数のたった履歴を同じシートに置き、
+- before : 履歴を本体に残したまま読み込む（起動直後と同じ。get_all_values + store_from_values）
+- after  : archive_completed を残りがなくなるまで繰り返してから読み込む
+の読み込み時間（中央値）と受け取ったバイト数を出す。整理にかかった API 呼び出し回数と時間も出す。
+"""
+
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_save import make_tasks  # noqa: E402
+from todo_archive import archive_completed  # noqa: E402
+from todo_cache import TASK_CACHE  # noqa: E402
+from todo_fake import FakeWorksheet  # noqa: E402
+from todo_feed import FEED  # noqa: E402
+from todo_rank import initial_ranks  # noqa: E402
+from todo_sheet import HEADERS, new_task_id, store_from_values, task_to_row  # noqa: E402
+
+TODAY = date(2026, 10, 1)
+REPEAT = 5
+
+
+def _sheet(active: int, history: int):
+    rows = [list(HEADERS)]
+    for k, (t, rank) in enumerate(zip(make_tasks(active + history), initial_ranks(active + history))):
+        t["id"] = new_task_id()
+        t["order"] = rank
+        if k >= active:
+            # 履歴: 1〜24 か月前に完了
+            t["done"] = True
+            t["done_at"] = date.fromordinal(TODAY.toordinal() - 31 - k % 700).isoformat()
+        else:
+            t["done"] = False
+        rows.append(task_to_row(t))
+    ws = FakeWorksheet(rows=rows)
+    TASK_CACHE.invalidate(ws)
+    FEED.forget(ws)
+    return ws
+
+
+def _load(ws):
+    times, received = [], 0
+    for _ in range(REPEAT):
+        before = ws.stats.bytes_received
+        t = time.perf_counter()
+        store = store_from_values(ws.get_all_values())
+        store.search_index
+        times.append((time.perf_counter() - t) * 1000)
+        received = ws.stats.bytes_received - before
+    return len(store), statistics.median(times), received
+
+
+def run(active: int, history: int) -> None:
+    print(f"active={active}, history={history}")
+    ws = _sheet(active, history)
+    print(f"{'state':<8}{'rows':>8}{'load ms':>10}{'recv B':>12}")
+    n, ms, recv = _load(ws)
+    print(f"{'before':<8}{n:>8}{ms:>10.1f}{recv:>12}")
+
+    calls = ws.stats.total_calls
+    t = time.perf_counter()
+    sweeps = moved = 0
+    while True:
+        result = archive_completed(ws, today=TODAY)
+        sweeps += 1
+        moved += result.moved
+        if not result.remaining:
+            break
+    sweep_ms = (time.perf_counter() - t) * 1000
+    n, ms, recv = _load(ws)
+    print(f"{'after':<8}{n:>8}{ms:>10.1f}{recv:>12}")
+    partitions = len(ws.spreadsheet.worksheets()) - 2  # 本体と変更ログ以外
+    print(f"\narchive: {moved} rows in {sweeps} sweeps, {partitions} partitions, "
+          f"{ws.stats.total_calls - calls} calls, {sweep_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500, int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
@@ -0,0 +1,77 @@
+# bench_backup
+"""バックアップ作成の時間・ピークメモリ・ファイルサイズを比較する
+
+    python bench/bench_backup.py
+
+- legacy   : v1.4 までの backup_to_xlsx（DataFrame -> openpyxl -> BytesIO -> getvalue）
+- xlsx     : todo_backup（xlsxwriter constant_memory で直接書き出し）
+- csv      : todo_backup（BOM 付き UTF-8）
+- jsonl.gz : todo_backup（gzip 圧縮 JSONL）
+どれも一時ファイルへ書き出すところまでを測る。
+"""
+
+import io
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd  # noqa: E402
+
+from bench_memory import _values  # noqa: E402
+from todo_backup import FORMATS  # noqa: E402
+from todo_sheet import store_from_values  # noqa: E402
+
+SIZES = [1000, 10000, 50000]
+
+
+def legacy_backup(store, fp) -> None:
+    """v1.4 までの方式（1 件ごとの dict -> DataFrame -> openpyxl -> BytesIO）"""
+    df = pd.DataFrame(
+        [
+            {
+                "タスク": store.texts[i],
+                "締切日": store.due_str(i),
+                "完了": store.is_done(i),
+                "属性": store.tag_name(i),
+                "ID": store.ids[i],
+            }
+            for i in range(len(store))
+        ]
+    )
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="backup")
+    fp.write(buf.getvalue())
+
+
+def measure(store, write):
+    # 時間は tracemalloc なしで、ピークメモリは別にもう 1 回書いて測る
+    with tempfile.TemporaryFile() as f:
+        t0 = time.perf_counter()
+        write(store, f)
+        elapsed = time.perf_counter() - t0
+        size = f.tell()
+    with tempfile.TemporaryFile() as f:
+        tracemalloc.start()
+        write(store, f)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def run() -> None:
+    engines = [("legacy", legacy_backup)] + [(name, fmt.write) for name, fmt in FORMATS.items()]
+    print(f"{'tasks':>7} {'engine':<9}{'time(s)':>9}{'peak MB':>9}{'size KB':>10}")
+    for n in SIZES:
+        store = store_from_values(_values(n))
+        for name, write in engines:
+            elapsed, peak, size = measure(store, write)
+            print(f"{n:>7} {name:<9}{elapsed:>9.2f}{peak / 2**20:>9.1f}{size / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,85 @@
+# bench_bulk
+"""一括操作（完了・属性の変更・締切日をずらす・削除）の API 呼び出し回数と送信量
+
+    python bench/bench_bulk.py [件数]
+
+- click : 1 件ずつ操作して、そのたびに送る（1 件 1 回の apply_mutations）
+- bulk  : 複数選択の一括操作（WriteBehindQueue.update_many / delete_many を 1 回の flush で送る）
+選んだ件数を変えて比べ、どちらも同じシートの内容になることを確かめる。
+変更ログへの追記と、初回の変更ログ用シートの作成（3 回）は両方に含まれる。
+"""
+
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_move import _sheet  # noqa: E402
+from todo_cache import TASK_CACHE  # noqa: E402
+from todo_fake import FakeWorksheet  # noqa: E402
+from todo_feed import FEED  # noqa: E402
+from todo_queue import WriteBehindQueue  # noqa: E402
+from todo_sheet import apply_mutations, store_from_values  # noqa: E402
+
+SELECTIONS = [10, 50, 500]
+ACTIONS = ["done", "tag", "shift", "delete"]
+
+
+def _plan(store, ids, action):
+    """(updates, deletes)"""
+    if action == "delete":
+        return {}, list(ids)
+    if action == "done":
+        return {tid: {"done": True} for tid in ids}, []
+    if action == "tag":
+        return {tid: {"tag": "その他"} for tid in ids}, []
+    updates = {}
+    for tid in ids:
+        d = store.due[store.index_of(tid)]
+        if d > 0:
+            updates[tid] = {"due": date.fromordinal(d + 3).isoformat()}
+    return updates, []
+
+
+def _click(ws, updates, deletes):
+    for tid, fields in updates.items():
+        apply_mutations(ws, updates={tid: fields})
+    for tid in deletes:
+        apply_mutations(ws, deletes=[tid])
+
+
+def _bulk(ws, updates, deletes):
+    queue = WriteBehindQueue()
+    queue.update_many(updates)
+    queue.delete_many(deletes)
+    queue.flush(ws)
+
+
+def run(n: int) -> None:
+    print(f"tasks={n}")
+    print(f"{'action':<7}{'selected':>9} {'engine':<6}{'calls':>7}{'sent B':>10}{'ms':>9}")
+    rows = _sheet(n).get_all_values()
+    store = store_from_values(rows)
+    for action in ACTIONS:
+        for k in SELECTIONS:
+            results = {}
+            updates, deletes = _plan(store, random.Random(k).sample(store.ids, k), action)
+            for name, engine in (("click", _click), ("bulk", _bulk)):
+                ws = FakeWorksheet(rows=[list(r) for r in rows])
+                # 同じ名前の前のシートの状態を持ち越さない
+                TASK_CACHE.invalidate(ws)
+                FEED.forget(ws)
+                t = time.perf_counter()
+                engine(ws, updates, deletes)
+                ms = (time.perf_counter() - t) * 1000
+                s = ws.stats
+                print(f"{action:<7}{k:>9} {name:<6}{s.total_calls:>7}{s.bytes_sent:>10}{ms:>9.1f}")
+                results[name] = sorted(ws.get_all_values()[1:])
+            assert results["click"] == results["bulk"], (action, k)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,145 @@
+# bench_fragment
+"""行の操作 1 回あたりのサーバー CPU 時間と送信バイト数（行ごとの fragment の有無で比較）
+
+    python bench/bench_fragment.py [件数] [操作回数]
+
+AppTest は fragment だけの再実行をしない（常に全体を再実行する）ので、実際に
+Streamlit のサーバーを立て（TODO_BACKEND=fake）、ブラウザの代わりに WebSocket で
+「完了」チェックを切り替える BackMsg を送る。
+- full     : todo_ui.ROW_FRAGMENTS = False（どの操作でも全体を再実行する従来の動き）
+- fragment : 行ごとの fragment（その行だけを再実行）
+CPU はサーバープロセスの user + system 時間（/proc、Linux のみ）、バイト数は
+script_finished までに受け取った ForwardMsg の合計（ブラウザ側のメッセージキャッシュは使わない）。
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import websockets  # type: ignore
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+ROOT = Path(__file__).resolve().parent.parent
+TIMEOUT = 120
+
+_SERVER = """
+import os, sys
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {bench!r})
+os.environ["TODO_BACKEND"] = "fake"
+from bench_app import APP, KEY, TITLE
+from bench_memory import _values
+from todo_fake import get_fake_backend
+import todo_ui
+todo_ui.ROW_FRAGMENTS = {fragments}
+get_fake_backend().worksheet(KEY, TITLE, 6).update(range_name="A1", values=_values({n}))
+from streamlit.web import bootstrap
+opts = {{"server_port": {port}, "server_headless": True, "browser_gatherUsageStats": False}}
+bootstrap.load_config_options(flag_options=opts)
+bootstrap.run(str(APP), False, [], opts)
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _cpu_sec(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Client:
+    """ブラウザの代わり（送った widget の値を覚えておき、毎回まとめて送る）"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.states = {}
+        self.checkboxes = {}  # key -> (widget ID, fragment ID)
+
+    async def run(self, fragment_id: str = ""):
+        msg = BackMsg()
+        rerun = msg.rerun_script
+        rerun.query_string = ""
+        rerun.page_script_hash = ""
+        rerun.fragment_id = fragment_id
+        for wid, value in self.states.items():
+            rerun.widget_states.widgets.add(id=wid, bool_value=value)
+        await self.conn.send(msg.SerializeToString())
+        size = 0
+        while True:
+            raw = await asyncio.wait_for(self.conn.recv(), TIMEOUT)
+            size += len(raw)
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                el = fwd.delta.new_element
+                if el.WhichOneof("type") == "checkbox":
+                    key = el.checkbox.id.rsplit("-", 1)[-1]
+                    self.checkboxes[key] = (el.checkbox.id, fwd.delta.fragment_id)
+            if kind == "script_finished":
+                return size
+
+
+async def _measure(port: int, pid: int, moves: int):
+    url = f"ws://localhost:{port}/_stcore/stream"
+    for _ in range(200):
+        try:
+            conn = await websockets.connect(url, subprotocols=["streamlit"], max_size=None)
+            break
+        except OSError:
+            await asyncio.sleep(0.1)
+    else:
+        raise RuntimeError("server did not start")
+    async with conn:
+        client = Client(conn)
+        await client.run()
+        rows = sorted(k for k in client.checkboxes if k.startswith("chk"))
+        cpu, sent, wall = [], [], []
+        for k in range(moves):
+            wid, fragment_id = client.checkboxes[rows[k % len(rows)]]
+            client.states[wid] = not client.states.get(wid, False)
+            c0, t0 = _cpu_sec(pid), time.perf_counter()
+            size = await client.run(fragment_id)
+            # 実行後の後片付け（セッション状態の整理など）も含める
+            await asyncio.sleep(0.05)
+            wall.append((time.perf_counter() - t0) * 1000)
+            cpu.append((_cpu_sec(pid) - c0) * 1000)
+            sent.append(size)
+        return statistics.median(cpu), statistics.median(sent), statistics.median(wall)
+
+
+def measure(n: int, moves: int, fragments: bool):
+    port = _free_port()
+    code = _SERVER.format(root=str(ROOT), bench=str(ROOT / "bench"), fragments=fragments, n=n, port=port)
+    env = dict(os.environ)
+    env.pop("TODO_LOCAL_DB", None)
+    srv = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, env=env,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return asyncio.run(_measure(port, srv.pid, moves))
+    finally:
+        srv.kill()
+        srv.wait()
+
+
+def run(n: int, moves: int) -> None:
+    print(f"tasks={n}, 「完了」の切り替え {moves} 回の中央値（wall は待ち 50 ms を含む）")
+    print(f"{'mode':<10}{'cpu ms':>9}{'sent B':>10}{'wall ms':>10}")
+    for name, fragments in (("full", False), ("fragment", True)):
+        cpu, sent, wall = measure(n, moves, fragments)
+        print(f"{name:<10}{cpu:>9.1f}{sent:>10.0f}{wall:>10.1f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,97 @@
+# bench_import
+"""一括取り込みの時間と API 呼び出し回数（1 件ずつの追加との比較）
+
+    python bench/bench_import.py [取り込む件数] [今の件数]
+
+- single : 「➕ 追加」と同じく 1 件ずつ送る（build_task -> 1 件 1 回の apply_mutations）。SINGLE_SAMPLE 件だけ
+           実際に送り、残りは 1 件あたりの回数から見積もる
+- import : CSV を plan_import で検証・重複除外し、ImportJob で分けて追記する
+書き込みは 1 分あたり WRITE_PER_MINUTE 回までなので、書き込み回数からクォータ上の
+最短時間も出す（フェイクのシートは待たないため、実際の所要時間はこちらに近い）。
+取り込むファイルの 1 割は今の一覧と同じタスク（重複として飛ばされる）。
+"""
+
+import csv
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_memory import _values  # noqa: E402
+from bench_save import make_tasks  # noqa: E402
+from todo_cache import TASK_CACHE  # noqa: E402
+from todo_fake import FakeWorksheet  # noqa: E402
+from todo_feed import FEED  # noqa: E402
+from todo_import import ImportJob, read_import  # noqa: E402
+from todo_quota import WRITE_METHODS, WRITE_PER_MINUTE  # noqa: E402
+from todo_sheet import apply_mutations, build_task, store_from_values  # noqa: E402
+
+SINGLE_SAMPLE = 200
+
+
+def _csv(n: int, existing) -> bytes:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(["タスク", "締切日", "完了", "属性"])
+    dup = n // 10
+    for k in range(dup):
+        w.writerow(existing[1 + k][:4])
+    for t in make_tasks(n - dup, seed=1):
+        w.writerow([f"取り込み{t['task']}", t["due"], t["done"], t["tag"]])
+    return buf.getvalue().encode("utf-8")
+
+
+def _sheet(values):
+    ws = FakeWorksheet(rows=[list(r) for r in values])
+    # 同じ名前の前のシートの状態を持ち越さない
+    TASK_CACHE.invalidate(ws)
+    FEED.forget(ws)
+    return ws
+
+
+def _writes(ws) -> int:
+    return sum(c for m, c in ws.stats.calls.items() if m.split(".")[-1] in WRITE_METHODS)
+
+
+def _report(name, added, calls, writes, ms):
+    quota_min = writes / WRITE_PER_MINUTE
+    print(f"{name:<8}{added:>8}{calls:>8}{writes:>8}{ms:>10.0f}{quota_min:>12.1f}")
+
+
+def run(n: int, existing: int) -> None:
+    values = _values(existing)
+    data = _csv(n, values)
+    print(f"import={n} rows ({len(data)} B), existing={existing}")
+    print(f"{'engine':<8}{'added':>8}{'calls':>8}{'writes':>8}{'ms':>10}{'quota min':>12}")
+
+    # 1 件ずつ（先頭の SINGLE_SAMPLE 件だけ送って見積もる）
+    ws = _sheet(values)
+    store = store_from_values(values)
+    plan = read_import(store, "bench.csv", io.BytesIO(data))
+    t = time.perf_counter()
+    for row in plan.rows[:SINGLE_SAMPLE]:
+        task = build_task(store, {"task": row[0], "due": row[1], "done": row[2] == "True", "tag": row[3]})
+        apply_mutations(ws, [task])
+        store.append(task)
+    scale = len(plan.rows) / SINGLE_SAMPLE
+    ms = (time.perf_counter() - t) * 1000 * scale
+    _report("single", len(plan.rows), round(ws.stats.total_calls * scale), round(_writes(ws) * scale), ms)
+
+    # 一括取り込み
+    ws = _sheet(values)
+    store = store_from_values(values)
+    t = time.perf_counter()
+    plan = read_import(store, "bench.csv", io.BytesIO(data))
+    parse_ms = (time.perf_counter() - t) * 1000
+    job = ImportJob(plan.rows)
+    job.run(ws)
+    ms = (time.perf_counter() - t) * 1000
+    _report("import", len(plan.rows), ws.stats.total_calls, _writes(ws), ms)
+    print(f"\nparse+dedupe {parse_ms:.0f} ms, {plan.duplicates} duplicates, {job.total_steps} batches")
+    assert len(ws.get_all_values()) == existing + 1 + len(plan.rows)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000, int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
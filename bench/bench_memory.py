@@ -0,0 +1,87 @@
+# bench_memory
+"""読み込んだ一覧が 1 件あたり何バイト使うかを比較する
+
+    python bench/bench_memory.py
+
+- dicts : v1.4 までの方式（get_all_records の行ごとに dict を作る）
+- store : 列指向の TaskStore（todo_sheet.store_from_values）
+シートから取った値（get_all_values の結果）は読み込み後に捨てたものとして、
+一覧として残る分だけを tracemalloc で測る。読み込み時間は tracemalloc を止めてから別に測る
+（tracemalloc を動かしたままだと確保の多い dicts ほど遅く出る）。REPEAT 回の中央値。
+"""
+
+import gc
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_save import make_tasks  # noqa: E402
+from todo_rank import initial_ranks  # noqa: E402
+from todo_sheet import HEADERS, new_task_id, store_from_values, task_to_row  # noqa: E402
+
+SIZES = [1000, 10000, 50000]
+REPEAT = 5
+
+
+def _values(n: int):
+    rows = [list(HEADERS)]
+    for t, rank in zip(make_tasks(n), initial_ranks(n)):
+        t["id"] = new_task_id()
+        t["order"] = rank
+        rows.append(task_to_row(t))
+    return rows
+
+
+def legacy_load(values):
+    """v1.4 までの load_data（get_all_records -> 1 件ごとの dict）"""
+    header = values[0]
+    records = [dict(zip(header, row)) for row in values[1:]]
+    return [
+        {
+            "task": r.get("タスク", ""),
+            "due": r.get("締切日", ""),
+            "done": str(r.get("完了", "")).lower() == "true",
+            "tag": r.get("属性", "未設定"),
+            "id": r.get("ID", ""),
+            "order": r.get("順序", ""),
+        }
+        for r in records
+    ]
+
+
+def measure(n: int, build):
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    values = _values(n)
+    loaded = build(values)
+    del values
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del loaded
+
+    values = _values(n)
+    times = []
+    for _ in range(REPEAT):
+        gc.collect()
+        t0 = time.perf_counter()
+        build(values)
+        times.append(time.perf_counter() - t0)
+    return used / n, statistics.median(times)
+
+
+def run() -> None:
+    print(f"{'tasks':>7} {'engine':<7}{'B/task':>9}{'load(ms)':>10}")
+    for n in SIZES:
+        for name, build in (("dicts", legacy_load), ("store", store_from_values)):
+            per_task, elapsed = measure(n, build)
+            print(f"{n:>7} {name:<7}{per_task:>9.0f}{elapsed * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    run()
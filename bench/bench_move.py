@@ -0,0 +1,114 @@
+# bench_move
+"""「上へ / 下へ」1 回あたりの書き込み量をリストの長さごとに比較する
+
+    python bench/bench_move.py [移動回数]
+
+- rewrite : v1.4 までの方式（入れ替えて全行を書き直す）
+- diff    : 差分保存エンジンで全体を保存（bench_save.save_data）
+- rank    : 順序キー 1 セルの書き換え（アプリの _move と同じく plan_move -> apply_mutations、
+            必要時のみ振り直し）
+"""
+
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_save import legacy_save, make_tasks, save_data  # noqa: E402
+from todo_fake import FakeWorksheet  # noqa: E402
+from todo_rank import initial_ranks  # noqa: E402
+from todo_sheet import (  # noqa: E402
+    HEADERS, apply_mutations, load_data, new_task_id, plan_move, rebalance_orders, task_to_row,
+)
+
+SIZES = [100, 500, 1000, 5000]
+
+
+def _sheet(n: int):
+    data = make_tasks(n)
+    for t, rank in zip(data, initial_ranks(n)):
+        t["id"] = new_task_id()
+        t["order"] = rank
+    return FakeWorksheet(rows=[HEADERS] + [task_to_row(t) for t in data])
+
+
+def _swap_and(save):
+    def start(store):
+        data = [store.to_dict(i) for i in range(len(store))]
+
+        def move(ws, src, dest):
+            data.insert(dest, data.pop(src))
+            save(ws, data)
+            return False
+        return move, lambda: [t["id"] for t in data]
+    return start
+
+
+def move_to(ws, store, view, src: int, dest: int) -> bool:
+    """並び view の src 番目のタスクを dest へ移動する（順序キー 1 セル）
+
+    キーが長くなりすぎたときだけ順序列全体を振り直し、True を返す。
+    """
+    if src == dest or not (0 <= dest < len(view)):
+        return False
+    rank = plan_move(store, view, src, dest)
+    rebalanced = rank is None
+    if rebalanced:
+        view.insert(src, view.pop(dest))
+        rebalance_orders(ws, store)
+        rank = plan_move(store, view, src, dest)
+    apply_mutations(ws, updates={store.ids[view[dest]]: {"order": rank}})
+    return rebalanced
+
+
+def _rank(store):
+    view = list(range(len(store)))
+
+    def move(ws, src, dest):
+        return move_to(ws, store, view, src, dest)
+    return move, lambda: [store.ids[i] for i in view]
+
+
+ENGINES = [
+    ("rewrite", _swap_and(legacy_save)),
+    ("diff", _swap_and(save_data)),
+    ("rank", _rank),
+]
+
+
+def run(moves: int) -> None:
+    print(f"moves={moves}（ランダムな 1 行の上下移動 + 先頭付近への集中移動）")
+    print(f"{'tasks':>6} {'engine':<8}{'calls/move':>11}{'cells/move':>11}{'sent B/move':>12}{'rebalances':>11}")
+    for n in SIZES:
+        for name, start in ENGINES:
+            if name == "rewrite" and n > 500:
+                continue  # 1 行ずつ append_row するので遅すぎる
+            ws = _sheet(n)
+            move, order = start(load_data(ws, ttl=0))
+            ws.stats.reset()
+            rnd = random.Random(n)
+            rebalances = 0
+            for k in range(moves):
+                # 半分はランダムな上下移動、半分は同じ位置（2 行目）への挿入を繰り返す最悪ケース
+                if k % 2:
+                    i = rnd.randrange(1, n)
+                    src, dest = i, i - 1
+                else:
+                    src, dest = rnd.randrange(2, n), 1
+                rebalances += move(ws, src, dest)
+            s = ws.stats
+            print(
+                f"{n:>6} {name:<8}{s.total_calls / moves:>11.1f}{s.cells_written / moves:>11.1f}"
+                f"{s.bytes_sent / moves:>12.0f}{rebalances if name == 'rank' else '-':>11}"
+            )
+            # rank は順序キー順、ほかはシート上の行順が表示順
+            if name == "rank":
+                shown = load_data(ws, ttl=0).ids
+            else:
+                shown = [r[HEADERS.index("ID")] for r in ws.get_all_values()[1:]]
+            assert shown == order(), (n, name)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,137 @@
+# bench_read
+"""一覧の読み込み方の比較（受け取るバイト数と解析時間）
+
+    python bench/bench_read.py [回数]
+
+- records : v1.3 までの方式（get_all_records。gspread と同じく値を数値に寄せて行ごとの dict を作り、
+            列ごとに r.get("タスク", r.get("task", "")) で取り出す）
+- values  : get_all_values -> store_from_values（全列を読み、列ごとに取り出す）
+- lean    : read_values -> store_from_values（アプリの列だけを書式なしの値で読む）
+- window  : sheet_row_window（シート上で続いた 50 行だけを読む。行の位置で選ぶので、順序キー順の
+            画面のページとは一致しない。1 ページ分の読み込みの大きさの目安）
+バイト数はフェイクのシートが返した値の JSON の大きさ。解析時間は、受け取った値を
+そのまま返すシートの代わり（_Replay）を使い、取得を除いた分だけを計る（回数の中央値）。
+完了したタスクには完了日の列が入っている（アーカイブ前のシートと同じ）。
+"""
+
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gspread.utils import numericise_all  # noqa: E402
+
+from bench_save import make_tasks  # noqa: E402
+from todo_fake import FakeWorksheet  # noqa: E402
+from todo_rank import initial_ranks  # noqa: E402
+from todo_sheet import HEADERS, new_task_id, read_values, store_from_values, task_to_row  # noqa: E402
+
+SIZES = [1000, 10000, 50000]
+PAGE = 50
+
+
+def _sheet(n: int) -> FakeWorksheet:
+    rows = [list(HEADERS)]
+    for t, rank in zip(make_tasks(n), initial_ranks(n)):
+        t["id"] = new_task_id()
+        t["order"] = rank
+        t["done_at"] = date.today().isoformat() if t["done"] else ""
+        rows.append(task_to_row(t))
+    return FakeWorksheet(rows=rows)
+
+
+def sheet_row_window(ws, start: int, count: int):
+    """シート上の行の位置 start から count 行だけの TaskStore（キャッシュを通さない）"""
+    return store_from_values(read_values(ws, start, count))
+
+
+class _Replay:
+    """記録した応答をそのまま返すシート（解析だけを計るため）"""
+
+    def __init__(self, ws, answers):
+        self.title = ws.title
+        self.spreadsheet_id = ws.spreadsheet_id
+        self._answers = answers
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._answers[name]
+
+
+class _Recorder:
+    """本物（フェイク）のシートを呼び、応答を覚えておく"""
+
+    def __init__(self, ws):
+        self._ws = ws
+        self.title = ws.title
+        self.spreadsheet_id = ws.spreadsheet_id
+        self.answers = {}
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.answers[name] = getattr(self._ws, name)(*args, **kwargs)
+            return self.answers[name]
+        return call
+
+
+def records_load(values):
+    """v1.3 までの load_data（get_all_records -> 1 件ごとの dict）"""
+    header = values[0]
+    records = [dict(zip(header, numericise_all(row))) for row in values[1:]]
+    return [
+        {
+            "task": r.get("タスク", r.get("task", "")),
+            "due": r.get("締切日", r.get("due", "")),
+            "done": str(r.get("完了", r.get("done", ""))).lower() == "true",
+            "tag": r.get("属性", r.get("tag", "未設定")),
+            "id": r.get("ID", r.get("id", "")),
+            "order": r.get("順序", r.get("order", "")),
+        }
+        for r in records
+    ]
+
+
+def _received(ws, read):
+    before = ws.stats.bytes_received
+    read()
+    return ws.stats.bytes_received - before
+
+
+def _median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times)
+
+
+def run(repeat: int) -> None:
+    print(f"{'rows':>6} {'method':<8}{'recv B':>12}{'parse ms':>10}")
+    for n in SIZES:
+        ws = _sheet(n)
+        values = ws.get_all_values()
+        rec = _Recorder(ws)
+        read_values(rec)  # 列の位置を決める分（初回だけの row_values）は除く
+        lean = _Recorder(ws)
+        win = _Recorder(ws)
+        start = n // 2
+        results = [
+            ("records", _received(ws, ws.get_all_records), lambda: records_load(values)),
+            ("values", _received(ws, ws.get_all_values), lambda: store_from_values(values)),
+            ("lean", _received(ws, lambda: read_values(lean)),
+             lambda: store_from_values(read_values(_Replay(ws, lean.answers)))),
+            ("window", _received(ws, lambda: sheet_row_window(win, start, PAGE)),
+             lambda: sheet_row_window(_Replay(ws, win.answers), start, PAGE)),
+        ]
+        for name, recv, parse in results:
+            print(f"{n:>6} {name:<8}{recv:>12}{_median_ms(parse, repeat):>10.1f}")
+        full = store_from_values(values)
+        assert store_from_values(read_values(ws)).ids == full.ids
+        assert sheet_row_window(ws, start, PAGE).ids == store_from_values([values[0]] + values[start + 1:start + 1 + PAGE]).ids
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,71 @@
+# bench_render
+"""一覧の描画時間ベンチマーク（Streamlit AppTest）
+
+    python bench/bench_render.py
+
+全件を描画する従来の方式と、1 ページ分だけ描画する方式を
+100 / 1,000 / 10,000 件で比較する（シートには接続しない）。
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+SIZES = [100, 1000, 10000]
+PAGE_SIZE = 50
+
+
+def _app():
+    # AppTest 用のスクリプト本体（session_state でデータと表示件数を受け取る）
+    import streamlit as st
+    from todo_queue import WriteBehindQueue
+    from todo_ui import render_task_list
+    from todo_view import page_slice
+
+    store = st.session_state["bench_data"]
+    view = list(range(len(store)))
+    page_size = st.session_state["bench_page_size"] or len(store)
+    rows, start = page_slice(view, 1, page_size)
+    render_task_list(store, view, rows, start, WriteBehindQueue(), on_move=lambda *a: None)
+
+
+def _tasks(n: int):
+    from bench_save import make_tasks
+    from todo_rank import initial_ranks
+    from todo_store import TaskStore
+
+    store = TaskStore()
+    for i, (t, rank) in enumerate(zip(make_tasks(n), initial_ranks(n))):
+        t["id"] = f"t{i:06d}"
+        t["order"] = rank
+        store.append(t)
+    return store
+
+
+def measure(n: int, page_size):
+    at = AppTest.from_function(_app, default_timeout=600)
+    at.session_state["bench_data"] = _tasks(n)
+    at.session_state["bench_page_size"] = page_size
+    t0 = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - t0
+    widgets = len(at.button) + len(at.checkbox)
+    return elapsed, widgets
+
+
+def run() -> None:
+    print(f"{'tasks':>7} {'mode':<10}{'render(s)':>10}{'widgets':>9}")
+    for n in SIZES:
+        for mode, page_size in (("all", None), (f"page={PAGE_SIZE}", PAGE_SIZE)):
+            elapsed, widgets = measure(n, page_size)
+            print(f"{n:>7} {mode:<10}{elapsed:>10.2f}{widgets:>9}")
+
+
+if __name__ == "__main__":
+    run()
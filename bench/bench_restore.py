@@ -0,0 +1,73 @@
+# bench_restore
+"""復元の読み込み・検証時間と、書き込みの API 回数を比較する
+
+    python bench/bench_restore.py
+
+- legacy : v1.4 までの restore_from_excel（pd.read_excel + 列ごとの astype/str.replace、
+           clear してから 1 回の update）
+- stream : todo_restore（read_only で 1 行ずつ読んで検証、作業用シートに分割して書き、
+           1 回の batchUpdate で本番シートと入れ替え）
+"""
+
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd  # noqa: E402
+
+from bench_memory import _values  # noqa: E402
+from todo_backup import write_xlsx  # noqa: E402
+from todo_fake import FakeWorksheet  # noqa: E402
+from todo_restore import RestoreJob, read_backup  # noqa: E402
+from todo_sheet import store_from_values  # noqa: E402
+
+SIZES = [1000, 10000, 50000]
+
+
+def legacy_restore(ws, file_bytes: bytes) -> None:
+    df = pd.read_excel(io.BytesIO(file_bytes))
+    df = df.rename(columns={"task": "タスク", "due": "締切日", "done": "完了", "tag": "属性", "id": "ID"})
+    df["完了"] = df["完了"].astype(str).str.lower().isin(["true", "1", "t", "y", "yes", "真", "完了"])
+    df["締切日"] = df["締切日"].astype(str).str.replace("NaT", "").str.replace("nan", "", regex=False)
+    df["ID"] = df["ID"].astype(str).str.replace("nan", "", regex=False)
+    df = df[["タスク", "締切日", "完了", "属性", "ID"]]
+    ws.clear()
+    ws.update([df.columns.tolist()] + df.astype(object).values.tolist())
+
+
+def stream_restore(ws, file_bytes: bytes) -> None:
+    data = read_backup("backup.xlsx", io.BytesIO(file_bytes))
+    RestoreJob(data.rows, interval=0).run(ws)
+
+
+def run() -> None:
+    print(f"{'tasks':>7} {'engine':<8}{'time(s)':>9}{'calls':>7}{'max req KB':>11}")
+    for n in SIZES:
+        values = _values(n)
+        buf = io.BytesIO()
+        write_xlsx(store_from_values(values), buf)
+        file_bytes = buf.getvalue()
+        for name, restore in (("legacy", legacy_restore), ("stream", stream_restore)):
+            ws = FakeWorksheet(rows=values)
+            sizes = []
+            call = ws.spreadsheet._call
+
+            def measured(method, sent=None):
+                # 作業用シートへの書き込みも含め、1 回ごとの送信量を記録する
+                before = ws.stats.bytes_sent
+                call(method, sent)
+                sizes.append(ws.stats.bytes_sent - before)
+
+            ws.spreadsheet._call = measured
+            ws.stats.reset()
+            t0 = time.perf_counter()
+            restore(ws, file_bytes)
+            elapsed = time.perf_counter() - t0
+            print(f"{n:>7} {name:<8}{elapsed:>9.2f}{ws.stats.total_calls:>7}{max(sizes) / 1024:>11.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,178 @@
+# bench_save
+"""save_data のベンチマーク（疑似ワークシート上で API 回数・バイト数を比較）
+
+    python bench/bench_save.py [タスク数]
+
+- legacy : clear + 1 行ずつ append_row
+- diff   : 差分保存（save_data。シート全体と比べて変わった範囲だけを送る）
+アプリは今は変更ごとに apply_mutations で送るので、save_data（差分保存エンジン）はこの比較と
+bench_move のためにここに置いてある。
+"""
+
+import json
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Dict, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo_fake import FakeWorksheet  # noqa: E402
+from todo_sheet import HEADERS, _fit, a1_range, note_write, task_to_row, write_ranges  # noqa: E402
+
+# 範囲 1 つあたりの JSON オーバーヘッド（"range" キーやカンマ等）の概算
+_RANGE_OVERHEAD = 32
+
+
+def legacy_save(ws, data: List[Dict]):
+    """v1.4 までの保存処理（clear + 1 行ずつ append_row）"""
+    ws.clear()
+    ws.append_row(list(HEADERS))
+    for row in data:
+        ws.append_row(task_to_row(row))
+
+
+# ======= 差分保存エンジン =======
+class SavePlan:
+    """save_rows が送る書き込み内容
+
+    ranges: [(A1範囲, 値の2次元リスト), ...]
+    bulk:   True なら ranges は範囲全体 1 つだけ
+    """
+
+    __slots__ = ("ranges", "bulk")
+
+    def __init__(self, ranges: List[Tuple[str, List[List[str]]]], bulk: bool):
+        self.ranges = ranges
+        self.bulk = bulk
+
+    @property
+    def payload_bytes(self) -> int:
+        return sum(_range_cost(rng, vals) for rng, vals in self.ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self.ranges)
+
+
+def _range_cost(rng: str, values: List[List[str]]) -> int:
+    return len(rng) + len(json.dumps(values, ensure_ascii=False).encode("utf-8")) + _RANGE_OVERHEAD
+
+
+def plan_save(current: List[List], target: List[List[str]]) -> SavePlan:
+    """current（シート上の値）を target にするための最小書き込みを計算する
+
+    どちらもヘッダー行を含む。target より長い current の末尾は空文字で上書きして消す。
+    """
+    width = max((len(r) for r in target), default=len(HEADERS))
+    height = max(len(current), len(target))
+    blank = [""] * width
+
+    old = [_fit(r, width) for r in current] + [blank] * (height - len(current))
+    new = [_fit(r, width) for r in target] + [blank] * (height - len(target))
+
+    # 変更行ごとに変更列の範囲 (lo, hi) を求め、同じ列範囲の連続行を 1 ブロックにまとめる
+    blocks: List[List] = []  # [開始行index, 終了行index, lo, hi]
+    for i in range(height):
+        o, n = old[i], new[i]
+        if o == n:
+            continue
+        lo = next(c for c in range(width) if o[c] != n[c])
+        hi = next(c for c in range(width - 1, -1, -1) if o[c] != n[c])
+        last = blocks[-1] if blocks else None
+        if last and last[1] == i - 1 and last[2] == lo and last[3] == hi:
+            last[1] = i
+        else:
+            blocks.append([i, i, lo, hi])
+
+    if not blocks:
+        return SavePlan([], bulk=False)
+
+    ranges = [
+        (a1_range(s + 1, lo + 1, e + 1, hi + 1), [row[lo:hi + 1] for row in new[s:e + 1]])
+        for s, e, lo, hi in blocks
+    ]
+    full = [(a1_range(1, 1, height, width), new)]
+
+    # 細切れの範囲の合計が全体書き込みより重ければ一括モード（大きな並べ替え等）
+    diff_plan = SavePlan(ranges, bulk=False)
+    bulk_plan = SavePlan(full, bulk=True)
+    if len(ranges) > 1 and diff_plan.payload_bytes >= bulk_plan.payload_bytes:
+        return bulk_plan
+    return diff_plan
+
+
+def save_data(ws, data: List[Dict]) -> SavePlan:
+    """内部キー -> シート（日本語ヘッダー）へ差分で書き戻し（読み 1 回 + 書き 最大 1 回）"""
+    plan = plan_save(ws.get_all_values(), [list(HEADERS)] + [task_to_row(r) for r in data])
+    try:
+        write_ranges(ws, plan.ranges)
+    finally:
+        note_write(ws)
+    return plan
+
+
+def make_tasks(n: int, seed: int = 0) -> List[Dict]:
+    rnd = random.Random(seed)
+    base = date.today()
+    return [
+        {
+            "task": f"タスク{i:05d}",
+            "due": (base + timedelta(days=rnd.randint(-30, 90))).isoformat(),
+            "done": rnd.random() < 0.3,
+            "tag": rnd.choice(["仕事", "プライベート", "その他"]),
+        }
+        for i in range(n)
+    ]
+
+
+def _op_add(data):
+    data.append({"task": "新規タスク", "due": date.today().isoformat(), "done": False, "tag": "仕事"})
+
+
+def _op_edit(data):
+    data[len(data) // 2]["task"] += "（編集）"
+
+
+def _op_delete(data):
+    data.pop(len(data) // 2)
+
+
+def _op_move(data):
+    i = len(data) // 2
+    data[i - 1], data[i] = data[i], data[i - 1]
+
+
+def _op_sort(data):
+    data.sort(key=lambda r: ((r.get("due") or "") == "", r.get("due") or ""))
+
+
+OPERATIONS = [
+    ("add", _op_add),
+    ("edit", _op_edit),
+    ("delete", _op_delete),
+    ("move", _op_move),
+    ("sort_due", _op_sort),
+]
+
+
+def run(n: int) -> None:
+    print(f"tasks={n}")
+    print(f"{'op':<10}{'engine':<8}{'calls':>7}{'sent(B)':>11}{'recv(B)':>11}")
+    for name, op in OPERATIONS:
+        for engine, save in (
+            ("legacy", legacy_save),
+            ("diff", save_data),
+        ):
+            data = make_tasks(n)
+            ws = FakeWorksheet(rows=[HEADERS] + [task_to_row(r) for r in data])
+            op(data)
+            save(ws, data)
+            s = ws.stats
+            print(f"{name:<10}{engine:<8}{s.total_calls:>7}{s.bytes_sent:>11}{s.bytes_received:>11}")
+            # どのエンジンでも同じ結果になることを確認
+            assert ws.get_all_values() == [HEADERS] + [task_to_row(r) for r in data], (name, engine)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 400)
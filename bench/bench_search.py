@@ -0,0 +1,103 @@
+# bench_search
+"""検索・絞り込み・属性ごとの件数を、検索索引と全件の走査で比べる
+
+    python bench/bench_search.py [問い合わせ回数]
+
+- build   : 索引を作る時間（読み込みごとに 1 回。以後はコピーを共有して差分で更新）
+- query   : 本文の検索（todo_view.filter_tasks）。scan は全行を正規化して部分一致
+- facets  : 属性ごとの件数（todo_view.tag_facets）。scan は全行を数える
+- update  : 1 件の書き換え（索引の差分更新を含む TaskStore.set）
+結果が走査と一致することも確かめる。
+"""
+
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo_search import normalize, query_terms  # noqa: E402
+from todo_store import TaskStore  # noqa: E402
+from todo_view import DEFAULT_TAGS, filter_tasks, tag_facets  # noqa: E402
+
+SIZES = [1000, 10000, 50000]
+WORDS = [
+    "会議", "資料", "作成", "確認", "提出", "買い物", "牛乳", "電話", "請求書", "予約",
+    "歯医者", "レビュー", "デプロイ", "メール", "返信", "掃除", "洗濯", "振込", "見積", "打ち合わせ",
+    "Report", "API", "バグ", "修正", "設計", "週報", "旅行", "チケット", "更新", "整理",
+]
+
+
+def make_store(n: int, seed: int = 0) -> TaskStore:
+    rnd = random.Random(seed)
+    texts = [" ".join(rnd.sample(WORDS, rnd.randint(1, 3))) + f" #{k}" for k in range(n)]
+    dues = [f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}" if rnd.random() < 0.8 else "" for _ in range(n)]
+    dones = [rnd.random() < 0.3 for _ in range(n)]
+    tags = [rnd.choice(DEFAULT_TAGS) for _ in range(n)]
+    ids = [f"t{k:06d}" for k in range(n)]
+    orders = [f"{k:06d}" for k in range(n)]
+    return TaskStore.from_columns(texts, dues, dones, tags, ids, orders)
+
+
+def scan_query(store: TaskStore, query: str, hide_done: bool):
+    terms = query_terms(query)
+    return [
+        i for i in range(len(store))
+        if not (hide_done and store.is_done(i)) and all(t in normalize(store.texts[i]) for t in terms)
+    ]
+
+
+def scan_facets(store: TaskStore, hide_done: bool):
+    return dict(Counter(store.tag_name(i) for i in range(len(store)) if not (hide_done and store.is_done(i))))
+
+
+def _ms(fn, repeat: int):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t) / repeat * 1000, out
+
+
+def run(repeat: int) -> None:
+    rnd = random.Random(1)
+    queries = [" ".join(rnd.sample(WORDS, rnd.randint(1, 2))) for _ in range(20)] + ["api", "会", "#12"]
+    print(f"{'tasks':>6}{'build ms':>10}{'query ms':>10}{'scan ms':>9}{'facets ms':>10}{'scan ms':>9}{'update ms':>10}")
+    for n in SIZES:
+        store = make_store(n)
+        t = time.perf_counter()
+        store.search_index
+        build = (time.perf_counter() - t) * 1000
+
+        q_ms = s_ms = 0.0
+        for k, q in enumerate(queries):
+            hide = bool(k % 2)
+            ms, got = _ms(lambda: filter_tasks(store, hide_done=hide, query=q), repeat)
+            q_ms += ms
+            ms, want = _ms(lambda: scan_query(store, q, hide), 1)
+            s_ms += ms
+            assert got == want, q
+        f_ms, got = _ms(lambda: tag_facets(store, hide_done=True), repeat)
+        sf_ms, want = _ms(lambda: scan_facets(store, True), 1)
+        assert got == want
+
+        # 書き換え（本文・属性・完了）のあとも走査と一致する
+        session = store.copy()
+        t = time.perf_counter()
+        for k in range(repeat):
+            i = rnd.randrange(n)
+            session.set(i, {"task": f"{rnd.choice(WORDS)} 追記{k}", "tag": rnd.choice(DEFAULT_TAGS), "done": k % 2 == 0})
+        u_ms = (time.perf_counter() - t) / repeat * 1000
+        assert tag_facets(session) == scan_facets(session, False)
+        assert filter_tasks(session, query="追記") == scan_query(session, "追記", False)
+        assert tag_facets(store, hide_done=True) == want  # 元（共有していた索引）は変わらない
+
+        print(
+            f"{n:>6}{build:>10.1f}{q_ms / len(queries):>10.2f}{s_ms / len(queries):>9.2f}"
+            f"{f_ms:>10.3f}{sf_ms:>9.2f}{u_ms:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,101 @@
+# bench_startup
+"""起動時間のバージョン比較（v1.0〜v1.4）
+
+    python bench/bench_startup.py [件数] [回数]
+
+1) imports: 各バージョンのスクリプトが先頭で読み込むモジュール（関数の中の import は除く）を、
+   新しいプロセスで読み込む時間。Streamlit のサーバーは streamlit を読み込み済みなので、
+   streamlit を読み込んだあとの差分だけを計る（回数の中央値）。
+2) phases: v1.4 を TODO_BACKEND=fake・TODO_PROFILE=1 で AppTest から動かし、
+   todo_profile の区間（import / first_paint / auth / load / render）を出す。
+   新しいプロセスで 1 回目（コールドスタート）と 2 回目（リラン）を計る。
+v1.0〜v1.3 は Google の認証情報がないと画面まで進まないので、1) だけを比べる。
+"""
+
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+VERSIONS = [
+    ("1.0", "todo_app_gsheet_1.0.txt"),
+    ("1.1", "todo_app_gsheet_1.1.py"),
+    ("1.2", "todo_app_gsheet_1.2.py"),
+    ("1.3", "todo_app_gsheet_1.3.py"),
+    ("1.4", "todo_app_gsheet_1.4.py"),
+]
+
+_TIME_IMPORTS = """
+import sys, time
+sys.path.insert(0, {root!r})
+import streamlit
+t = time.perf_counter()
+{imports}
+print((time.perf_counter() - t) * 1000)
+"""
+
+
+def top_level_imports(path: Path) -> str:
+    """モジュール直下の import 文だけを取り出す"""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    return "\n".join(ast.unparse(n) for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom)))
+
+
+def import_ms(path: Path, repeat: int) -> float:
+    code = _TIME_IMPORTS.format(root=str(ROOT), imports=top_level_imports(path))
+    times = [
+        float(subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout)
+        for _ in range(repeat)
+    ]
+    return statistics.median(times)
+
+
+def _child(n: int) -> None:
+    """新しいプロセスの中で v1.4 を 2 回動かす（区間は TODO_PROFILE_LOG に追記される）"""
+    sys.path.insert(0, str(ROOT))
+    sys.path.insert(0, str(ROOT / "bench"))
+    from streamlit.testing.v1 import AppTest
+
+    from bench_app import APP, KEY, TITLE
+    from bench_memory import _values
+    from todo_fake import get_fake_backend
+
+    get_fake_backend().worksheet(KEY, TITLE, 6).update(range_name="A1", values=_values(n))
+    at = AppTest.from_file(str(APP), default_timeout=120)
+    at.run()
+    at.run()
+    if at.exception:
+        raise SystemExit(str(at.exception))
+
+
+def phases(n: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "profile.jsonl")
+        env = dict(os.environ, TODO_BACKEND="fake", TODO_PROFILE="1", TODO_PROFILE_LOG=log)
+        env.pop("TODO_LOCAL_DB", None)
+        subprocess.run([sys.executable, __file__, "--child", str(n)], env=env, check=True, capture_output=True)
+        with open(log, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+
+def run(n: int, repeat: int) -> None:
+    print(f"imports（streamlit 読み込み後、{repeat} 回の中央値）")
+    for version, name in VERSIONS:
+        print(f"  v{version}: {import_ms(ROOT / name, repeat):8.1f} ms")
+    print(f"\nphases（v1.4, fake, {n} 件, ms）")
+    cols = ["import", "first_paint", "auth", "load", "render", "total"]
+    print(f"  {'run':<6}" + "".join(f"{c:>12}" for c in cols))
+    for r in phases(n):
+        print(f"  {'cold' if r['cold'] else 'rerun':<6}" + "".join(f"{r.get(c, 0):>12.1f}" for c in cols))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        _child(int(sys.argv[2]))
+    else:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -1,83 +1,120 @@
 # todo_app_gsheet
 
+# 起動プロファイル（TODO_PROFILE=1 / ?profile=1）。以降の import の時間も計るので最初に読み込む
+from todo_profile import RunProfile, enabled as profiling_enabled, history as profile_history
+
+PROFILE = RunProfile("1.4")
+
 import streamlit as st
-import gspread  # type: ignore
-from google.oauth2.service_account import Credentials  # type: ignore
-from datetime import date, datetime
+from datetime import date
 import time
-import pandas as pd  # type: ignore
 import os
-import platform
-import io
-import subprocess
-from typing import List, Dict
+import uuid
+from typing import List
 from pathlib import Path
 
+from todo_archive import archive_completed, maybe_archive, restore_archived, search_archive
+from todo_backup import FORMATS as BACKUP_FORMATS, backup_name, backup_to_file, backup_to_spool
+from todo_cache import TASK_CACHE
+from todo_backend import get_backend, open_worksheet
+from todo_directory import DEFAULT_LIST, Location, can_open, get_directory, normalize_list_id, sheet_title
+from todo_feed import FEED, set_origin
+from todo_import import ImportJob, iter_text_rows, plan_import, read_import
+from todo_local import apply_local, get_local_first, rebalance_local
+from todo_queue import WriteBehindQueue
+from todo_quota import QUOTA, background
+from todo_rank import MAX_RANK_LEN
+from todo_restore import RestoreJob, diff_restore, read_backup
+from todo_sheet import apply_mutations, build_task, load_data, plan_move, rebalance_orders
+from todo_store import TaskStore
+from todo_ui import BULK_MODE_KEY, SELECTED_KEY, clear_selection, render_bulk_bar, render_due_summary, render_task_list
+from todo_view import (
+    PAGE_SIZES,
+    SORT_DUE,
+    SORT_MANUAL,
+    SORT_OPTIONS,
+    filter_tasks,
+    page_count,
+    page_slice,
+    sort_tasks,
+    tag_choices,
+    tag_facets,
+)
+
+# 重い依存（gspread / google-auth、バックアップ・復元の xlsxwriter / openpyxl、ローカル優先モードの
+# sqlite3 など）はここでは読み込まず、使う処理の中で読み込む
+PROFILE.lap("import")
+
 # === Google Sheets 設定 ===
-SHEET_NAME = "my-todo-service"
-SPREADSHEET_KEY = "1Fds4YElXO_z2djG2kaib8tQeMKd_I-TuBEIbhi38DQ4"
-
-
-def get_worksheet():
-    scope = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    creds_dict = st.secrets["gcp_service_account"]
-    creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
-    gc = gspread.authorize(creds)
-    sh = gc.open_by_key(SPREADSHEET_KEY)
+SHEET_NAME = "my-todo-service"  # 既定のリストのシート
+SPREADSHEET_KEY = "1Fds4YElXO_z2djG2kaib8tQeMKd_I-TuBEIbhi38DQ4"  # 既定のリストとディレクトリの置き場所
+# 新しいリストを振り分けるスプレッドシート（満杯になったら外し、新しいキーを足す）
+SHARD_KEYS = [SPREADSHEET_KEY]
+CACHE_TTL_SEC = 10  # この秒数以内の再読み込みはシートに問い合わせない
+WRITE_DEBOUNCE_SEC = 1.5  # 最後の操作からこの秒数たったら溜まった変更をまとめて送る
+# （同じ間隔で、同じサーバーの他の画面での変更も確認する）
+DEFAULT_PAGE_SIZE = 50  # 一覧の 1 ページの件数（初期値）
+ARCHIVE_AFTER_DAYS = 30  # 完了からこの日数たったタスクは月ごとのアーカイブ用シートへ移す
+# 設定すると SQLite（このファイル）を正とするローカル優先モード。シートへは裏で同期する
+LOCAL_DB = os.environ.get("TODO_LOCAL_DB", "")
+
+
+def _credentials():
+    return st.secrets["gcp_service_account"]
+
+
+def _open(key: str, title: str, cols: int = 4):
+    return open_worksheet(_credentials, key, title, cols)
+
+
+def auth_enabled() -> bool:
+    """ログイン（secrets の [auth]）を設定しているか"""
     try:
-        return sh.worksheet(SHEET_NAME)
-    except gspread.exceptions.WorksheetNotFound:
-        sh.add_worksheet(title=SHEET_NAME, rows="100", cols="4")
-        return sh.worksheet(SHEET_NAME)
-
-
-# ======= 読み書き（日本語列を正として統一） =======
-def load_data(ws) -> List[Dict]:
-    records = ws.get_all_records()
-    return [
-        {
-            "task": r.get("タスク", r.get("task", "")),
-            "due": r.get("締切日", r.get("due", "")),
-            "done": str(r.get("完了", r.get("done", ""))).lower() == "true",
-            "tag": r.get("属性", r.get("tag", "未設定")),
-        }
-        for r in records
-    ]
-
-
-def save_data(ws, data: List[Dict]):
-    ws.clear()
-    ws.append_row(["タスク", "締切日", "完了", "属性"])
-    for row in data:
-        ws.append_row([
-            row.get("task", ""),
-            row.get("due", ""),
-            str(bool(row.get("done", False))),
-            row.get("tag", "未設定"),
-        ])
+        return "auth" in st.secrets
+    except Exception:
+        return False  # secrets.toml がない（フェイクのバックエンドなど）
 
 
-# ======= 共通ユーティリティ =======
-def _as_dataframe(data: List[Dict]) -> pd.DataFrame:
-    if not data:
-        return pd.DataFrame(columns=["タスク", "締切日", "完了", "属性"])
-    return pd.DataFrame(
-        [
-            {
-                "タスク": r.get("task", ""),
-                "締切日": r.get("due", ""),
-                "完了": bool(r.get("done", False)),
-                "属性": r.get("tag", "未設定"),
-            }
-            for r in data
-        ]
-    )
+def current_list() -> str:
+    """表示するリスト（URL の ?list= > ログイン中のユーザー > 既定のリスト）
+
+    ログインがあるときは、他のユーザーの個人のリストは開かずに自分のリストへ戻す。
+    """
+    email = st.user.get("email") if getattr(st.user, "is_logged_in", False) else None
+    list_id = normalize_list_id(st.query_params.get("list") or email)
+    if not can_open(list_id, email, auth_enabled()):
+        st.warning("他のユーザーのリストは開けません。自分のリストを表示します")
+        list_id = normalize_list_id(email)
+        st.query_params["list"] = list_id
+        st.session_state["list_input"] = list_id
+    return list_id
+
+
+def list_directory():
+    """リスト -> シートの対応表（プロセスで 1 つ。キャッシュ付き）"""
+    return get_directory(_open, SPREADSHEET_KEY, SHARD_KEYS, Location(SPREADSHEET_KEY, SHEET_NAME))
+
+
+def get_worksheet(list_id: str):
+    """リストのワークシートをディレクトリで引き、バックエンド（既定は Google Sheets の
+    プロセス共有プール）からハンドルを取得"""
+    loc = list_directory().resolve(list_id)
+    return _open(loc.key, loc.title)
 
 
+def local_db_path(list_id: str) -> str:
+    """ローカル優先モードの DB ファイル（リストごとに別ファイル）"""
+    if list_id == DEFAULT_LIST:
+        return LOCAL_DB
+    root, ext = os.path.splitext(LOCAL_DB)
+    return f"{root}.{sheet_title(list_id)}{ext}"
+
+
+# ======= 共通ユーティリティ =======
 def _open_folder(path: str) -> None:
+    import platform
+    import subprocess
+
     try:
         system = platform.system()
         if system == "Windows":
@@ -90,93 +127,167 @@ def _open_folder(path: str) -> None:
         pass
 
 
-# === 修正版バックアップ ===
+# === バックアップ（TaskStore から直接ストリームで書き出す） ===
 IS_CLOUD = Path.home().as_posix() == "/home/appuser"  # 簡易クラウド判定
 
-def backup_to_xlsx(data: List[Dict]):
-    """ローカルなら Downloads に保存、CloudならDLボタン用バッファを返す"""
-    df = _as_dataframe(data)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    fname = f"todo_backup_{ts}.xlsx"
-
-    # メモリに一旦書く（共通処理）
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="backup")
-    buf.seek(0)
-    data_bytes = buf.getvalue()
+def create_backup(store: TaskStore, fmt: str = "xlsx"):
+    """ローカルなら Downloads に直接書き出し、Cloud ならダウンロード用のファイルを返す
 
+    戻り値は (保存先パス or None, ファイル名, ダウンロード用ファイル or None)。
+    """
     if IS_CLOUD:
-        # Cloud環境はファイル保存せずDLボタンで提供
-        return (None, fname, data_bytes)
+        # Cloud環境はファイル保存せずDLボタンで提供（大きければ一時ファイル経由）
+        f = backup_to_spool(store, fmt)
+        return (None, backup_name(fmt), f)
 
     # ローカル環境は Downloads に保存
-    downloads = Path.home() / "Downloads"
-    downloads.mkdir(parents=True, exist_ok=True)
-    fpath = downloads / fname
-    with open(fpath, "wb") as f:
-        f.write(data_bytes)
-
-    return (str(fpath), fname, None)
-
-
-def _normalize_restored_df(df: pd.DataFrame) -> pd.DataFrame:
-    col_map = {}
-    for col in df.columns:
-        c = str(col).strip()
-        if c in ["タスク", "task"]:
-            col_map[col] = "タスク"
-        elif c in ["締切日", "due"]:
-            col_map[col] = "締切日"
-        elif c in ["完了", "done"]:
-            col_map[col] = "完了"
-        elif c in ["属性", "tag"]:
-            col_map[col] = "属性"
-
-    df = df.rename(columns=col_map)
-    for c in ["タスク", "締切日", "完了", "属性"]:
-        if c not in df.columns:
-            df[c] = "" if c != "完了" else False
-
-    df["完了"] = df["完了"].astype(str).str.lower().isin(
-        ["true", "1", "t", "y", "yes", "真", "完了"]
-    )
-    df["締切日"] = (
-        df["締切日"].astype(str).str.replace("NaT", "").str.replace("nan", "", regex=False)
-    )
-    return df[["タスク", "締切日", "完了", "属性"]]
-
-
-def restore_from_excel(ws, file_bytes: bytes):
-    df = pd.read_excel(io.BytesIO(file_bytes))
-    df = _normalize_restored_df(df)
-    ws.clear()
-    ws.update([df.columns.tolist()] + df.astype(object).values.tolist())
-
-
-def _sort_key_due(r: Dict):
-    d = (r.get("due") or "").strip()
-    return (d == "", d)
+    fpath = backup_to_file(store, fmt, Path.home() / "Downloads")
+    return (str(fpath), fpath.name, None)
 
 
 # ======= GUI =======
 st.title("🖘️ マイTO-DOリスト（Google Sheets連携）— v1.4")
+PROFILE.mark("first_paint")
+LIST_ID = current_list()
+# 変更フィードでの送り主（自分の書き込みでは描き直さない）
+SESSION_ORIGIN = st.session_state.setdefault("session_origin", uuid.uuid4().hex)
+set_origin(SESSION_ORIGIN)
+
+
+def _as_session() -> None:
+    """fragment のリランと callback はスクリプト先頭の set_origin が効かないコンテキストで
+    動くことがあるので、シートに書く前に送り主を付け直す"""
+    set_origin(st.session_state["session_origin"])
+
+
+# --- 書き込み待ち行列（セッションごと、リランしても残る） ---
+# ローカル優先モードでは SQLite に書くだけなので溜めない（積んだその場で送る。write_through は
+# 読み込みのところで付ける。送れなかった分は _write_status が次の回に再送する）
+if "write_queue" not in st.session_state:
+    st.session_state["write_queue"] = (
+        WriteBehindQueue(0, apply=apply_local, origin=SESSION_ORIGIN)
+        if LOCAL_DB
+        else WriteBehindQueue(WRITE_DEBOUNCE_SEC, origin=SESSION_ORIGIN)
+    )
+queue = st.session_state["write_queue"]
+
 
+def _switch_list() -> None:
+    """リストを切り替える（今のリストの未送信分を先に送り、セッションの状態を捨てる）"""
+    if len(queue):
+        try:
+            queue.flush(target)
+        except Exception as e:
+            st.session_state["list_input"] = LIST_ID
+            st.toast(f"未送信の変更を保存できなかったため切り替えませんでした: {e}")
+            return
+    st.query_params["list"] = normalize_list_id(st.session_state["list_input"])
+    for k in (
+        "write_queue", "restore_job", "restore_data", "restore_run", "import_job", "import_data", "import_run",
+        "page", SELECTED_KEY, "archive_results",
+    ):
+        st.session_state.pop(k, None)
+
+
+if "list_input" not in st.session_state:
+    st.session_state["list_input"] = LIST_ID
+st.sidebar.text_input("📋 リスト（ユーザー名・プロジェクト名）", key="list_input", on_change=_switch_list)
+
+PROFILE.lap("render")
 try:
-    ws = get_worksheet()
-    data = load_data(ws)
+    ws = get_worksheet(LIST_ID)
+    PROFILE.lap("auth")
+    # ここから後の他の画面の変更は、_write_status が見つけて描き直す
+    st.session_state["feed_seq"] = FEED.seq(ws)
+    # target: 書き込み先（シート or ローカルの SQLite）。rebalance はその振り直し
+    if LOCAL_DB:
+        local = get_local_first(local_db_path(LIST_ID), ws)
+        target, rebalance = local, rebalance_local
+        queue.write_through = local
+        store = queue.apply(local.load())
+    else:
+        target, rebalance = ws, rebalance_orders
+        # 未送信の変更を重ねて表示（楽観的更新）
+        store = queue.apply(load_data(ws, ttl=CACHE_TTL_SEC))
+    PROFILE.lap("load")
 except Exception as e:
     st.error(f"Google Sheets の接続に失敗しました: {e}")
     st.stop()
 
+st.sidebar.caption(f"シート: {ws.title}")
+
+with st.sidebar.expander("📊 接続状況"):
+    st.json(get_backend(_credentials).stats)
+    st.json(list_directory().stats)
+    st.json(QUOTA.snapshot())
+    st.json(TASK_CACHE.stats)
+    st.json(FEED.stats)
+    st.json(queue.stats)
+    if LOCAL_DB:
+        st.json(local.stats)
+
+
+@st.fragment(run_every=WRITE_DEBOUNCE_SEC)
+def _write_status():
+    """溜まった変更を一定間隔でまとめて送り、残り件数を表示する
+
+    同じサーバーの他の画面が書き込んでいたら全体を描き直す（シートには問い合わせない）。
+    """
+    _as_session()
+    if queue.due():
+        try:
+            missing = queue.flush(target)
+            if missing:
+                st.toast(f"{len(missing)} 件のタスクは他の画面で削除済みのため反映しませんでした")
+        except Exception as e:
+            st.warning(f"保存に失敗しました（自動で再試行します）: {e}")
+    pending = len(queue)
+    st.caption(f"⏳ 保存待ち: {pending} 件" if pending else "✅ すべて保存済み")
+    if not pending:
+        # 古い完了タスクの整理（プロセスで 1 時間に 1 回。裏の処理としてクォータを使う）
+        try:
+            archived = maybe_archive(ws, days=ARCHIVE_AFTER_DAYS)
+        except Exception as e:
+            archived = None
+            st.warning(f"アーカイブへの整理に失敗しました（次の回に再試行します）: {e}")
+        if archived and archived.moved:
+            st.toast(f"完了から {ARCHIVE_AFTER_DAYS} 日たった {archived.moved} 件をアーカイブへ移しました")
+            st.rerun()
+    if FEED.changed_by_others(ws, st.session_state["feed_seq"], who=st.session_state["session_origin"]):
+        st.rerun()
+
+
+_write_status()
+
+
+def _rebalance() -> None:
+    """順序キーの振り直し（未送信の変更を先に送ってから順序列を書き直す）"""
+    _as_session()
+    queue.flush(target)
+    rebalance(target, store)
+
+
+def _move(view: List[int], src: int, dest: int) -> None:
+    """表示中の並び view（行番号）の中で src を dest へ動かす（順序キー 1 セル）"""
+    rank = plan_move(store, view, src, dest)
+    if rank is None:
+        # キーを振り直してからもう一度（振り直しても store の行番号は変わらない）
+        view.insert(src, view.pop(dest))
+        _rebalance()
+        rank = plan_move(store, view, src, dest)
+    queue.update(store.ids[view[dest]], {"order": rank})
+    st.rerun()
+
+
 # --- クイック操作 ---
 st.subheader("⚡ クイック操作")
 c1, c2, c3 = st.columns([0.4, 0.3, 0.3])
 
 # 1) バックアップ保存
 with c1:
-    if st.button("💾 バックアップ(.xlsx)作成", use_container_width=True):
-        fpath, fname, buf = backup_to_xlsx(data)
+    fmt = st.selectbox("形式", list(BACKUP_FORMATS), label_visibility="collapsed", key="backup_fmt")
+    if st.button("💾 バックアップ作成", use_container_width=True):
+        fpath, fname, f = create_backup(store, fmt)
         if fpath:
             st.success(f"保存しました：{fpath}")
             _open_folder(os.path.dirname(fpath))
@@ -184,114 +295,257 @@ with c1:
             st.success("バックアップを作成しました。下からダウンロードできます。")
             st.download_button(
                 label=f"⬇️ {fname} をダウンロード",
-                data=buf,
+                data=f,
                 file_name=fname,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                mime=BACKUP_FORMATS[fmt].mime,
                 use_container_width=True,
             )
 
 # 2) 締切日で並べ替え
 with c2:
     if st.button("📅 締切日で並べ替え", use_container_width=True):
-        data.sort(key=_sort_key_due)
-        save_data(ws, data)
+        queue.flush(target)
+        rebalance(target, store, sort_tasks(store, list(range(len(store))), SORT_DUE))
         st.success("締切日順に並べ替えました")
         st.rerun()
 
-# 3) バックアップから復元
+# 3) バックアップから復元（確認 -> 作業用シートへ書き込み -> 本番シートを上書き）
+def _start_restore() -> None:
+    data = st.session_state.pop("restore_data")
+    queue.clear()  # 全体を置き換えるので未送信の変更は捨てる
+    st.session_state["restore_job"] = RestoreJob(data.rows)
+    st.session_state["restore_run"] = True
+
+
+def _resume_restore() -> None:
+    st.session_state["restore_run"] = True
+
+
 with c3:
-    up = st.file_uploader("復元（.xlsx）", type=["xlsx"], label_visibility="collapsed", key="restore_uploader")
-    if up and st.button("⏮️ バックアップから復元", use_container_width=True, key="restore_btn"):
+    up = st.file_uploader(
+        "復元",
+        type=["xlsx", "csv", "gz", "jsonl"],
+        label_visibility="collapsed",
+        key="restore_uploader",
+    )
+    if up and st.button("🔍 復元内容を確認", use_container_width=True, key="restore_check"):
         try:
-            restore_from_excel(ws, up.read())
-            st.success("バックアップから復元しました。ページを更新します…")
-            time.sleep(0.5)
-            st.rerun()
+            st.session_state["restore_data"] = read_backup(up.name, up)
         except Exception as e:
-            st.error(f"復元に失敗しました: {e}")
+            st.error(f"ファイルを読み込めませんでした: {e}")
+
+    restore_data = st.session_state.get("restore_data")
+    if restore_data is not None:
+        diff = diff_restore(store, restore_data)
+        st.caption(
+            f"追加 {len(diff.added)} 件 / 変更 {len(diff.changed)} 件 / "
+            f"削除 {len(diff.removed)} 件 / 変更なし {diff.unchanged} 件"
+        )
+        if restore_data.issues:
+            with st.expander(f"⚠️ 注意 {len(restore_data.issues)} 件"):
+                for issue in restore_data.issues[:100]:
+                    st.caption(f"{issue.line} 行目: {issue.message}")
+        st.button("⏮️ この内容で復元", use_container_width=True, key="restore_btn", on_click=_start_restore)
+
+    job = st.session_state.get("restore_job")
+    if job is not None:
+        bar = st.progress(job.progress(), text="復元中…")
+        if st.session_state.pop("restore_run", False):
+            try:
+                job.run(ws, progress=lambda p: bar.progress(p, text="復元中…"))
+                if LOCAL_DB:
+                    local.replace_from_sheet()
+                st.session_state["restore_job"] = None
+                st.success("バックアップから復元しました。ページを更新します…")
+                time.sleep(0.5)
+                st.rerun()
+            except Exception as e:
+                st.error(f"復元が途中で止まりました（{job.describe()}）: {e}")
+        st.button("▶️ 続きから再開", use_container_width=True, key="restore_resume", on_click=_resume_restore)
+
+# 4) 一括取り込み（CSV / TSV・貼り付け。確認 -> 今の一覧の末尾へ分けて追記）
+def _start_import() -> None:
+    data = st.session_state.pop("import_data")
+    queue.flush(target)  # 未送信の追加を先に送る（取り込む行の順序キーはその後ろ）
+    st.session_state["import_job"] = ImportJob(data.rows)
+    st.session_state["import_run"] = True
+
+
+def _resume_import() -> None:
+    st.session_state["import_run"] = True
+
+
+with st.expander("📥 一括取り込み（CSV / TSV・貼り付け）"):
+    up = st.file_uploader("ファイル", type=["csv", "tsv", "txt"], key="import_uploader")
+    pasted = st.text_area(
+        "または貼り付け（1 行 1 タスク / タブ区切り / 見出し付き CSV）",
+        key="import_text",
+        height=120,
+    )
+    if (up or pasted.strip()) and st.button("🔍 取り込み内容を確認", use_container_width=True, key="import_check"):
+        try:
+            if up:
+                st.session_state["import_data"] = read_import(store, up.name, up)
+            else:
+                st.session_state["import_data"] = plan_import(store, iter_text_rows(pasted))
+        except Exception as e:
+            st.error(f"読み込めませんでした: {e}")
+
+    import_data = st.session_state.get("import_data")
+    if import_data is not None:
+        st.caption(f"追加 {len(import_data.rows)} 件 / 重複のため飛ばす {import_data.duplicates} 件")
+        if import_data.issues:
+            with st.expander(f"⚠️ 注意 {len(import_data.issues)} 件"):
+                for issue in import_data.issues[:100]:
+                    st.caption(f"{issue.line} 行目: {issue.message}")
+        st.button(
+            "📥 この内容で追加",
+            use_container_width=True,
+            key="import_btn",
+            on_click=_start_import,
+            disabled=not import_data.rows,
+        )
+
+    job = st.session_state.get("import_job")
+    if job is not None:
+        bar = st.progress(job.progress(), text=f"取り込み中…（{job.describe()}）")
+        if st.session_state.pop("import_run", False):
+            try:
+                job.run(
+                    target,
+                    apply=apply_local if LOCAL_DB else apply_mutations,
+                    progress=lambda p: bar.progress(p, text=f"取り込み中…（{job.describe()}）"),
+                )
+                st.session_state["import_job"] = None
+                st.success(f"{len(job.rows)} 件を追加しました。ページを更新します…")
+                time.sleep(0.5)
+                st.rerun()
+            except Exception as e:
+                st.error(f"取り込みが途中で止まりました（{job.describe()}）: {e}")
+        st.button("▶️ 続きから再開", use_container_width=True, key="import_resume", on_click=_resume_import)
 
 # --- 新規追加 ---
 st.write("### 新しいタスクを追加")
 new_task = st.text_input("タスク内容", key="new_task")
 due_date = st.date_input("締切日", value=date.today(), key="new_due")
-tag = st.selectbox("属性", ["仕事", "プライベート", "その他"])
+tag = st.selectbox("属性", tag_choices(store))
 
 if st.button("➕ 追加"):
     if new_task.strip():
-        data.append(
+        task = build_task(
+            store,
             {
                 "task": new_task.strip(),
                 "due": due_date.isoformat(),
                 "done": False,
                 "tag": tag,
-            }
+            },
         )
-        save_data(ws, data)
-        st.success("追加完了。ページをリロード中...")
-        time.sleep(0.4)
+        queue.insert(task)
+        store.append(task)
+        if len(task["order"]) > MAX_RANK_LEN:
+            _rebalance()
         st.rerun()
 
-# --- 編集状態 ---
-if "edit_index" not in st.session_state:
-    st.session_state["edit_index"] = -1
-edit_index = st.session_state["edit_index"]
-
+# --- タスク一覧（絞り込み -> 並び替え -> ページ分け。描画はページ内の行だけ） ---
 st.write("### タスク一覧")
-for i, item in enumerate(data):
-    col1, col2, col3, col4, col5 = st.columns([0.4, 0.15, 0.15, 0.15, 0.15])
-
-    is_overdue = (not item.get("done")) and item.get("due") and item["due"] < date.today().isoformat()
-    display_task = f"🔖 {item.get('tag','')}｜{item.get('task','')}（締切: {item.get('due','')}）"
-    style = "color:red;" if is_overdue else ""
-
-    with col1:
-        if i == edit_index:
-            edited_task = st.text_input("タスク編集", value=item.get("task", ""), key=f"edit_task_{i}")
-            try:
-                _edit_due_init = date.fromisoformat(item.get("due", "")) if item.get("due") else date.today()
-            except Exception:
-                _edit_due_init = date.today()
-            edited_due = st.date_input("締切日編集", value=_edit_due_init, key=f"edit_due_{i}")
-            edited_tag = st.selectbox(
-                "属性編集",
-                ["仕事", "プライベート", "その他"],
-                index=["仕事", "プライベート", "その他"].index(item.get("tag", "仕事")) if item.get("tag") in ["仕事", "プライベート", "その他"] else 0,
-                key=f"edit_tag_{i}",
-            )
-        else:
-            st.markdown(f"<span style='{style}'>{display_task}</span>", unsafe_allow_html=True)
-            data[i]["done"] = st.checkbox("完了", value=bool(item.get("done", False)), key=f"chk{i}")
-
-    with col2:
-        if i == edit_index:
-            if st.button("💾 保存", key=f"save{i}"):
-                data[i]["task"] = edited_task
-                data[i]["due"] = edited_due.isoformat()
-                data[i]["tag"] = edited_tag
-                st.session_state["edit_index"] = -1
-                save_data(ws, data)
-                st.rerun()
-        else:
-            if st.button("✏️ 編集", key=f"edit{i}"):
-                st.session_state["edit_index"] = i
-                st.rerun()
-
-    with col3:
-        if st.button("🗑️ 削除", key=f"del{i}"):
-            data.pop(i)
-            st.session_state["edit_index"] = -1
-            save_data(ws, data)
-            st.rerun()
-
-    with col4:
-        if st.button("⬆️ 上へ", key=f"up{i}") and i > 0:
-            data[i - 1], data[i] = data[i], data[i - 1]
-            save_data(ws, data)
-            st.rerun()
-
-    with col5:
-        if st.button("⬇️ 下へ", key=f"down{i}") and i < len(data) - 1:
-            data[i + 1], data[i] = data[i], data[i + 1]
-            save_data(ws, data)
-            st.rerun()
-
+render_due_summary(store, date.today().toordinal())
+s1, s2 = st.columns([0.6, 0.4])
+with s1:
+    query = st.text_input("検索", key="flt_query", placeholder="タスク内容（空白区切りですべてを含むもの）")
+with s2:
+    due_range = st.date_input("締切日の範囲", value=(), key="flt_due")
+# 範囲の選び途中（1 日だけ）はその日以降
+due_from, due_to = [d.toordinal() if d else None for d in (tuple(due_range) + (None, None))[:2]]
+f1, f2, f3, f4 = st.columns([0.2, 0.4, 0.2, 0.2])
+with f1:
+    hide_done = st.checkbox("未完了のみ", key="flt_hide_done")
+with f2:
+    # 件数は属性以外の条件で絞った結果から（検索索引で数える）
+    facets = tag_facets(store, hide_done=hide_done, query=query, due_from=due_from, due_to=due_to)
+    choices = tag_choices(store)
+    choices += [t for t in st.session_state.get("flt_tags", []) if t not in choices]
+    tags = st.multiselect(
+        "属性で絞り込み", choices, key="flt_tags", format_func=lambda t: f"{t}（{facets.get(t, 0)}）"
+    )
+with f3:
+    sort_by = st.selectbox("並び", SORT_OPTIONS, key="view_sort")
+with f4:
+    page_size = st.selectbox("1ページの件数", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key="page_size")
+
+view = sort_tasks(
+    store,
+    filter_tasks(store, hide_done=hide_done, tags=tags, query=query, due_from=due_from, due_to=due_to),
+    sort_by,
+)
+pages = page_count(len(view), page_size)
+if st.session_state.get("page", 1) > pages:
+    st.session_state["page"] = pages
+page = st.number_input("ページ", min_value=1, max_value=pages, step=1, key="page")
+rows, start = page_slice(view, page, page_size)
+st.caption(f"{len(view)} 件中 {start + 1 if rows else 0}–{start + len(rows)} 件を表示（{page}/{pages} ページ）")
+
+# 複数選択モード（一括操作は待ち行列にまとめて積み、1 回の送信で反映する）
+if st.toggle("☑️ 複数選択", key=BULK_MODE_KEY, on_change=clear_selection):
+    render_bulk_bar(store, queue, [store.ids[i] for i in rows])
+
+# 一覧の絞り込み・並びに効いている項目（行の中でこれを変えたら全体を再実行する）
+view_fields = {
+    field
+    for field, active in (
+        ("done", hide_done),
+        ("tag", bool(tags)),
+        ("task", bool(query.strip())),
+        ("due", sort_by == SORT_DUE or due_from is not None or due_to is not None),
+    )
+    if active
+}
+render_task_list(
+    store, view, rows, start, queue, on_move=_move if sort_by == SORT_MANUAL else None, view_fields=view_fields
+)
+
+# --- アーカイブ（完了から日数のたったタスク。検索したときだけ読む） ---
+def _search_archive() -> None:
+    st.session_state["archive_results"] = search_archive(ws, st.session_state.get("arc_query", ""))
+
+
+def _restore_archived(item) -> None:
+    _as_session()
+    queue.flush(target)  # 未送信の変更を先に送る（戻した行の順序キーは今の末尾の次）
+    restore_archived(ws, store, [item])
+    results = st.session_state.get("archive_results") or []
+    st.session_state["archive_results"] = [r for r in results if r.task["id"] != item.task["id"]]
+    if LOCAL_DB:
+        local.worker.kick()  # シートに戻した行を手元へ取り込む
+    st.toast(f"「{item.task['task']}」を一覧に戻しました")
+
+
+def _archive_now() -> None:
+    _as_session()
+    queue.flush(target)
+    with background():
+        result = archive_completed(ws, days=ARCHIVE_AFTER_DAYS)
+    if LOCAL_DB:
+        local.worker.kick()
+    st.toast(f"{result.moved} 件をアーカイブへ移しました" + (f"（残り {result.remaining} 件は次の回）" if result.remaining else ""))
+
+
+with st.expander(f"🗄️ アーカイブ（完了から {ARCHIVE_AFTER_DAYS} 日たったタスク）"):
+    a1, a2, a3 = st.columns([0.6, 0.2, 0.2])
+    a1.text_input("アーカイブを検索", key="arc_query", placeholder="タスク内容（空なら新しい順）")
+    a2.button("🔎 検索", key="arc_search", on_click=_search_archive, use_container_width=True)
+    a3.button("🧹 今すぐ整理", key="arc_now", on_click=_archive_now, use_container_width=True)
+    results = st.session_state.get("archive_results")
+    if results is not None:
+        st.caption(f"{len(results)} 件")
+        for item in results:
+            t = item.task
+            r1, r2 = st.columns([0.8, 0.2])
+            r1.caption(f"🔖 {t['tag']}｜{t['task']}（締切: {t['due']}・完了: {t['done_at']}）")
+            r2.button("↩️ 戻す", key=f"arc_restore{t['id']}", on_click=_restore_archived, args=(item,))
+
+# --- 起動プロファイル（有効なときだけ。区間は先頭の PROFILE.lap / mark を参照） ---
+if profiling_enabled(st.query_params.get("profile")):
+    PROFILE.finish()
+    with st.sidebar.expander("⏱️ 起動プロファイル（ms）"):
+        st.dataframe(list(reversed(profile_history())), hide_index=True)
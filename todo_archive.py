@@ -0,0 +1,243 @@
+# todo_archive
+"""完了タスクのアーカイブ（ホット / コールドの 2 段）
+
+完了から ARCHIVE_AFTER_DAYS 日たったタスクを、本体のシートから月ごとのアーカイブ用シート
+（本体名 + ARCHIVE_SUFFIX + 完了月。例: my-todo-service__archive_2026-10）へ移す。
+本体には進行中のタスクと最近の完了だけが残るので、読み込み・描画・保存は履歴の量によらない。
+
+- 完了日: 完了を書くときに todo_sheet.stamp_done が「完了日」列に書く。完了日のない完了タスク
+  （この列より前に完了したもの・バックアップから戻したもの）は、初回の整理で今日の日付を付け、
+  そこから数える
+- 整理（archive_completed）: 本体を 1 回読み、移すタスクを月ごとにまとめて各アーカイブへ 1 回ずつ
+  追記してから、本体の行と完了日の付与を 1 回の apply_mutations で反映する。1 回に移すのは
+  batch 件まで（残りは次の回）。先にアーカイブへ書くので、途中で失敗しても本体からは消えない。
+  やり直したときは、アーカイブに同じ ID があればその行は追記しない
+- 検索（search_archive）: 起動時には読まない。検索したときに新しい月から順に読む
+  （読んだシートはプロセス共有キャッシュに載る）
+- 戻す（restore_archived）: 本体の末尾に追加してから、アーカイブの行を消す
+"""
+
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from todo_cache import TASK_CACHE
+from todo_quota import background
+from todo_search import normalize, query_terms
+from todo_sheet import (
+    DONE_AT_COLUMN,
+    HEADERS,
+    ID_COLUMN,
+    a1_range,
+    apply_mutations,
+    build_task,
+    column_index,
+    row_runs,
+    task_to_row,
+)
+from todo_store import TaskStore, parse_done
+
+ARCHIVE_SUFFIX = "__archive_"
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_BATCH = 500  # 1 回の整理で移す件数の上限
+ARCHIVE_INTERVAL_SEC = 3600  # 自動の整理の間隔（プロセス・シートごと）
+ARCHIVE_TTL_SEC = 60
+
+
+class ArchiveResult(NamedTuple):
+    moved: int  # アーカイブへ移した件数
+    stamped: int  # 完了日を付けた件数
+    remaining: int  # 移す対象のうち次の回に回した件数
+    partitions: List[str]  # 書き込んだアーカイブのシート名
+
+
+class ArchivedTask(NamedTuple):
+    partition: str  # アーカイブのシート名
+    task: Dict  # 内部キーの dict（done_at を含む）
+
+
+def partition_title(ws_title: str, done_at: str) -> str:
+    """完了日（YYYY-MM-DD）の月のアーカイブのシート名"""
+    return f"{ws_title}{ARCHIVE_SUFFIX}{done_at[:7]}"
+
+
+def _partitions(ws) -> Dict[str, object]:
+    """このシートのアーカイブ（シート名 -> ワークシート）。新しい月が先"""
+    prefix = ws.title + ARCHIVE_SUFFIX
+    found = {w.title: w for w in ws.spreadsheet.worksheets() if w.title.startswith(prefix)}
+    return dict(sorted(found.items(), reverse=True))
+
+
+def _open_partition(ws, title: str, existing: Dict[str, object]):
+    if title in existing:
+        return existing[title]
+    archive = ws.spreadsheet.add_worksheet(title=title, rows=1, cols=len(HEADERS))
+    archive.update(range_name=a1_range(1, 1, 1, len(HEADERS)), values=[list(HEADERS)])
+    existing[title] = archive
+    return archive
+
+
+def _task(row: List[str], index: Dict[str, int]) -> Dict:
+    def cell(field: str) -> str:
+        c = index.get(field)
+        return str(row[c]) if c is not None and c < len(row) else ""
+
+    return {
+        "task": cell("task"),
+        "due": cell("due"),
+        "done": parse_done(cell("done")),
+        "tag": cell("tag") or "未設定",
+        "id": cell("id"),
+        "order": cell("order"),
+        "done_at": cell("done_at"),
+    }
+
+
+# ======= 整理（本体 -> アーカイブ） =======
+def archive_completed(
+    ws,
+    days: int = ARCHIVE_AFTER_DAYS,
+    batch: int = ARCHIVE_BATCH,
+    today: Optional[date] = None,
+) -> ArchiveResult:
+    """完了から days 日たったタスクをアーカイブへ移す（最大 batch 件）"""
+    today = today or date.today()
+    cutoff = date.fromordinal(today.toordinal() - days).isoformat()
+    values = ws.get_all_values()
+    if len(values) < 2:
+        return ArchiveResult(0, 0, 0, [])
+    index = column_index(values[0])
+    if "id" not in index or "done" not in index:
+        return ArchiveResult(0, 0, 0, [])
+    at = index.get("done_at")
+
+    stamps: Dict[str, Dict] = {}
+    due: Dict[str, List[List[str]]] = {}  # アーカイブのシート名 -> 移す行
+    moving: List[str] = []
+    remaining = 0
+    for row in values[1:]:
+        t = _task(row, index)
+        if not t["done"] or not t["id"]:
+            continue
+        if not t["done_at"]:
+            stamps[t["id"]] = {"done_at": today.isoformat()}
+        elif t["done_at"] <= cutoff:
+            if len(moving) >= batch:
+                remaining += 1
+                continue
+            moving.append(t["id"])
+            due.setdefault(partition_title(ws.title, t["done_at"]), []).append(task_to_row(t))
+
+    if at is None and stamps:
+        # 完了日の列がまだない（古いシート）: 見出しを書いてから完了日を付ける
+        ws.update(range_name=a1_range(1, DONE_AT_COLUMN, 1, DONE_AT_COLUMN), values=[[HEADERS[DONE_AT_COLUMN - 1]]])
+
+    existing = _partitions(ws) if due else {}
+    for title, rows in due.items():
+        archive = _open_partition(ws, title, existing)
+        # やり直しのとき、すでに移してある行は足さない（ID 列の読み 1 回）
+        archived = set(archive.col_values(ID_COLUMN)[1:])
+        rows = [r for r in rows if r[ID_COLUMN - 1] not in archived]
+        if rows:
+            archive.append_rows(rows, value_input_option="RAW", table_range="A1")
+        TASK_CACHE.invalidate(archive)
+
+    if stamps or moving:
+        apply_mutations(ws, updates=stamps, deletes=moving)
+    return ArchiveResult(len(moving), len(stamps), remaining, list(due))
+
+
+_LAST_RUN: Dict[tuple, float] = {}
+_RUN_LOCK = threading.Lock()
+
+
+def maybe_archive(ws, days: int = ARCHIVE_AFTER_DAYS, interval: float = ARCHIVE_INTERVAL_SEC) -> Optional[ArchiveResult]:
+    """前回から interval 秒たっていれば整理する（プロセス・シートごと。他が実行中なら何もしない）
+
+    クォータは裏の処理として使う（画面の操作を優先）。
+    """
+    key = (str(ws.spreadsheet_id), ws.title)
+    now = time.monotonic()
+    if now - _LAST_RUN.get(key, -interval) < interval or not _RUN_LOCK.acquire(blocking=False):
+        return None
+    try:
+        _LAST_RUN[key] = now
+        with background():
+            return archive_completed(ws, days=days)
+    finally:
+        _RUN_LOCK.release()
+
+
+# ======= 検索・戻す =======
+def archive_months(ws) -> List[str]:
+    """アーカイブのある月（YYYY-MM、新しい順）"""
+    return [title[len(ws.title) + len(ARCHIVE_SUFFIX):] for title in _partitions(ws)]
+
+
+def search_archive(
+    ws,
+    query: str = "",
+    months: Optional[Iterable[str]] = None,
+    limit: int = 100,
+    ttl: float = ARCHIVE_TTL_SEC,
+) -> List[ArchivedTask]:
+    """アーカイブの検索（本文にすべての語を含むもの。months で月を絞る）。新しい月から limit 件まで"""
+    terms = query_terms(query)
+    wanted = set(months) if months else None
+    found: List[ArchivedTask] = []
+    for title, archive in _partitions(ws).items():
+        if wanted is not None and title[len(ws.title) + len(ARCHIVE_SUFFIX):] not in wanted:
+            continue
+        values = TASK_CACHE.get_values(archive, ttl=ttl)
+        if not values:
+            continue
+        index = column_index(values[0])
+        for row in reversed(values[1:]):  # 後から移したもの（新しい完了）が先
+            t = _task(row, index)
+            if all(term in normalize(t["task"]) for term in terms):
+                found.append(ArchivedTask(title, t))
+                if len(found) >= limit:
+                    return found
+    return found
+
+
+def restore_archived(ws, store: TaskStore, items: List[ArchivedTask]) -> int:
+    """アーカイブのタスクを本体の末尾に戻す（完了のまま。完了日は戻した日になる）。戻した件数を返す
+
+    store は本体の一覧（すでに本体にある ID は追加しない）。追加してからアーカイブの行を消すので、
+    途中で失敗しても失われることはない（やり直すと本体にある分は飛ばす）。
+    """
+    inserts = []
+    for item in items:
+        try:
+            store.index_of(item.task["id"])
+            continue
+        except KeyError:
+            pass
+        task = {k: v for k, v in item.task.items() if k not in ("order", "done_at")}
+        task = build_task(store, task)
+        store.append(task)
+        inserts.append(task)
+    if inserts:
+        apply_mutations(ws, inserts=inserts)
+
+    existing = _partitions(ws)
+    by_partition: Dict[str, set] = {}
+    for item in items:
+        by_partition.setdefault(item.partition, set()).add(item.task["id"])
+    for title, ids in by_partition.items():
+        archive = existing.get(title)
+        if archive is None:
+            continue
+        col = archive.col_values(ID_COLUMN)
+        rows = sorted((i + 1 for i, tid in enumerate(col) if i > 0 and tid in ids), reverse=True)
+        if rows:
+            ws.spreadsheet.batch_update({"requests": [
+                {"deleteDimension": {
+                    "range": {"sheetId": archive.id, "dimension": "ROWS", "startIndex": start - 1, "endIndex": end},
+                }}
+                for start, end in row_runs(rows)
+            ]})
+        TASK_CACHE.invalidate(archive)
+    return len(inserts)
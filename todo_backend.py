@@ -0,0 +1,53 @@
+# todo_backend
+"""保存先（バックエンド）の切り替え
+
+画面と todo_sheet / todo_restore はワークシートの次のメソッドだけを使う
+（名前と引数は gspread.Worksheet と同じ）:
+  get_all_values / row_values / col_values / batch_get / update / batch_update /
+  append_row(s) / delete_rows / add_rows / row_count / id / title / spreadsheet / spreadsheet_id
+（spreadsheet は batch_update / worksheets / add_worksheet / del_worksheet）
+worksheet(key, title) でそれを返し、stats で集計（dict）を返すものなら差し替えられる。
+
+- gsheet（既定）: todo_client.SheetsClientPool（本物の Google Sheets）
+- fake          : todo_fake.FakeBackend（メモリ上。遅延や 429 などのエラーを注入できる）
+
+環境変数 TODO_BACKEND で選ぶ。fake のときは TODO_FAKE_LATENCY_SEC / TODO_FAKE_ERROR_RATE も見る。
+どちらのワークシートも open_worksheet で todo_quota.QUOTA（読み書きの回数制限と再試行）を通す。
+"""
+
+import os
+from typing import Callable, Dict
+
+from todo_quota import QUOTA
+
+BACKEND_ENV = "TODO_BACKEND"
+DEFAULT_BACKEND = "gsheet"
+
+
+def backend_name() -> str:
+    return os.environ.get(BACKEND_ENV, DEFAULT_BACKEND)
+
+
+def get_backend(load_credentials: Callable[[], Dict]):
+    """設定されたバックエンドを返す（どちらもプロセスで 1 つ）
+
+    認証情報は gsheet のときだけ読む（fake なら st.secrets がなくても動く）。
+    """
+    name = backend_name()
+    if name == "fake":
+        from todo_fake import get_fake_backend
+
+        return get_fake_backend()
+    if name == "gsheet":
+        from todo_client import get_pool
+
+        return get_pool(load_credentials())
+    raise ValueError(f"unknown {BACKEND_ENV}: {name}")
+
+
+def open_worksheet(load_credentials: Callable[[], Dict], key: str, title: str, cols: int = 4):
+    """バックエンドのワークシートを、クォータ管理（QUOTA）を通すラッパーで包んで返す
+
+    シートがなければ cols 列で作る。
+    """
+    return QUOTA.wrap(get_backend(load_credentials).worksheet(key, title, cols))
@@ -0,0 +1,116 @@
+# todo_backup
+"""バックアップの書き出し（TaskStore から直接ストリームで書く）
+
+DataFrame や BytesIO を経由せず、1 行ずつ書き出し先へ流す。
+- xlsx     : xlsxwriter の constant_memory モード（書いた行はすぐ一時ファイルへ出す）
+- csv      : Excel で開けるよう BOM 付き UTF-8
+- jsonl.gz : 1 行 1 タスクの JSON を gzip 圧縮（いちばん速く、小さい）
+列は復元（todo_restore.iter_normalized。列名の読み替えは todo_sheet.column_index）が読める
+日本語の列名にそろえる。
+- 順序 : 順序キーも書くが、行は順序キー順に並んでいるので、復元はその並び順から振り直す
+- 完了日 : TaskStore に持たないので書き出さない。復元した完了済みタスクは、次のアーカイブの整理で
+           復元した日が完了日として付くので、アーカイブへ移るのはそこから todo_archive.ARCHIVE_AFTER_DAYS 日後
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+from todo_store import TaskStore
+
+BACKUP_COLUMNS = ["タスク", "締切日", "完了", "属性", "ID", "順序"]
+SHEET_NAME = "backup"
+# ダウンロード用はこの大きさまではメモリ、超えたら一時ファイルに置く
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def iter_rows(store: TaskStore) -> Iterator[Tuple[str, str, bool, str, str, str]]:
+    """バックアップの 1 行ずつ（順序キー順）"""
+    texts, ids, names, tags, orders = store.texts, store.ids, store.tag_names, store.tags, store.orders
+    for i in range(len(store)):
+        yield texts[i], store.due_str(i), store.is_done(i), names[tags[i]], ids[i], orders[i]
+
+
+def write_xlsx(store: TaskStore, fp: IO[bytes]) -> None:
+    import xlsxwriter  # 使うときだけ読み込む
+
+    # constant_memory は行単位で一時ファイルへ書き出すので、件数によらずメモリは一定
+    wb = xlsxwriter.Workbook(fp, {"constant_memory": True, "strings_to_numbers": False})
+    sheet = wb.add_worksheet(SHEET_NAME)
+    bold = wb.add_format({"bold": True})
+    sheet.write_row(0, 0, BACKUP_COLUMNS, bold)
+    for r, row in enumerate(iter_rows(store), start=1):
+        sheet.write_string(r, 0, row[0])
+        sheet.write_string(r, 1, row[1])
+        sheet.write_boolean(r, 2, row[2])
+        sheet.write_string(r, 3, row[3])
+        sheet.write_string(r, 4, row[4])
+        sheet.write_string(r, 5, row[5])
+    wb.close()
+
+
+def write_csv(store: TaskStore, fp: IO[bytes]) -> None:
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    try:
+        w = csv.writer(text)
+        w.writerow(BACKUP_COLUMNS)
+        w.writerows(iter_rows(store))
+    finally:
+        text.detach()  # fp は閉じない
+
+
+def write_jsonl_gz(store: TaskStore, fp: IO[bytes]) -> None:
+    with gzip.GzipFile(fileobj=fp, mode="wb", compresslevel=6) as gz:
+        for row in iter_rows(store):
+            gz.write(json.dumps(dict(zip(BACKUP_COLUMNS, row)), ensure_ascii=False).encode("utf-8"))
+            gz.write(b"\n")
+
+
+class BackupFormat(NamedTuple):
+    ext: str
+    mime: str
+    write: Callable[[TaskStore, IO[bytes]], None]
+
+
+FORMATS: Dict[str, BackupFormat] = {
+    "xlsx": BackupFormat(
+        "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_xlsx
+    ),
+    "csv": BackupFormat("csv", "text/csv", write_csv),
+    "jsonl.gz": BackupFormat("jsonl.gz", "application/gzip", write_jsonl_gz),
+}
+
+
+def backup_name(fmt: str, now: Optional[datetime] = None) -> str:
+    ts = (now or datetime.now()).strftime("%Y%m%d_%H%M%S")
+    return f"todo_backup_{ts}.{FORMATS[fmt].ext}"
+
+
+def backup_to_file(store: TaskStore, fmt: str, folder: Path) -> Path:
+    """folder に直接書き出す（書き終わるまでは一時名にしておき、最後に名前を付け替える）"""
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / backup_name(fmt)
+    tmp = path.with_name(path.name + ".part")
+    try:
+        with open(tmp, "wb") as f:
+            FORMATS[fmt].write(store, f)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path
+
+
+def backup_to_spool(store: TaskStore, fmt: str) -> IO[bytes]:
+    """ダウンロード用。小さいうちはメモリ、大きくなれば一時ファイルに書き、先頭に戻して返す"""
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    FORMATS[fmt].write(store, f)
+    f.seek(0)
+    return f
+
@@ -0,0 +1,148 @@
+# todo_cache
+"""シート内容の読み込みキャッシュ（プロセス共有）
+
+キーは (スプレッドシートID, ワークシート名)。
+- TTL 内はシートに問い合わせずキャッシュを返す
+- TTL 切れのときは Drive の最終更新時刻だけを確認し、変わっていなければ
+  全行を取り直さずに使い続ける（他のユーザーや手作業の編集もここで検知される）
+- 変わっていたら、変更フィード（todo_feed）からその間の変更だけを読んでキャッシュに当てる。
+  最終更新時刻はスプレッドシート全体のもの（他のリスト・ログ・アーカイブのシートへの書き込みでも
+  変わる）なので、ログに新しい変更がなければ確認済みとしてそのまま使う。
+  ログで追えないとき（全体の書き換え）と、最後に全行を取ってから FULL_RESYNC_SEC たったときは
+  全行を取り直す（ログに残らない手作業の編集は、この定期的な取り直しで反映される）
+- このプロセスからの書き込みは apply で直接キャッシュに当てる（全体の書き換えでは破棄する）
+- 差分を当てた経緯（前の一覧と変更）を少し覚えておき、deltas_since で読み手に渡す
+  （読み手は解析済みの一覧に差分だけを当てられる）
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+DEFAULT_TTL_SEC = 10.0
+FULL_RESYNC_SEC = 300.0
+PATCHES_KEPT = 16
+
+
+class Feed(Protocol):
+    """get_values / apply に渡す変更フィード（todo_sheet.SHEET_FEED）"""
+
+    def read(self, ws) -> Optional[List]: ...
+
+    def patch(self, values: List[List[str]], deltas: List) -> List[List[str]]: ...
+
+
+def cache_key(ws) -> Tuple[str, str]:
+    return (str(ws.spreadsheet_id), ws.title)
+
+
+class _Entry:
+    __slots__ = ("values", "version", "checked_at", "fetched_at", "patches")
+
+    def __init__(self, values: List[List[str]], version: Optional[str], checked_at: float):
+        self.values = values
+        self.version = version
+        self.checked_at = checked_at
+        self.fetched_at = checked_at
+        self.patches: List[Tuple[List[List[str]], List]] = []  # (当てる前の一覧, 変更)
+
+    def patch(self, values: List[List[str]], deltas: List) -> None:
+        self.patches.append((self.values, deltas))
+        del self.patches[:-PATCHES_KEPT]
+        self.values = values
+
+
+class TaskCache:
+    def __init__(self, ttl: float = DEFAULT_TTL_SEC, full_resync: float = FULL_RESYNC_SEC):
+        self.ttl = ttl
+        self.full_resync = full_resync
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.stats = {"hits": 0, "revalidated": 0, "fetches": 0, "deltas": 0, "patched": 0, "invalidations": 0}
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get_values(
+        self,
+        ws,
+        ttl: Optional[float] = None,
+        feed: Optional[Feed] = None,
+        fetch: Optional[Callable] = None,
+    ) -> List[List[str]]:
+        """シートの全値（ヘッダー行を含む）を返す。呼び出し側は書き換えないこと
+
+        fetch: 取り直すときの読み方（既定は ws.get_all_values）。
+        """
+        ttl = self.ttl if ttl is None else ttl
+        key = cache_key(ws)
+        # 同じシートへの同時取得は 1 本にまとめる
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and now - entry.checked_at < ttl:
+                self.stats["hits"] += 1
+                return entry.values
+
+            version = ws.spreadsheet.get_lastUpdateTime()
+            if entry is not None and entry.version is not None and entry.version == version:
+                entry.checked_at = now
+                self.stats["revalidated"] += 1
+                return entry.values
+
+            # 変更ログは本体より先に読む（間に書かれた分は次回また読むことになるが、当て直しても同じ）
+            deltas = feed.read(ws) if feed is not None else None
+            if deltas is not None and entry is not None and now - entry.fetched_at < self.full_resync:
+                if deltas:
+                    entry.patch(feed.patch(entry.values, deltas), deltas)
+                    self.stats["deltas"] += 1
+                else:
+                    self.stats["revalidated"] += 1  # 変わったのは別のシート
+                entry.version = version
+                entry.checked_at = now
+                return entry.values
+
+            values = fetch(ws) if fetch is not None else ws.get_all_values()
+            self._entries[key] = _Entry(values, version, now)
+            self.stats["fetches"] += 1
+            return values
+
+    def apply(self, ws, deltas: List, feed: Feed) -> bool:
+        """このプロセスが書いた変更をキャッシュにも当てる（全行を取り直さずに済ませる）
+
+        版（最終更新時刻）は古いままにしておくので、TTL 後の確認ではログを読むことになり、
+        他の書き込みがあればそれも当たる（自分の変更は当て直しても同じ）。
+        エントリがなければ何もせず False を返す。
+        """
+        key = cache_key(ws)
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            entry.patch(feed.patch(entry.values, deltas), deltas)
+            self.stats["patched"] += 1
+            return True
+
+    def deltas_since(self, ws, values: List[List[str]]) -> Optional[List]:
+        """values（以前 get_values が返した一覧）から今のキャッシュまでの変更。追えなければ None"""
+        key = cache_key(ws)
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            for k, (before, _) in enumerate(entry.patches):
+                if before is values:
+                    return [d for _, deltas in entry.patches[k:] for d in deltas]
+            return None
+
+    def invalidate(self, ws) -> None:
+        key = cache_key(ws)
+        # 取得中のものがあれば終わるのを待ってから捨てる（古い値が残らないように）
+        with self._key_lock(key):
+            if self._entries.pop(key, None) is not None:
+                self.stats["invalidations"] += 1
+
+
+TASK_CACHE = TaskCache()
@@ -0,0 +1,158 @@
+# todo_client
+"""プロセス共有の Google Sheets クライアント
+
+Streamlit は操作のたびにスクリプトを再実行するが、このモジュールは
+プロセス内で一度だけ import されるので、ここに置いた認証済みセッションと
+ワークシートのハンドルは全セッション・全リランで共有される。
+
+- トークンは期限切れの少し前に先回りで更新する
+- HTTP 接続は gspread の AuthorizedSession（requests.Session）を使い回す
+- ワークシートのハンドルは 401 / 404 を受けたときだけ作り直す
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import gspread  # type: ignore
+from google.auth.transport.requests import Request  # type: ignore
+from google.oauth2.service_account import Credentials  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+# 期限のこの秒数前になったらトークンを更新する
+REFRESH_MARGIN_SEC = 300
+# 同時セッション数に合わせた接続プールの大きさ
+POOL_MAXSIZE = 20
+
+_RECONNECT_STATUS = (401, 404)
+
+
+def _status(exc: Exception) -> Optional[int]:
+    resp = getattr(exc, "response", None)
+    return getattr(resp, "status_code", None)
+
+
+class SheetsClientPool:
+    """認証済みクライアントとワークシートのハンドルをキャッシュする"""
+
+    def __init__(self, creds_info: Dict, refresh_margin: int = REFRESH_MARGIN_SEC):
+        self._creds_info = dict(creds_info)
+        self._refresh_margin = timedelta(seconds=refresh_margin)
+        self._lock = threading.RLock()
+        self._creds: Optional[Credentials] = None
+        self._client: Optional[gspread.Client] = None
+        self._worksheets: Dict[Tuple[str, str], gspread.Worksheet] = {}
+        self.stats = {
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "authorizations": 0,
+            "token_refreshes": 0,
+            "reconnects": 0,
+        }
+
+    # --- 認証 ---
+    def _authorize(self) -> gspread.Client:
+        self._creds = Credentials.from_service_account_info(self._creds_info, scopes=SCOPES)
+        self._creds.refresh(Request())
+        client = gspread.authorize(self._creds)
+        adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE)
+        client.http_client.session.mount("https://", adapter)
+        self.stats["authorizations"] += 1
+        return client
+
+    def _refresh_if_needed(self) -> None:
+        expiry = self._creds.expiry if self._creds else None
+        # google-auth の expiry は naive UTC
+        if expiry is None or expiry - self._refresh_margin <= datetime.utcnow():
+            self._creds.refresh(Request())
+            self.stats["token_refreshes"] += 1
+
+    def client(self) -> gspread.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = self._authorize()
+            else:
+                self._refresh_if_needed()
+            return self._client
+
+    # --- ワークシート ---
+    def worksheet(self, key: str, title: str, cols: int = 4):
+        """キャッシュ済みのハンドルを返す（401/404 で自動再接続するラッパー付き）"""
+        return PooledWorksheet(self, key, title, cols)
+
+    def _handle(self, key: str, title: str, cols: int) -> gspread.Worksheet:
+        with self._lock:
+            gc = self.client()
+            ws = self._worksheets.get((key, title))
+            if ws is not None:
+                self.stats["cache_hits"] += 1
+                return ws
+            self.stats["cache_misses"] += 1
+            sh = gc.open_by_key(key)
+            try:
+                ws = sh.worksheet(title)
+            except gspread.exceptions.WorksheetNotFound:
+                ws = sh.add_worksheet(title=title, rows="100", cols=str(cols))
+            self._worksheets[(key, title)] = ws
+            return ws
+
+    def reconnect(self, key: str, title: str, status: Optional[int]) -> None:
+        """ハンドルを捨てる。401 なら認証からやり直す"""
+        with self._lock:
+            self.stats["reconnects"] += 1
+            self._worksheets.pop((key, title), None)
+            if status == 401:
+                self._client = None
+                self._worksheets.clear()
+
+
+class PooledWorksheet:
+    """gspread.Worksheet の代わりに渡すラッパー
+
+    メソッド呼び出しが 401 / 404 で失敗したら、ハンドルを作り直して 1 回だけ再試行する。
+    """
+
+    def __init__(self, pool: SheetsClientPool, key: str, title: str, cols: int):
+        self._pool = pool
+        self._key = key
+        self._title = title
+        self._cols = cols
+
+    @property
+    def worksheet(self) -> gspread.Worksheet:
+        return self._pool._handle(self._key, self._title, self._cols)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.worksheet, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            try:
+                return attr(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status = _status(e)
+                if status not in _RECONNECT_STATUS:
+                    raise
+                self._pool.reconnect(self._key, self._title, status)
+                return getattr(self.worksheet, name)(*args, **kwargs)
+
+        return call
+
+
+_POOL: Optional[SheetsClientPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(creds_info: Dict) -> SheetsClientPool:
+    """プロセスで 1 つのプールを返す（最初の呼び出しで作成）"""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = SheetsClientPool(creds_info)
+        return _POOL
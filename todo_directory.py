@@ -0,0 +1,170 @@
+# todo_directory
+"""リスト（ユーザー・プロジェクトごとの ToDo）の置き場所を引くディレクトリ
+
+- リストごとに専用のワークシートを使う。セッションは自分のリストのシートだけを読み書きする
+- 新しいリストのスプレッドシートは、リスト ID のハッシュで shards から選ぶ
+- 決めた置き場所はディレクトリ用シート（DIRECTORY_SHEET）に 1 行で記録し、以後は記録を正とする。
+  スプレッドシートが満杯になったら shards から外して新しいキーを足せば、
+  既存のリストは動かさずに新しいリストだけが残りのシャードへ振られる
+- ディレクトリはプロセス内で DIRECTORY_TTL_SEC キャッシュする（引くたびにシートを読まない）
+- 既定のリスト（DEFAULT_LIST）は従来の 1 枚のシートのまま
+
+ディレクトリ自体は権限を持たない（リスト ID を知っていれば誰のリストでも引ける）。
+個人のリスト（ID がメールアドレス）を本人だけに限るのは画面側の can_open で、効くのは
+ログインを設定しているときだけ。ログインなしの構成やプロジェクトのリストは、URL を知っている人
+なら誰でも開ける（秘密にしたい内容は置かない）。
+"""
+
+import hashlib
+import re
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from todo_sheet import HEADERS, a1_range
+
+DEFAULT_LIST = "default"
+DIRECTORY_SHEET = "lists"
+DIRECTORY_HEADERS = ["リスト", "スプレッドシート", "シート"]
+DIRECTORY_TTL_SEC = 300
+LIST_ID_MAX = 64
+TITLE_PREFIX = "todo"
+
+# シート名に使えない文字
+_UNSAFE = re.compile(r"[\[\]*?/\\:']")
+
+
+class Location(NamedTuple):
+    key: str  # スプレッドシートのキー
+    title: str  # ワークシート名
+
+
+def normalize_list_id(raw: Optional[str]) -> str:
+    """URL やログイン情報から来た ID を整える（空なら既定のリスト）"""
+    list_id = (raw or "").strip().lower()[:LIST_ID_MAX]
+    return list_id or DEFAULT_LIST
+
+
+def is_personal(list_id: str) -> bool:
+    """ログインのメールアドレスから作られる個人のリストか"""
+    return "@" in list_id
+
+
+def can_open(list_id: str, email: Optional[str], auth: bool) -> bool:
+    """list_id を開いてよいか（auth: ログインを設定しているか。email: ログイン中のユーザー）
+
+    ログインがあるときは、個人のリストは本人しか開けない。それ以外は制限しない。
+    """
+    if not auth or not is_personal(list_id):
+        return True
+    return email is not None and normalize_list_id(email) == list_id
+
+
+def _digest(list_id: str) -> str:
+    return hashlib.sha1(list_id.encode("utf-8")).hexdigest()
+
+
+def shard_for(list_id: str, shards: Sequence[str]) -> str:
+    """リスト ID のハッシュでスプレッドシートを選ぶ（同じ ID なら、どのプロセスでも同じ）"""
+    return shards[int(_digest(list_id)[:8], 16) % len(shards)]
+
+
+def sheet_title(list_id: str, prefix: str = TITLE_PREFIX) -> str:
+    """リストのワークシート名（読める部分 + 衝突よけのハッシュ）"""
+    return f"{prefix}-{_UNSAFE.sub('_', list_id)[:40]}-{_digest(list_id)[:6]}"
+
+
+class ListDirectory:
+    """リスト ID -> Location の表（ディレクトリ用シートの内容をキャッシュ）
+
+    open_ws(key, title, cols) はワークシートを返す関数（なければ作るもの）。
+    同じリストを 2 つのプロセスが同時に作っても、置き場所はハッシュで決まるので同じになる
+    （記録が 2 行になっても先の行が使われるだけ）。
+    """
+
+    def __init__(
+        self,
+        open_ws: Callable[[str, str, int], object],
+        directory_key: str,
+        shards: Sequence[str],
+        default: Location,
+        ttl: float = DIRECTORY_TTL_SEC,
+    ):
+        self._open = open_ws
+        self.directory_key = directory_key
+        self.shards = list(shards)
+        self.default = default
+        self.ttl = ttl
+        self._entries: Dict[str, Location] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0, "created": 0}
+
+    def _sheet(self):
+        return self._open(self.directory_key, DIRECTORY_SHEET, len(DIRECTORY_HEADERS))
+
+    def _load(self) -> None:
+        values = self._sheet().get_all_values()
+        entries: Dict[str, Location] = {}
+        for row in values[1:]:
+            if len(row) >= 3 and row[0] and row[0] not in entries:
+                entries[row[0]] = Location(row[1], row[2])
+        self._entries = entries
+        self._loaded_at = time.monotonic()
+        self.stats["loads"] += 1
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def resolve(self, list_id: str) -> Location:
+        """リストの置き場所を返す。初めてのリストならシートを作って記録する"""
+        if list_id == DEFAULT_LIST:
+            return self.default
+        with self._lock:
+            loc = self._entries.get(list_id)
+            if loc is not None and self._fresh():
+                self.stats["hits"] += 1
+                return loc
+            self._load()
+            loc = self._entries.get(list_id)
+            if loc is None:
+                loc = self._create(list_id)
+            return loc
+
+    def _create(self, list_id: str) -> Location:
+        loc = Location(shard_for(list_id, self.shards), sheet_title(list_id))
+        ws = self._open(loc.key, loc.title, len(HEADERS))
+        if not ws.get_all_values():
+            ws.update(range_name=a1_range(1, 1, 1, len(HEADERS)), values=[list(HEADERS)])
+        directory = self._sheet()
+        if not self._entries and not directory.get_all_values():
+            directory.append_row(DIRECTORY_HEADERS)
+        directory.append_row([list_id, loc.key, loc.title])
+        self._entries[list_id] = loc
+        self.stats["created"] += 1
+        return loc
+
+    def lists(self) -> List[str]:
+        """記録済みのリスト ID（キャッシュの範囲で）"""
+        with self._lock:
+            if not self._fresh():
+                self._load()
+            return [DEFAULT_LIST] + sorted(self._entries)
+
+
+_DIRECTORY: Optional[ListDirectory] = None
+_DIRECTORY_LOCK = threading.Lock()
+
+
+def get_directory(
+    open_ws: Callable[[str, str, int], object],
+    directory_key: str,
+    shards: Sequence[str],
+    default: Location,
+) -> ListDirectory:
+    """プロセスで 1 つのディレクトリ（最初の呼び出しで作成）"""
+    global _DIRECTORY
+    with _DIRECTORY_LOCK:
+        if _DIRECTORY is None:
+            _DIRECTORY = ListDirectory(open_ws, directory_key, shards, default)
+        return _DIRECTORY
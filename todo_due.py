@@ -0,0 +1,66 @@
+# todo_due
+"""締切日の索引（未完了タスクを締切日順に並べた表）
+
+(締切日の序数, タスク ID) を昇順に並べたリストを持ち、bisect で
+「期限切れ」「今日」「今週」「直近 N 件」を O(log n) で答える。
+締切日なし・読めない締切日・完了済みのタスクは入れない。
+TaskStore が締切日・完了の変更のたびに差分で更新する。
+"""
+
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+
+class DueIndex:
+    __slots__ = ("_keys",)
+
+    def __init__(self, keys: Iterable[Tuple[int, str]] = ()):
+        self._keys: List[Tuple[int, str]] = sorted(keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def copy(self) -> "DueIndex":
+        other = DueIndex()
+        other._keys = list(self._keys)
+        return other
+
+    def add(self, due: int, task_id: str) -> None:
+        insort(self._keys, (due, task_id))
+
+    def discard(self, due: int, task_id: str) -> None:
+        key = (due, task_id)
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def _at(self, day: int) -> int:
+        # (day,) は (day, 任意の ID) より前に並ぶ
+        return bisect_left(self._keys, (day,))
+
+    def count_between(self, first: int, last: int) -> int:
+        """締切日が first 以上 last 以下の件数"""
+        return self._at(last + 1) - self._at(first)
+
+    def overdue(self, today: int) -> int:
+        return self._at(today)
+
+    def due_today(self, today: int) -> int:
+        return self.count_between(today, today)
+
+    def due_this_week(self, today: int) -> int:
+        """今日から今週の日曜日までの件数（期限切れは含まない）"""
+        return self.count_between(today, today + 6 - date.fromordinal(today).weekday())
+
+    def upcoming(self, today: int, n: int) -> List[Tuple[int, str]]:
+        """今日以降で締切日が近い順に n 件の (締切日の序数, タスク ID)"""
+        i = self._at(today)
+        return self._keys[i:i + n]
+
+    def summary(self, today: int) -> Dict[str, int]:
+        return {
+            "overdue": self.overdue(today),
+            "today": self.due_today(today),
+            "week": self.due_this_week(today),
+        }
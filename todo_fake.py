@@ -0,0 +1,413 @@
+# todo_fake
+"""ローカル用の疑似ワークシート（gspread.Worksheet の必要部分だけを再現）
+
+API 呼び出し回数と送受信バイト数（JSON 換算）を数えるので、
+ベンチマークや動作確認で本物のスプレッドシートの代わりに使える。
+Faults を設定すると、呼び出しごとに遅延や 429 などの API エラーを起こせる。
+FakeBackend は todo_backend から SheetsClientPool の代わりに使う（TODO_BACKEND=fake）。
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from itertools import count
+from typing import List, Dict, Optional
+
+try:
+    from gspread.exceptions import APIError
+except ImportError:  # gspread なしでも単体で使えるように
+    class APIError(Exception):
+        def __init__(self, response):
+            super().__init__(response.json()["error"])
+            self.response = response
+
+# 単独で作ったワークシートのスプレッドシート ID（作るたびに別のシートとして扱わせる）
+_STANDALONE_IDS = count(1)
+
+_A1 = re.compile(r"^([A-Z]+)(\d+)(?::([A-Z]+)(\d*))?$")
+
+
+def _col_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def _parse_range(rng: str):
+    """'A1:D3' -> (1, 1, 3, 4)。シート名付き ('シート'!A1) も受け付ける"""
+    if "!" in rng:
+        rng = rng.split("!", 1)[1]
+    m = _A1.match(rng)
+    if not m:
+        raise ValueError(f"unsupported range: {rng}")
+    c1, r1, c2, r2 = m.groups()
+    if c2 is None:
+        c2, r2 = c1, r1
+    # 'A5:C' のように終わりの行がなければ最後の行まで（0 で表す）
+    return int(r1), _col_index(c1), int(r2) if r2 else 0, _col_index(c2)
+
+
+def _nbytes(obj) -> int:
+    return len(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+class ApiStats:
+    """呼び出し回数・バイト数の集計"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.cells_written = 0
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.cells_written = 0
+
+    def snapshot(self) -> Dict:
+        return {
+            "calls": self.total_calls,
+            "by_method": dict(self.calls),
+            "sent": self.bytes_sent,
+            "received": self.bytes_received,
+            "cells_written": self.cells_written,
+        }
+
+
+class _FakeResponse:
+    """APIError に渡す requests.Response の代わり"""
+
+    def __init__(self, status_code: int, message: str):
+        self.status_code = status_code
+        self.text = message
+
+    def json(self) -> Dict:
+        return {"error": {"code": self.status_code, "message": self.text, "status": "FAKE"}}
+
+
+class Faults:
+    """呼び出しごとに起こす遅延とエラー
+
+    latency: 1 回あたりの待ち時間（秒）。error_rate: エラーにする割合。
+    fail_next: 次の n 回を必ずエラーにする（再試行の確認用）。
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, status: int = 429, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.status = status
+        self.fail_next = 0
+        self._random = random.Random(seed)
+
+    def before_call(self, method: str) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_next > 0 or (self.error_rate and self._random.random() < self.error_rate):
+            self.fail_next = max(0, self.fail_next - 1)
+            raise APIError(_FakeResponse(self.status, f"injected error on {method}"))
+
+
+class FakeSpreadsheet:
+    """ワークシートをまとめる疑似スプレッドシート（集計は全シート共通）"""
+
+    def __init__(self, id: str = "fake-spreadsheet", stats: Optional[ApiStats] = None, faults: Optional[Faults] = None):
+        self.id = id
+        self.stats = stats or ApiStats()
+        self.faults = faults or Faults()
+        self._version = 0
+        self._worksheets: Dict[int, "FakeWorksheet"] = {}
+
+    def _call(self, method: str, sent=None) -> None:
+        """API 呼び出し 1 回分（失敗した呼び出しも数える）"""
+        self.stats.calls[method] += 1
+        if sent is not None:
+            self.stats.bytes_sent += _nbytes(sent)
+        self.faults.before_call(method)
+
+    def _touch(self) -> None:
+        self._version += 1
+
+    def worksheet_by_id(self, sheet_id: int) -> "FakeWorksheet":
+        return self._worksheets[sheet_id]
+
+    def worksheets(self) -> List["FakeWorksheet"]:
+        self._call("worksheets")
+        return list(self._worksheets.values())
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26, **kwargs) -> "FakeWorksheet":
+        self._call("add_worksheet")
+        if any(w.title == title for w in self._worksheets.values()):
+            raise ValueError(f"worksheet already exists: {title}")
+        self._touch()
+        return FakeWorksheet(title, spreadsheet=self)
+
+    def del_worksheet(self, worksheet: "FakeWorksheet") -> None:
+        self._call("del_worksheet")
+        self._touch()
+        del self._worksheets[worksheet.id]
+
+    def batch_update(self, body: Dict):
+        """spreadsheets.batchUpdate（行の移動・削除、行数変更、値の貼り付け・書き込み、シート削除のみ対応）
+
+        本物と同じく、失敗するときは何も反映しない（注入エラーは反映前に起きる）。
+        """
+        self._call("spreadsheet.batch_update", body)
+        for req in body.get("requests", []):
+            if "deleteDimension" in req:
+                rng = req["deleteDimension"]["range"]
+                del self.worksheet_by_id(rng["sheetId"])._grid[rng["startIndex"]:rng["endIndex"]]
+            elif "updateSheetProperties" in req:
+                props = req["updateSheetProperties"]["properties"]
+                grid = self.worksheet_by_id(props["sheetId"])._grid
+                rows = props["gridProperties"]["rowCount"]
+                del grid[rows:]
+                grid.extend([] for _ in range(rows - len(grid)))
+            elif "copyPaste" in req:
+                src, dest = req["copyPaste"]["source"], req["copyPaste"]["destination"]
+                block = self.worksheet_by_id(src["sheetId"])._grid[src["startRowIndex"]:src["endRowIndex"]]
+                c1, c2 = src["startColumnIndex"], src["endColumnIndex"]
+                values = [(list(r) + [""] * c2)[c1:c2] for r in block]
+                ws = self.worksheet_by_id(dest["sheetId"])
+                ws._write(dest["startRowIndex"] + 1, dest["startColumnIndex"] + 1, values)
+            elif "updateCells" in req:
+                rng, rows = req["updateCells"]["range"], req["updateCells"]["rows"]
+                values = [[next(iter(c["userEnteredValue"].values())) for c in r["values"]] for r in rows]
+                ws = self.worksheet_by_id(rng["sheetId"])
+                ws._write(rng["startRowIndex"] + 1, rng["startColumnIndex"] + 1, values)
+            elif "deleteSheet" in req:
+                del self._worksheets[req["deleteSheet"]["sheetId"]]
+            else:
+                self._move(req["moveDimension"])
+        self._touch()
+        return {}
+
+    def _move(self, move: Dict) -> None:
+        src = move["source"]
+        grid = self.worksheet_by_id(src["sheetId"])._grid
+        start, end = src["startIndex"], src["endIndex"]
+        block = grid[start:end]
+        dest = move["destinationIndex"]
+        del grid[start:end]
+        if dest > start:
+            dest -= end - start
+        grid[dest:dest] = block
+
+    def get_lastUpdateTime(self) -> str:
+        # 本物は Drive API の modifiedTime（RFC3339 文字列）
+        self._call("get_lastUpdateTime")
+        return f"v{self._version}"
+
+
+class FakeWorksheet:
+    """メモリ上のグリッドを持つワークシート"""
+
+    def __init__(
+        self,
+        title: str = "my-todo-service",
+        rows: Optional[List[List]] = None,
+        spreadsheet: Optional[FakeSpreadsheet] = None,
+    ):
+        self.title = title
+        # キャッシュや変更フィードは (スプレッドシート ID, シート名) で覚えるので、単独で作るたびに
+        # ID を変えて、前に作った同じ名前のシートの状態を引き継がないようにする
+        self.spreadsheet = spreadsheet or FakeSpreadsheet(f"fake-spreadsheet-{next(_STANDALONE_IDS)}")
+        self.id = max(self.spreadsheet._worksheets, default=-1) + 1
+        self.spreadsheet._worksheets[self.id] = self
+        self.stats = self.spreadsheet.stats
+        self._grid: List[List[str]] = [[str(v) for v in r] for r in (rows or [])]
+
+    @property
+    def spreadsheet_id(self) -> str:
+        return self.spreadsheet.id
+
+    @property
+    def row_count(self) -> int:
+        return len(self._grid)
+
+    # --- 集計 ---
+    def _call(self, method: str, sent=None) -> None:
+        self.spreadsheet._call(method, sent)
+
+    def _recv(self, obj):
+        self.stats.bytes_received += _nbytes(obj)
+        return obj
+
+    # --- グリッド操作 ---
+    def _trimmed(self) -> List[List[str]]:
+        """本物の API と同じく末尾の空行・空列を落とした値"""
+        rows = [list(r) for r in self._grid]
+        while rows and not any(rows[-1]):
+            rows.pop()
+        width = max((max((i + 1 for i, v in enumerate(r) if v != ""), default=0) for r in rows), default=0)
+        return [(r + [""] * width)[:width] for r in rows]
+
+    def _write(self, r1: int, c1: int, values: List[List]) -> None:
+        self.spreadsheet._touch()
+        # 本物の API と同じく、None（JSON の null）のセルは書かずに元の値を残す
+        self.stats.cells_written += sum(v is not None for row in values for v in row)
+        for dr, row in enumerate(values):
+            r = r1 - 1 + dr
+            while len(self._grid) <= r:
+                self._grid.append([])
+            line = self._grid[r]
+            for dc, v in enumerate(row):
+                c = c1 - 1 + dc
+                if len(line) <= c:
+                    line.extend([""] * (c + 1 - len(line)))
+                if v is not None:
+                    line[c] = str(v)
+
+    # --- gspread 互換 API ---
+    def get_all_values(self, **kwargs) -> List[List[str]]:
+        self._call("get_all_values")
+        return self._recv(self._trimmed())
+
+    def get_all_records(self, **kwargs) -> List[Dict]:
+        self._call("get_all_records")
+        values = self._trimmed()
+        self._recv(values)
+        if not values:
+            return []
+        header = values[0]
+        return [dict(zip(header, row)) for row in values[1:]]
+
+    def update(self, values=None, range_name=None, **kwargs):
+        # gspread 6 の update(values, range_name) に合わせる（旧順序の文字列範囲も許容）
+        if isinstance(values, str):
+            values, range_name = range_name, values
+        self._call("update", {"range": range_name, "values": values})
+        r1, c1 = (1, 1) if range_name is None else _parse_range(range_name)[:2]
+        self._write(r1, c1, values)
+
+    def batch_update(self, data: List[Dict], **kwargs):
+        self._call("batch_update", data)
+        for item in data:
+            r1, c1 = _parse_range(item["range"])[:2]
+            self._write(r1, c1, item["values"])
+
+    def append_row(self, values: List, **kwargs):
+        self._call("append_row", values)
+        self._write(len(self._trimmed()) + 1, 1, [values])
+
+    def append_rows(self, values: List[List], **kwargs):
+        self._call("append_rows", values)
+        first = len(self._trimmed()) + 1
+        self._write(first, 1, values)
+        # 本物と同じく、書き込んだ範囲を返す
+        return {"updates": {"updatedRange": f"'{self.title}'!A{first}:A{first + len(values) - 1}"}}
+
+    def batch_get(self, ranges: List[str], **kwargs) -> List[List[List[str]]]:
+        """範囲ごとの値（末尾の空行・空列は落とす）"""
+        self._call("batch_get")
+        values = self._trimmed()
+        out = []
+        for rng in ranges:
+            r1, c1, r2, c2 = _parse_range(rng)
+            rows = [r[c1 - 1:c2] for r in values[r1 - 1:r2 or None]]
+            rows = [r[:max((i + 1 for i, v in enumerate(r) if v != ""), default=0)] for r in rows]
+            while rows and not rows[-1]:
+                rows.pop()
+            out.append(rows)
+        return self._recv(out)
+
+    def col_values(self, col: int, **kwargs) -> List[str]:
+        self._call("col_values")
+        values = [r[col - 1] if len(r) >= col else "" for r in self._trimmed()]
+        while values and values[-1] == "":
+            values.pop()
+        return self._recv(values)
+
+    def row_values(self, row: int, **kwargs) -> List[str]:
+        self._call("row_values")
+        values = self._trimmed()
+        line = list(values[row - 1]) if row <= len(values) else []
+        while line and line[-1] == "":
+            line.pop()
+        return self._recv(line)
+
+    def delete_rows(self, start_index: int, end_index: Optional[int] = None):
+        end_index = start_index if end_index is None else end_index
+        self._call("delete_rows", [start_index, end_index])
+        self.spreadsheet._touch()
+        del self._grid[start_index - 1:end_index]
+
+    def add_rows(self, rows: int):
+        self._call("add_rows", rows)
+        self._grid.extend([] for _ in range(rows))
+
+    def clear(self):
+        self._call("clear")
+        self.spreadsheet._touch()
+        self._grid = []
+
+
+class FakeBackend:
+    """SheetsClientPool の代わり（worksheet(key, title) と stats だけを持つ）
+
+    スプレッドシートはキーごとにメモリ上に作り、プロセスが終わるまで残る。
+    集計と Faults は全スプレッドシートで共通。
+    """
+
+    def __init__(self, faults: Optional[Faults] = None):
+        self.api = ApiStats()
+        self.faults = faults or Faults()
+        self._spreadsheets: Dict[str, FakeSpreadsheet] = {}
+        self._lock = threading.Lock()
+
+    def spreadsheet(self, key: str) -> FakeSpreadsheet:
+        with self._lock:
+            if key not in self._spreadsheets:
+                self._spreadsheets[key] = FakeSpreadsheet(key, stats=self.api, faults=self.faults)
+            return self._spreadsheets[key]
+
+    def worksheet(self, key: str, title: str, cols: int = 4) -> FakeWorksheet:
+        sh = self.spreadsheet(key)
+        for ws in list(sh._worksheets.values()):
+            if ws.title == title:
+                return ws
+        return FakeWorksheet(title, spreadsheet=sh)
+
+    def seed(self, key: str, title: str, rows: List[List]) -> FakeWorksheet:
+        """シートの中身を rows で置き換える（API 呼び出しには数えない）"""
+        ws = self.worksheet(key, title)
+        ws._grid = [[str(v) for v in r] for r in rows]
+        ws.spreadsheet._touch()
+        return ws
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spreadsheets.clear()
+        self.api.reset()
+
+    @property
+    def stats(self) -> Dict:
+        return self.api.snapshot()
+
+
+_BACKEND: Optional[FakeBackend] = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def get_fake_backend() -> FakeBackend:
+    """プロセスで 1 つの FakeBackend（遅延・エラー率は環境変数から）"""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            _BACKEND = FakeBackend(
+                Faults(
+                    latency=float(os.environ.get("TODO_FAKE_LATENCY_SEC", "0")),
+                    error_rate=float(os.environ.get("TODO_FAKE_ERROR_RATE", "0")),
+                )
+            )
+        return _BACKEND
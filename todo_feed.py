@@ -0,0 +1,228 @@
+# todo_feed
+"""変更フィード（変更ログのシート + プロセス内の通知）
+
+アプリからの書き込みは、本体のシートに書いたあと変更ログのシート（本体名 + LOG_SUFFIX）に
+1 回の append で「何を変えたか」を 1 行（書き込み 1 回分の変更をまとめた batch）で残す。
+ログの行番号がそのまま版になる。1 セルに収まらない大きな変更（一括取り込みなど）は
+中身を残さず reset にする。
+- 他のプロセスの変更: キャッシュの確認で最終更新時刻が変わっていたら、前回読んだ位置から後の
+  ログだけを読み（1 回）、キャッシュの一覧に当てる。全行は取り直さない
+- 同じプロセスの変更: 書いた側がキャッシュを直接直し、publish で他のセッションに知らせる
+  （受け手は seq を見てリランするだけで、シートには問い合わせない）
+- 全体の書き換え（復元・振り直し・移行など）や失敗した書き込みは reset を残し、
+  読み手は全行を取り直す
+ログが LOG_MAX_ROWS 行を超えたら、行の削除と世代（ヘッダー行の D1）の更新を 1 回の
+batchUpdate で行って縮める。世代が変わったのを見た読み手は全行を取り直す。
+"""
+
+import contextlib
+import contextvars
+import json
+import re
+import threading
+import uuid
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+ADD = "add"  # 追加（fields は全項目）
+SET = "set"  # 項目の書き換え
+DEL = "del"  # 削除
+RESET = "reset"  # 全体が変わった（読み手は取り直す）
+BATCH = "batch"  # 複数の変更をまとめた行（内容は [[op, id, fields], ...]）
+
+LOG_SUFFIX = "__log"
+LOG_HEADERS = ["操作", "ID", "内容"]
+LOG_MAX_ROWS = 2000
+LOG_CELL_MAX = 40_000  # 1 行に残す内容の上限（1 セル 50,000 文字より小さく）。超えたら reset
+ORIGINS_KEPT = 256
+
+_origin: contextvars.ContextVar = contextvars.ContextVar("feed_origin", default="")
+
+
+class Delta(NamedTuple):
+    op: str
+    id: str = ""
+    fields: Optional[Dict] = None
+
+
+def encode(d: Delta) -> List[str]:
+    return [d.op, d.id, json.dumps(d.fields, ensure_ascii=False) if d.fields else ""]
+
+
+def decode(row: List[str]) -> Delta:
+    row = list(row) + [""] * (3 - len(row))
+    return Delta(row[0], row[1], json.loads(row[2]) if row[2] else None)
+
+
+def encode_record(deltas: Optional[List[Delta]]) -> List[str]:
+    """書き込み 1 回分の変更 -> ログの 1 行（なし・大きすぎるときは reset）"""
+    if not deltas:
+        return encode(Delta(RESET))
+    if len(deltas) == 1:
+        row = encode(deltas[0])
+    else:
+        body = [[d.op, d.id, d.fields] if d.fields else [d.op, d.id] for d in deltas]
+        row = [BATCH, "", json.dumps(body, ensure_ascii=False, separators=(",", ":"))]
+    return row if len(row[2]) <= LOG_CELL_MAX else encode(Delta(RESET))
+
+
+def decode_record(row: List[str]) -> List[Delta]:
+    if row[0] != BATCH:
+        return [decode(row)]
+    return [Delta(*d) for d in json.loads(row[2])]
+
+
+def set_origin(name: str) -> None:
+    """このコンテキストからの書き込みの送り主
+
+    Streamlit では fragment のリランや callback はスクリプト先頭で設定したコンテキストの外で
+    動くことがあるので、書き込む側（WriteBehindQueue.flush）や fragment の中で付け直す。
+    """
+    _origin.set(name)
+
+
+@contextlib.contextmanager
+def origin(name: str):
+    token = _origin.set(name)
+    try:
+        yield
+    finally:
+        _origin.reset(token)
+
+
+def _end_row(response) -> Optional[int]:
+    """append の応答（updates.updatedRange = 'x'!A12:C14）から最後の行番号を取り出す"""
+    rng = ((response or {}).get("updates") or {}).get("updatedRange", "")
+    m = re.search(r"(\d+)$", rng)
+    return int(m.group(1)) if m else None
+
+
+class _State:
+    __slots__ = ("log", "pos", "epoch", "seq", "origins", "lock")
+
+    def __init__(self):
+        self.log = None  # 変更ログのワークシート
+        self.pos: Optional[int] = None  # 読み終えたログの行数（ヘッダーを除く）
+        self.epoch: Optional[str] = None
+        self.seq = 0  # プロセス内の通知の通し番号
+        self.origins: deque = deque(maxlen=ORIGINS_KEPT)  # (seq, 送り主)
+        self.lock = threading.Lock()
+
+
+class ChangeFeed:
+    def __init__(self, max_rows: int = LOG_MAX_ROWS):
+        self.max_rows = max_rows
+        self._states: Dict[Tuple[str, str], _State] = {}
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "read": 0, "resets": 0, "rotations": 0, "published": 0}
+
+    def _state(self, ws) -> _State:
+        key = (str(ws.spreadsheet_id), ws.title)
+        with self._lock:
+            return self._states.setdefault(key, _State())
+
+    def _find_log(self, ws, state: _State, create: bool):
+        title = ws.title + LOG_SUFFIX
+        for w in ws.spreadsheet.worksheets():
+            if w.title == title:
+                return w
+        if not create:
+            return None
+        epoch = uuid.uuid4().hex[:8]
+        log = ws.spreadsheet.add_worksheet(title=title, rows=1, cols=len(LOG_HEADERS) + 1)
+        log.update(range_name="A1:D1", values=[LOG_HEADERS + [epoch]])
+        # 作ったばかりで空なので、読む位置は先頭でよい（初回の読み込みで全行を取り直さずに済む）
+        state.pos, state.epoch = 0, epoch
+        return log
+
+    def forget(self, ws) -> None:
+        """覚えている位置とログのハンドルを捨てる（シートを作り直したときなど）"""
+        with self._lock:
+            self._states.pop((str(ws.spreadsheet_id), ws.title), None)
+
+    # --- 書く側 ---
+    def record(self, ws, deltas: Optional[List[Delta]] = None) -> None:
+        """変更をログに 1 行で残して（append 1 回）、プロセス内に知らせる。deltas が None なら reset"""
+        state = self._state(ws)
+        rows = [encode_record(deltas)]
+        with state.lock:
+            if state.log is None:
+                state.log = self._find_log(ws, state, create=True)
+            end = _end_row(state.log.append_rows(rows, value_input_option="RAW", table_range="A1"))
+            self.stats["recorded"] += len(deltas or ())
+            if end is not None and end - 1 > self.max_rows:
+                self._rotate(ws, state, end)
+        self.publish(ws)
+
+    def _rotate(self, ws, state: _State, end: int) -> None:
+        """ヘッダー以外の行を消し、世代を変える（1 回の batchUpdate）"""
+        epoch = uuid.uuid4().hex[:8]
+        ws.spreadsheet.batch_update({"requests": [
+            {"deleteDimension": {
+                "range": {"sheetId": state.log.id, "dimension": "ROWS", "startIndex": 1, "endIndex": end},
+            }},
+            {"updateCells": {
+                "range": {"sheetId": state.log.id, "startRowIndex": 0, "endRowIndex": 1,
+                          "startColumnIndex": 3, "endColumnIndex": 4},
+                "rows": [{"values": [{"userEnteredValue": {"stringValue": epoch}}]}],
+                "fields": "userEnteredValue",
+            }},
+        ]})
+        self.stats["rotations"] += 1
+
+    # --- 読む側 ---
+    def read(self, ws) -> Optional[List[Delta]]:
+        """前回読んだ位置から後の変更（読み 1 回）
+
+        None のときは差分では追えない（初回・ログがない・世代が変わった・reset を含む）ので、
+        呼び出し側で全行を取り直す。どちらの場合も読んだ位置は進めておく。
+        """
+        state = self._state(ws)
+        with state.lock:
+            if state.log is None:
+                state.log = self._find_log(ws, state, create=False)
+                if state.log is None:
+                    return None
+            start = (state.pos or 0) + 2
+            rows, head = state.log.batch_get([f"A{start}:C", "D1"])
+            epoch = head[0][0] if head and head[0] else ""
+            if state.pos is None or epoch != state.epoch:
+                # 初回（先頭から読んだ）は今の末尾から続ける。世代が変わったら次は先頭から
+                state.pos = len(rows) if state.pos is None else 0
+                state.epoch = epoch
+                self.stats["resets"] += 1
+                return None
+            state.pos += len(rows)
+            deltas = [d for r in rows if r and r[0] for d in decode_record(r)]
+            self.stats["read"] += len(deltas)
+            if any(d.op == RESET for d in deltas):
+                self.stats["resets"] += 1
+                return None
+            return deltas
+
+    # --- プロセス内の通知 ---
+    def publish(self, ws, who: Optional[str] = None) -> int:
+        """プロセス内に知らせる。who は送り主（省略時は set_origin / origin で設定したもの）"""
+        state = self._state(ws)
+        with state.lock:
+            state.seq += 1
+            state.origins.append((state.seq, _origin.get() if who is None else who))
+            self.stats["published"] += 1
+            return state.seq
+
+    def seq(self, ws) -> int:
+        return self._state(ws).seq
+
+    def changed_by_others(self, ws, since: int, who: Optional[str] = None) -> bool:
+        """since より後に、送り主 who（省略時はいまの送り主）以外からの変更があったか"""
+        state = self._state(ws)
+        me = _origin.get() if who is None else who
+        with state.lock:
+            if state.seq <= since:
+                return False
+            if not state.origins or state.origins[0][0] > since + 1:
+                return True  # 古い分は覚えていないので、変わったものとして扱う
+            return any(seq > since and who != me for seq, who in state.origins)
+
+
+FEED = ChangeFeed()
@@ -0,0 +1,181 @@
+# todo_import
+"""タスクの一括取り込み（CSV / TSV ファイル・貼り付けたテキストを今の一覧の末尾に追加）
+
+- 読み込み : 1 行ずつ（csv.reader）。区切りはファイルの拡張子で決める。貼り付けたテキストは
+             1 行目にタブがあればタブ区切り、「タスク」列の見出しがあればカンマ区切り、
+             どちらでもなければ 1 行 1 タスク
+- 検証     : 復元と同じ列名の読み替え・正規化（todo_restore.iter_normalized）。1 行目に
+             「タスク」列の見出しがなければ、見出しなしの「タスク, 締切日, 完了, 属性」の並びとして読む
+- 重複     : 今の一覧とファイル内の (タスク, 締切日) のハッシュ索引（set）で突き合わせて飛ばす。
+             今の一覧にある ID の行も飛ばす（書き出したファイルを取り込み直したとき）
+- 書き込み : 末尾に等間隔の順序キーを振り、CHUNK_BYTES・IMPORT_BATCH_ROWS 以下に分けて、
+             書き込み待ち行列と同じ関数（apply_mutations / apply_local）で追記する。
+             書き込みの間隔はクォータの制限（todo_quota）に任せる。分割は変更ログの 1 行に
+             収まらないので、ログには行ごとの内容ではなく reset が残る（他のプロセスは全行を取り直す）。途中で失敗しても
+             ImportJob.run をもう一度呼べば続きから書く（シートに届いていた行は ID で確かめて飛ばす）
+"""
+
+import csv
+import io
+from itertools import chain
+from typing import IO, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from todo_rank import ranks_after
+from todo_restore import CHUNK_BYTES, Issue, chunk_bounds, iter_csv_rows, iter_normalized
+from todo_search import normalize
+from todo_sheet import HEADERS, ID_COLUMN, apply_mutations, column_index
+from todo_store import TaskStore, parse_done
+
+IMPORT_BATCH_ROWS = 2000  # 1 回の追記の行数の上限（進み具合の刻み）
+# 見出しのないファイル・貼り付けの列の並び
+IMPORT_COLUMNS = HEADERS[:4]
+
+
+class ImportData(NamedTuple):
+    rows: List[List[str]]  # 追加する行（HEADERS の順で順序キーまで。ヘッダーは含まない）
+    issues: List[Issue]
+    duplicates: int  # 今の一覧・ファイル内と重なったので飛ばした行数
+
+
+# ======= 読み込み =======
+def iter_import_rows(name: str, fp: IO[bytes]) -> Iterator[Sequence]:
+    """ファイル名の拡張子で区切りを選ぶ"""
+    name = name.lower()
+    if name.endswith(".csv"):
+        return iter_csv_rows(fp)
+    if name.endswith((".tsv", ".txt")):
+        return iter_csv_rows(fp, delimiter="\t")
+    raise ValueError(f"対応していない形式です: {name}")
+
+
+def iter_text_rows(text: str) -> Iterator[Sequence]:
+    """貼り付けたテキストを 1 行ずつ"""
+    text = text.lstrip("\ufeff")
+    first = text.split("\n", 1)[0]
+    if "\t" in first:
+        return csv.reader(io.StringIO(text), delimiter="\t")
+    if "task" in column_index(next(csv.reader([first]), [])):
+        return csv.reader(io.StringIO(text))
+    # 区切りなし: 行全体がタスク（本文のカンマで分けない）
+    return ([line] for line in text.splitlines())
+
+
+# ======= 検証・重複の除外 =======
+def _key(text: str, due: str) -> tuple:
+    return normalize(text), due
+
+
+def plan_import(store: TaskStore, rows: Iterator[Sequence]) -> ImportData:
+    """読み込んだ行 -> 今の一覧の末尾に追加する行（順序キーは今の最後のキーの後ろ）"""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        raise ValueError("取り込む行がありません")
+    shift = 0
+    if "task" not in column_index(first):
+        rows, first, shift = chain([first], rows), IMPORT_COLUMNS, 1
+
+    ids = set(store.ids)
+    seen = {_key(store.texts[i], store.due_str(i)) for i in range(len(store))}
+    issues: List[Issue] = []
+    out: List[List[str]] = []
+    duplicates = 0
+    for row in iter_normalized(chain([first], rows), issues):
+        key = _key(row[0], row[1])
+        if row[4] in ids or key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        row[3] = row[3] or "未設定"
+        out.append(row)
+    for row, rank in zip(out, ranks_after(store.orders[-1] if len(store) else None, len(out))):
+        row[5] = rank
+    if shift:
+        issues = [Issue(i.line - shift, i.message) for i in issues]
+    return ImportData(out, issues, duplicates)
+
+
+def read_import(store: TaskStore, name: str, fp: IO[bytes]) -> ImportData:
+    return plan_import(store, iter_import_rows(name, fp))
+
+
+# ======= 書き込み =======
+def import_batches(
+    rows: List[List[str]], batch_rows: int = IMPORT_BATCH_ROWS, chunk_bytes: int = CHUNK_BYTES
+) -> List[range]:
+    """追記する行を CHUNK_BYTES・IMPORT_BATCH_ROWS 以下の分割に分ける（ローカル優先モードの push も使う）"""
+    return [
+        range(s, min(s + batch_rows, c.stop))
+        for c in chunk_bounds(rows, chunk_bytes)
+        for s in range(c.start, c.stop, batch_rows)
+    ]
+
+
+def _task(row: List[str]) -> Dict:
+    return {
+        "task": row[0],
+        "due": row[1],
+        "done": parse_done(row[2]),
+        "tag": row[3],
+        "id": row[4],
+        "order": row[5],
+    }
+
+
+class ImportJob:
+    """検証済みの行を末尾に追記する作業
+
+    分割ごとに apply（todo_sheet.apply_mutations / todo_local.apply_local）を 1 回呼ぶ。
+    書き終えた分割の数を持っているので、失敗したら run をもう一度呼べば続きから書く。
+    インスタンスは st.session_state に置く。
+    """
+
+    def __init__(self, rows: List[List[str]], batch_rows: int = IMPORT_BATCH_ROWS, chunk_bytes: int = CHUNK_BYTES):
+        self.rows = rows
+        self.chunks = import_batches(rows, batch_rows, chunk_bytes)
+        self.written = 0  # 書き終えた分割の数
+        self.failed = False
+
+    @property
+    def total_steps(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def finished(self) -> bool:
+        return self.written >= len(self.chunks)
+
+    def progress(self) -> float:
+        return self.written / self.total_steps if self.total_steps else 1.0
+
+    def describe(self) -> str:
+        done = sum(len(c) for c in self.chunks[:self.written])
+        return f"{done}/{len(self.rows)} 件"
+
+    def _unsent(self, target, tasks: List[Dict]) -> List[Dict]:
+        """失敗のあとは、応答だけが失われて届いていた行を除く（シートなら ID 列の読み 1 回）"""
+        if not hasattr(target, "col_values"):
+            return tasks  # 手元の SQLite は同じ ID の追加を上書きで受ける
+        sent = set(target.col_values(ID_COLUMN))
+        return [t for t in tasks if t["id"] not in sent]
+
+    def run(
+        self,
+        target,
+        apply: Callable = apply_mutations,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        while not self.finished:
+            chunk = self.chunks[self.written]
+            tasks = [_task(r) for r in self.rows[chunk.start:chunk.stop]]
+            try:
+                if self.failed:
+                    tasks = self._unsent(target, tasks)
+                if tasks:
+                    apply(target, tasks, {}, [])
+            except Exception:
+                self.failed = True
+                raise
+            self.failed = False
+            self.written += 1
+            if progress is not None:
+                progress(self.progress())
@@ -0,0 +1,406 @@
+# todo_local
+"""ローカル優先モード（SQLite が正、Google Sheets へは裏で同期）
+
+画面の読み書きはすべて手元の SQLite（WAL モード）に対して行い、シートの往復を待たない。
+SyncWorker がスレッドで一定間隔ごとに
+  1) シートを読み（キャッシュ経由。変わっていなければ最終更新時刻の確認だけ）
+  2) 行ごとに突き合わせて取り込み（pull）
+  3) 手元で変えた行を apply_mutations でまとめて送る（push。追加が多いときは一括取り込みと
+     同じ大きさ（todo_import.import_batches）に分けて送る）
+を行う。シートが落ちていても・クォータ切れでも画面はそのまま動き、送れなかった分は次の回に送る。
+
+行ごとの競合処理: 各行に「最後に同期したときの値」(base) を持ち、三方向で比べる。
+- 片方だけが変えた項目はその値を採る
+- 同じ項目を両方が変えていたら手元（まだ送っていない新しい操作）を採る
+- 手元で削除・シートで編集 -> 削除を採る / シートで削除・手元で編集 -> 手元の行を追加し直す
+"""
+
+import json
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from todo_feed import FEED
+from todo_import import import_batches
+from todo_quota import background
+from todo_rank import initial_ranks
+from todo_sheet import apply_mutations, load_data, task_to_row
+from todo_store import TaskStore, parse_due
+
+if TYPE_CHECKING:
+    import sqlite3
+
+SYNC_INTERVAL_SEC = 5.0
+MAX_BACKOFF_SEC = 120.0
+FIELDS = ("task", "due", "done", "tag", "order")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    task TEXT NOT NULL DEFAULT '',
+    due TEXT NOT NULL DEFAULT '',
+    due_ord INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    tag TEXT NOT NULL DEFAULT '',
+    ord TEXT NOT NULL DEFAULT '',
+    deleted INTEGER NOT NULL DEFAULT 0,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    base TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_ord ON tasks(ord, id) WHERE deleted = 0;
+CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(due_ord) WHERE deleted = 0 AND done = 0;
+CREATE INDEX IF NOT EXISTS idx_tasks_tag ON tasks(tag) WHERE deleted = 0;
+CREATE INDEX IF NOT EXISTS idx_tasks_done ON tasks(done) WHERE deleted = 0;
+CREATE INDEX IF NOT EXISTS idx_tasks_dirty ON tasks(dirty) WHERE dirty = 1;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _fields(task: Dict) -> Dict:
+    """内部キーの dict -> 比較用にそろえた 5 項目"""
+    return {
+        "task": str(task.get("task", "")),
+        "due": str(task.get("due", "")),
+        "done": bool(task.get("done", False)),
+        "tag": str(task.get("tag", "未設定")),
+        "order": str(task.get("order", "")),
+    }
+
+
+def merge_row(base: Dict, local: Dict, remote: Dict) -> Tuple[Dict, bool]:
+    """三方向の突き合わせ。(採用する値, 同じ項目を両方が変えていたか) を返す"""
+    merged, conflict = {}, False
+    for f in FIELDS:
+        mine, theirs = local[f] != base[f], remote[f] != base[f]
+        if mine and theirs and local[f] != remote[f]:
+            conflict = True
+        merged[f] = local[f] if mine else remote[f]
+    return merged, conflict
+
+
+class LocalStore:
+    """SQLite のタスク表（1 接続をロックで共有。WAL なので読み手は書き込みを待たない）"""
+
+    def __init__(self, path: str):
+        import sqlite3  # ローカル優先モードのときだけ読み込む
+
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+        self._version = 0  # 書き込みのたびに増やす（読み込み結果の使い回し判定）
+        self._loaded: Optional[Tuple[int, TaskStore]] = None
+
+    # --- 読み込み ---
+    def load(self) -> TaskStore:
+        """順序キー順の TaskStore（変更がなければ前回の結果のコピー）"""
+        with self._lock:
+            if self._loaded is None or self._loaded[0] != self._version:
+                rows = self._conn.execute(
+                    "SELECT task, due, done, tag, id, ord FROM tasks WHERE deleted = 0 ORDER BY ord, id"
+                ).fetchall()
+                texts, dues, dones, tags, ids, orders = (list(c) for c in zip(*rows)) if rows else ([],) * 6
+                store = TaskStore.from_columns(texts, dues, dones, tags, ids, orders)
+                store.due_index
+                store.search_index
+                self._loaded = (self._version, store)
+            return self._loaded[1].copy()
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tasks WHERE dirty = 1").fetchone()[0]
+
+    def meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # --- 画面からの書き込み（未送信として印を付ける） ---
+    def apply_mutations(self, inserts: List[Dict], updates: Dict[str, Dict], deletes: List[str]) -> List[str]:
+        """todo_sheet.apply_mutations と同じ形。見つからなかった ID を返す"""
+        missing = []
+        with self._lock, self._tx():
+            for t in inserts:
+                self._put(t["id"], _fields(t), dirty=True, base=None)
+            for tid, fields in updates.items():
+                row = self._row(tid)
+                if row is None:
+                    missing.append(tid)
+                    continue
+                self._put(tid, _fields({**row, **fields}), dirty=True)
+            for tid in deletes:
+                cur = self._conn.execute("SELECT base FROM tasks WHERE id = ? AND deleted = 0", (tid,)).fetchone()
+                if cur is None:
+                    missing.append(tid)
+                elif cur[0] is None:
+                    # まだシートに送っていない行: 消すだけ
+                    self._conn.execute("DELETE FROM tasks WHERE id = ?", (tid,))
+                else:
+                    self._conn.execute(
+                        "UPDATE tasks SET deleted = 1, dirty = 1, version = version + 1 WHERE id = ?", (tid,)
+                    )
+            self._version += 1
+        return missing
+
+    def write_orders(self, orders: Iterable[Tuple[str, str]]) -> None:
+        with self._lock, self._tx():
+            self._conn.executemany(
+                "UPDATE tasks SET ord = ?, dirty = 1, version = version + 1 WHERE id = ?",
+                [(rank, tid) for tid, rank in orders],
+            )
+            self._version += 1
+
+    # --- 内部 ---
+    def _tx(self):
+        return _Transaction(self._conn)
+
+    def _row(self, tid: str) -> Optional[Dict]:
+        r = self._conn.execute(
+            "SELECT task, due, done, tag, ord FROM tasks WHERE id = ? AND deleted = 0", (tid,)
+        ).fetchone()
+        return None if r is None else {"task": r[0], "due": r[1], "done": bool(r[2]), "tag": r[3], "order": r[4]}
+
+    def _put(self, tid: str, f: Dict, dirty: bool, base=...) -> None:
+        """1 行を書く。base を省略すると今の base を残す"""
+        args = (f["task"], f["due"], parse_due(f["due"]), int(f["done"]), f["tag"], f["order"], int(dirty))
+        if base is ...:
+            cur = self._conn.execute(
+                "UPDATE tasks SET task = ?, due = ?, due_ord = ?, done = ?, tag = ?, ord = ?, deleted = 0, "
+                "dirty = ?, version = version + 1 WHERE id = ?",
+                args + (tid,),
+            )
+            if cur.rowcount:
+                return
+            base = None
+        self._conn.execute(
+            "INSERT INTO tasks (task, due, due_ord, done, tag, ord, dirty, id, base, deleted, version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 1) "
+            "ON CONFLICT(id) DO UPDATE SET task = excluded.task, due = excluded.due, due_ord = excluded.due_ord, "
+            "done = excluded.done, tag = excluded.tag, ord = excluded.ord, dirty = excluded.dirty, "
+            "base = excluded.base, deleted = 0, version = tasks.version + 1",
+            args + (tid, None if base is None else json.dumps(base, ensure_ascii=False)),
+        )
+
+    # --- 同期（SyncWorker から呼ぶ） ---
+    def pull(self, remote: TaskStore, replace: bool = False) -> Dict[str, int]:
+        """シートの内容を取り込む。replace なら手元の未送信分を捨ててシートに合わせる"""
+        counts = {"pulled": 0, "conflicts": 0}
+        remote_rows = {remote.ids[i]: _fields(remote.to_dict(i)) for i in range(len(remote))}
+        with self._lock, self._tx():
+            local_rows = {
+                r[0]: r[1:]
+                for r in self._conn.execute("SELECT id, task, due, done, tag, ord, deleted, dirty, base FROM tasks")
+            }
+            for tid, theirs in remote_rows.items():
+                cur = local_rows.pop(tid, None)
+                if cur is None or replace:
+                    self._put(tid, theirs, dirty=False, base=theirs)
+                    counts["pulled"] += 1
+                    continue
+                mine = {"task": cur[0], "due": cur[1], "done": bool(cur[2]), "tag": cur[3], "order": cur[4]}
+                deleted, dirty, base = cur[5], cur[6], json.loads(cur[7]) if cur[7] else None
+                if base == theirs:
+                    continue  # シート側は前回から変わっていない
+                if not dirty:
+                    self._put(tid, theirs, dirty=False, base=theirs)
+                    counts["pulled"] += 1
+                elif deleted:
+                    # 手元で削除・シートで編集: 削除を採る（base だけ新しくする）
+                    counts["conflicts"] += 1
+                    self._set_base(tid, theirs)
+                else:
+                    merged, conflict = merge_row(base or theirs, mine, theirs)
+                    counts["conflicts"] += int(conflict)
+                    self._put(tid, merged, dirty=merged != theirs, base=theirs)
+                    counts["pulled"] += 1
+            # シートにない行
+            for tid, cur in local_rows.items():
+                deleted, dirty, base = cur[5], cur[6], cur[7]
+                if base is None and not replace:
+                    continue  # 手元で追加してまだ送っていない行
+                if dirty and not deleted and not replace:
+                    # シートで削除・手元で編集: 追加し直す
+                    counts["conflicts"] += 1
+                    self._conn.execute("UPDATE tasks SET base = NULL WHERE id = ?", (tid,))
+                else:
+                    self._conn.execute("DELETE FROM tasks WHERE id = ?", (tid,))
+                    counts["pulled"] += 1
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('last_pull', ?)", (str(time.time()),))
+            self._version += 1
+        return counts
+
+    def _set_base(self, tid: str, base: Dict) -> None:
+        self._conn.execute("UPDATE tasks SET base = ? WHERE id = ?", (json.dumps(base, ensure_ascii=False), tid))
+
+    def dirty_rows(self) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, task, due, done, tag, ord, deleted, base, version FROM tasks WHERE dirty = 1"
+            ).fetchall()
+
+    def mark_synced(self, rows: Sequence[Tuple], missing: Iterable[str]) -> None:
+        """送った行を同期済みにする（送っている間に変わった行は未送信のまま残す）"""
+        missing = set(missing)
+        with self._lock, self._tx():
+            for tid, task, due, done, tag, ord_, deleted, _base, version in rows:
+                if deleted:
+                    self._conn.execute("DELETE FROM tasks WHERE id = ? AND version = ?", (tid, version))
+                elif tid in missing:
+                    # シートで消されていた: 次の回に追加として送る
+                    self._conn.execute("UPDATE tasks SET base = NULL WHERE id = ?", (tid,))
+                else:
+                    # 送った値はシートに届いているので、送っている間に変わった行でも base は進める
+                    # （base が空のままだと、次の回にもう一度追加として送ってしまう）
+                    base = _fields({"task": task, "due": due, "done": bool(done), "tag": tag, "order": ord_})
+                    self._set_base(tid, base)
+                    self._conn.execute("UPDATE tasks SET dirty = 0 WHERE id = ? AND version = ?", (tid, version))
+            self._version += 1
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT（例外なら ROLLBACK）"""
+
+    def __init__(self, conn: "sqlite3.Connection"):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def push(local: LocalStore, ws) -> int:
+    """未送信の行をまとめてシートへ送る。送った行数を返す
+
+    更新・削除は最初の 1 回にまとめ、追加は import_batches の分割ごとに送る。
+    分割ごとに同期済みにするので、途中で失敗しても次の回は続きから送る。
+    """
+    rows = local.dirty_rows()
+    if not rows:
+        return 0
+    inserts, updates, deletes = [], {}, []
+    added, others = [], []  # 追加の行 / それ以外の行（mark_synced に渡す）
+    for row in rows:
+        tid, task, due, done, tag, ord_, deleted, base, _version = row
+        f = _fields({"task": task, "due": due, "done": bool(done), "tag": tag, "order": ord_})
+        if deleted:
+            deletes.append(tid)
+        elif base is None:
+            inserts.append({**f, "id": tid})
+            added.append(row)
+            continue
+        else:
+            old = json.loads(base)
+            changed = {k: v for k, v in f.items() if old.get(k) != v}
+            if changed:
+                updates[tid] = changed
+        others.append(row)
+    batches = import_batches([task_to_row(t) for t in inserts]) if inserts else [range(0)]
+    for n, b in enumerate(batches):
+        first = n == 0
+        missing = apply_mutations(ws, inserts[b.start:b.stop], updates if first else {}, deletes if first else [])
+        local.mark_synced((others if first else []) + added[b.start:b.stop], missing)
+    return len(rows)
+
+
+class SyncWorker:
+    """裏で pull -> push をくり返すスレッド（失敗したら間隔を延ばして再試行）"""
+
+    def __init__(self, local: LocalStore, ws, interval: float = SYNC_INTERVAL_SEC):
+        self.local = local
+        self.ws = ws
+        self.interval = interval
+        self.stats = {"syncs": 0, "pulled": 0, "pushed": 0, "conflicts": 0, "errors": 0, "last_error": ""}
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="todo-sync", daemon=True)
+            self._thread.start()
+
+    def kick(self) -> None:
+        """すぐに 1 回同期する（書き込んだ直後など）"""
+        self._wake.set()
+
+    def sync_once(self, replace: bool = False) -> None:
+        with self._lock:
+            counts = self.local.pull(load_data(self.ws, ttl=0 if replace else None), replace=replace)
+            self.stats["pulled"] += counts["pulled"]
+            self.stats["conflicts"] += counts["conflicts"]
+            self.stats["pushed"] += push(self.local, self.ws)
+            self.stats["syncs"] += 1
+
+    def _loop(self) -> None:
+        delay = self.interval
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                with background():  # 画面からの読み書きを先に通す
+                    self.sync_once()
+                delay = self.interval
+            except Exception as e:  # シートが使えない間も画面は手元の SQLite で動き続ける
+                self.stats["errors"] += 1
+                self.stats["last_error"] = f"{type(e).__name__}: {e}"
+                delay = min(delay * 2, MAX_BACKOFF_SEC)
+
+
+class LocalFirst:
+    """画面から使う窓口（TaskStore の読み込みと、queue.flush / 振り直しの書き込み先）"""
+
+    def __init__(self, path: str, ws, interval: float = SYNC_INTERVAL_SEC):
+        self.store = LocalStore(path)
+        self.worker = SyncWorker(self.store, ws, interval)
+        if self.store.meta("last_pull") is None:
+            # 初回だけはシートの内容を取り込んでから表示する
+            self.worker.sync_once()
+        self.worker.start()
+
+    def load(self) -> TaskStore:
+        return self.store.load()
+
+    def apply_mutations(self, inserts, updates, deletes) -> List[str]:
+        missing = self.store.apply_mutations(inserts, updates, deletes)
+        self.worker.kick()
+        FEED.publish(self.worker.ws)  # 同じ DB を見ている他の画面に知らせる
+        return missing
+
+    def replace_from_sheet(self) -> None:
+        """シートを丸ごと書き換えた後（復元など）。手元の未送信分は捨ててシートに合わせる"""
+        self.worker.sync_once(replace=True)
+
+    @property
+    def stats(self) -> Dict:
+        return {**self.worker.stats, "pending": self.store.pending()}
+
+
+def apply_local(local: LocalFirst, inserts, updates, deletes) -> List[str]:
+    """WriteBehindQueue の書き込み関数（todo_sheet.apply_mutations の代わり）"""
+    return local.apply_mutations(inserts, updates, deletes)
+
+
+def rebalance_local(local: LocalFirst, store: TaskStore, order: Optional[Sequence[int]] = None) -> None:
+    """todo_sheet.rebalance_orders のローカル版（順序キーを振り直して SQLite に書く）"""
+    if order is None:
+        order = sorted(range(len(store)), key=lambda i: (store.orders[i], store.ids[i]))
+    for i, rank in zip(order, initial_ranks(len(order))):
+        store.orders[i] = rank
+    local.store.write_orders(zip(store.ids, store.orders))
+    local.worker.kick()
+
+
+_LOCALS: Dict[str, LocalFirst] = {}
+_LOCALS_LOCK = threading.Lock()
+
+
+def get_local_first(path: str, ws) -> LocalFirst:
+    """プロセスで DB ファイルごとに 1 つ（同期スレッドも 1 本）"""
+    with _LOCALS_LOCK:
+        if path not in _LOCALS:
+            _LOCALS[path] = LocalFirst(path, ws)
+        return _LOCALS[path]
@@ -0,0 +1,74 @@
+# todo_profile
+"""起動・初回描画のプロファイル（スクリプト 1 回の実行を区間に分けて計る）
+
+TODO_PROFILE=1（または URL の ?profile=1）のとき、アプリは次の区間の時間を出す。
+- import     : モジュールの読み込み。プロセスで最初の実行（コールドスタート）だけ大きい
+- first_paint: 実行の開始から最初の要素（タイトル）を出すまで（区間ではなく時刻）
+- auth       : バックエンドへの接続（認証・クライアント作成・ワークシートの取得）
+- load       : 一覧の読み込み（シート or ローカルの SQLite）
+- render     : 残り（画面の組み立て）
+TODO_PROFILE_LOG を設定すると、1 実行 1 行の JSON でそのファイルに追記する
+（バージョン間の比較は bench/bench_startup.py）。
+
+Streamlit に依存しないので、アプリの先頭（他の import より前）で読み込む。
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+PROFILE_ENV = "TODO_PROFILE"
+PROFILE_LOG_ENV = "TODO_PROFILE_LOG"
+PHASES = ["import", "auth", "load", "render"]
+HISTORY_KEPT = 20
+
+_lock = threading.Lock()
+_runs = 0  # このプロセスで始めた実行の数（最初の 1 回がコールドスタート）
+HISTORY: deque = deque(maxlen=HISTORY_KEPT)  # 終わった実行の結果（プロセス内で共有）
+
+
+def enabled(flag: Optional[str] = None) -> bool:
+    """flag（URL の ?profile= など）か環境変数で有効にする"""
+    value = flag if flag else os.environ.get(PROFILE_ENV, "")
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class RunProfile:
+    """区間は lap で区切る（前の lap から今までがその区間）。finish で残りを render にする"""
+
+    def __init__(self, version: str):
+        global _runs
+        self.version = version
+        self.started = self._last = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+        with _lock:
+            self.cold = _runs == 0
+            _runs += 1
+
+    def lap(self, name: str) -> None:
+        now = time.perf_counter()
+        self.marks[name] = self.marks.get(name, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def mark(self, name: str) -> None:
+        """開始からの時刻を残す（区間は区切らない）"""
+        self.marks[name] = (time.perf_counter() - self.started) * 1000
+
+    def finish(self) -> Dict:
+        self.lap("render")
+        result = {"version": self.version, "cold": self.cold, "ts": time.time()}
+        result.update({k: round(v, 1) for k, v in self.marks.items()})
+        result["total"] = round((self._last - self.started) * 1000, 1)
+        HISTORY.append(result)
+        path = os.environ.get(PROFILE_LOG_ENV)
+        if path:
+            with _lock, open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return result
+
+
+def history() -> List[Dict]:
+    return list(HISTORY)
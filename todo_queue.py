@@ -0,0 +1,180 @@
+# todo_queue
+"""セッションごとの書き込み待ち行列（write-behind）
+
+画面の操作はまずこの行列に積み、画面にはすぐ反映する（楽観的更新）。
+最後の操作から debounce 秒たつか、件数が上限に達したら、溜まった分を
+todo_sheet.apply_mutations でまとめてシートへ送る。
+同じ行への書き込みは 1 件にまとめる（チェックを 5 回切り替えても送るのは 1 セル）。
+write_through を設定すると（ローカル優先モードの SQLite）、溜めずに積んだその場で送る。
+
+インスタンスは st.session_state に置くので、リランしても中身は消えない。
+"""
+
+import contextlib
+import threading
+import time
+from typing import Callable, Dict, Iterable, List
+
+from todo_feed import origin as feed_origin
+from todo_sheet import apply_mutations
+from todo_store import TaskStore
+
+DEFAULT_DEBOUNCE_SEC = 1.5
+DEFAULT_MAX_PENDING = 20
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        debounce_sec: float = DEFAULT_DEBOUNCE_SEC,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        apply: Callable = apply_mutations,
+        origin: str = "",
+    ):
+        """apply は (書き込み先, inserts, updates, deletes) -> 見つからなかった ID（既定はシートへ送る）
+
+        origin は変更フィードでの送り主（セッション ID）。flush はどのコンテキストから呼ばれても
+        この送り主で書く（空なら呼び出し側のもの）。
+        """
+        self.origin = origin
+        # 積んだ直後に送る書き込み先（None なら溜めて flush を待つ）
+        self.write_through = None
+        self.debounce_sec = debounce_sec
+        self.max_pending = max_pending
+        self._apply = apply
+        self._inserts: Dict[str, Dict] = {}
+        self._updates: Dict[str, Dict] = {}
+        self._deletes: Dict[str, None] = {}  # 順序付き集合として使う
+        self._last = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"queued": 0, "merged": 0, "flushes": 0, "written": 0}
+
+    def __len__(self) -> int:
+        return len(self._inserts) + len(self._updates) + len(self._deletes)
+
+    def _touch(self) -> None:
+        self._last = time.monotonic()
+        self.stats["queued"] += 1
+
+    # --- 積む ---
+    def insert(self, task: Dict) -> None:
+        with self._lock:
+            self._inserts[task["id"]] = dict(task)
+            self._touch()
+        self._send_now()
+
+    def update(self, task_id: str, fields: Dict) -> None:
+        with self._lock:
+            self._touch()
+            self._update(task_id, fields)
+        self._send_now()
+
+    def update_many(self, updates: Dict[str, Dict]) -> None:
+        """まとめて積む（一括操作用。途中で flush に割り込まれないので、1 回で送られる）"""
+        with self._lock:
+            self._touch()
+            for tid, fields in updates.items():
+                self._update(tid, fields)
+        self._send_now()
+
+    def _update(self, task_id: str, fields: Dict) -> None:
+        if task_id in self._deletes:
+            return
+        if task_id in self._inserts:
+            self._inserts[task_id].update(fields)
+            self.stats["merged"] += 1
+        elif task_id in self._updates:
+            self._updates[task_id].update(fields)
+            self.stats["merged"] += 1
+        else:
+            self._updates[task_id] = dict(fields)
+
+    def delete(self, task_id: str) -> None:
+        self.delete_many([task_id])
+
+    def delete_many(self, task_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._touch()
+            for tid in task_ids:
+                if self._inserts.pop(tid, None) is not None:
+                    # まだ送っていない追加なら、追加ごと取り消すだけ
+                    self.stats["merged"] += 1
+                    continue
+                self._updates.pop(tid, None)
+                self._deletes[tid] = None
+        self._send_now()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._inserts.clear()
+            self._updates.clear()
+            self._deletes.clear()
+
+    # --- 画面用 ---
+    def apply(self, store: TaskStore) -> TaskStore:
+        """読み込んだ一覧に未送信の変更を重ねる（store をその場で書き換えて返す）"""
+        with self._lock:
+            store.remove(self._deletes)
+            for tid, fields in self._updates.items():
+                try:
+                    store.set(store.index_of(tid), fields)
+                except KeyError:
+                    pass
+            for tid, t in self._inserts.items():
+                try:
+                    store.set(store.index_of(tid), t)
+                except KeyError:
+                    store.append(t)
+            reorder = bool(self._inserts) or any("order" in f for f in self._updates.values())
+        if reorder:
+            store.sort_by_order()
+        return store
+
+    # --- 送る ---
+    def due(self) -> bool:
+        n = len(self)
+        return n > 0 and (n >= self.max_pending or time.monotonic() - self._last >= self.debounce_sec)
+
+    def _send_now(self) -> None:
+        if self.write_through is None:
+            return
+        try:
+            self.flush(self.write_through)
+        except Exception:
+            pass  # 行列に戻っているので、次の flush（_write_status）で再送する
+
+    def flush(self, target) -> List[str]:
+        """溜まった変更をまとめて送る。シート上に見つからなかった ID を返す
+
+        送信に失敗したら変更を行列に戻して例外を投げる（次の flush で再送）。
+        """
+        with self._lock:
+            inserts, updates, deletes = self._inserts, self._updates, self._deletes
+            self._inserts, self._updates, self._deletes = {}, {}, {}
+        if not (inserts or updates or deletes):
+            return []
+        try:
+            with feed_origin(self.origin) if self.origin else contextlib.nullcontext():
+                missing = self._apply(target, list(inserts.values()), updates, list(deletes))
+        except Exception:
+            self._restore(inserts, updates, deletes)
+            raise
+        self.stats["flushes"] += 1
+        self.stats["written"] += len(inserts) + len(updates) + len(deletes)
+        return missing
+
+    def _restore(self, inserts: Dict, updates: Dict, deletes: Dict) -> None:
+        """送れなかった変更を戻す（その間に積まれた新しい変更を優先）"""
+        with self._lock:
+            for tid, t in inserts.items():
+                if tid in self._deletes:
+                    # 送れなかった追加がその後削除された: どちらも送らない
+                    del self._deletes[tid]
+                    continue
+                self._inserts[tid] = {**t, **self._updates.pop(tid, {})}
+            for tid, f in updates.items():
+                if tid not in self._deletes:
+                    self._updates[tid] = {**f, **self._updates.get(tid, {})}
+            for tid in deletes:
+                self._updates.pop(tid, None)
+                self._deletes[tid] = None
@@ -0,0 +1,242 @@
+# todo_quota
+"""Sheets API のクォータ管理（プロセス共有のトークンバケット + 再試行）
+
+サービスアカウントは全セッションで共通なので、1 分あたりの上限（読み取り・書き込み
+それぞれ 60 回/ユーザー）もプロセス全体で分け合う。
+- ワークシートの呼び出しは LimitedWorksheet を通し、読み取り/書き込みのバケットから
+  トークンを 1 つ取ってから送る（足りなければ待つ）
+- 画面操作（interactive）を優先し、裏の同期（background）は予備分を残して使う
+- 429 / 5xx は指数バックオフ（ジッター付き）で再試行する。ただし繰り返すと結果が変わる書き込み
+  （行の追加・削除、スプレッドシートの batchUpdate など）は 429 だけを再試行する。5xx は
+  反映済みのあとで返ることがあり、送り直すと行が二重になったり別の行を消したりするため
+- 使用状況は QUOTA.snapshot() で見られる（サイドバーの「接続状況」）
+"""
+
+import contextlib
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+READ_PER_MINUTE = 60
+WRITE_PER_MINUTE = 60
+BURST = 10
+BACKGROUND_RESERVE = 0.3  # 裏の処理はバケットのこの割合を画面操作用に残す
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+THROTTLE_STATUS = (429,)  # 送っていないことがはっきりしているもの
+MAX_RETRIES = 5
+BACKOFF_BASE_SEC = 1.0
+BACKOFF_MAX_SEC = 32.0
+
+READ_METHODS = frozenset({
+    "get_all_values", "get_all_records", "get_values", "batch_get", "get",
+    "col_values", "row_values", "acell", "cell", "worksheets", "worksheet",
+})
+WRITE_METHODS = frozenset({
+    "update", "batch_update", "append_row", "append_rows", "insert_row", "insert_rows",
+    "delete_rows", "clear", "batch_clear", "add_rows", "resize", "update_title",
+    "add_worksheet", "del_worksheet",
+})
+# 2 回送ると結果が変わる書き込み（429 だけを再試行する）。スプレッドシートの batch_update
+# （deleteDimension など行番号を使う要求）は _LimitedSpreadsheet で足す
+NOT_IDEMPOTENT = frozenset({
+    "append_row", "append_rows", "insert_row", "insert_rows", "delete_rows", "add_rows",
+    "add_worksheet", "del_worksheet",
+})
+# 戻り値がワークシートになるもの（これも LimitedWorksheet で包む）
+_RETURNS_WORKSHEETS = frozenset({"worksheets", "worksheet", "add_worksheet"})
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("sheets_priority", default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def background():
+    """この中の呼び出しは裏の処理として扱う（画面操作に先を譲る）"""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _status(exc: Exception) -> Optional[int]:
+    resp = getattr(exc, "response", None)
+    return getattr(resp, "status_code", None)
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """1 分あたり per_minute 回を超えないバケット
+
+    容量 burst までまとめて使えるが、どの 60 秒をとっても per_minute を超えないように
+    補充の速さを (per_minute - burst) / 60 回/秒 にしている。
+    """
+
+    def __init__(self, per_minute: int, burst: int = BURST, reserve: float = BACKGROUND_RESERVE):
+        self.per_minute = per_minute
+        self.capacity = float(burst)
+        self.rate = (per_minute - burst) / 60.0
+        self.reserve = burst * reserve
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._cond = threading.Condition()
+        self._interactive_waiting = 0
+        self._recent: deque = deque()  # 直近 60 秒に取ったトークンの時刻
+        self.stats = {"acquired": 0, "waited": 0, "wait_sec": 0.0}
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, priority: int = INTERACTIVE) -> float:
+        """トークンを 1 つ取る。待った秒数を返す"""
+        start = time.monotonic()
+        with self._cond:
+            if priority == INTERACTIVE:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    need = 1.0 if priority == INTERACTIVE else 1.0 + self.reserve
+                    blocked = priority == BACKGROUND and self._interactive_waiting > 0
+                    if self._tokens >= need and not blocked:
+                        self._tokens -= 1.0
+                        break
+                    wait = max((need - self._tokens) / self.rate, 0.01) if self.rate > 0 else 1.0
+                    self._cond.wait(min(wait, 1.0))
+            finally:
+                if priority == INTERACTIVE:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+            now = time.monotonic()
+            self._recent.append(now)
+            waited = now - start
+            self.stats["acquired"] += 1
+            if waited > 0.001:
+                self.stats["waited"] += 1
+                self.stats["wait_sec"] += waited
+            return waited
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            while self._recent and now - self._recent[0] > 60.0:
+                self._recent.popleft()
+            return {
+                "used_last_minute": len(self._recent),
+                "per_minute": self.per_minute,
+                "tokens": round(self._tokens, 2),
+                **{k: round(v, 3) if isinstance(v, float) else v for k, v in self.stats.items()},
+            }
+
+
+class QuotaLimiter:
+    def __init__(self, read_per_minute: int = READ_PER_MINUTE, write_per_minute: int = WRITE_PER_MINUTE):
+        self.buckets = {"read": TokenBucket(read_per_minute), "write": TokenBucket(write_per_minute)}
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "gave_up": 0}
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def call(self, kind: Optional[str], fn: Callable, *args, **kwargs):
+        """kind（read / write / None=数えない）のトークンを取ってから fn を呼ぶ。429 などは再試行"""
+        return self.call_retrying(RETRY_STATUS, kind, fn, *args, **kwargs)
+
+    def call_retrying(self, retry_status: tuple, kind: Optional[str], fn: Callable, *args, **kwargs):
+        """call と同じ。再試行するのは retry_status の応答だけ"""
+        priority = _priority.get()
+        for attempt in range(MAX_RETRIES + 1):
+            if kind is not None:
+                self.buckets[kind].acquire(priority)
+            self._count("calls")
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status = _status(e)
+                if status not in retry_status:
+                    raise
+                if status == 429:
+                    self._count("throttled")
+                if attempt == MAX_RETRIES:
+                    self._count("gave_up")
+                    raise
+                self._count("retries")
+                # フルジッター: 0〜上限の間でばらけさせ、複数セッションが同時に再送しないようにする
+                cap = min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * 2 ** attempt)
+                time.sleep(_retry_after(e) or self._random.uniform(0, cap))
+
+    def wrap(self, ws):
+        return ws if isinstance(ws, LimitedWorksheet) else LimitedWorksheet(ws, self)
+
+    def snapshot(self) -> Dict:
+        return {**self.stats, **{k: b.snapshot() for k, b in self.buckets.items()}}
+
+
+def _kind(name: str) -> Optional[str]:
+    if name in WRITE_METHODS:
+        return "write"
+    if name in READ_METHODS:
+        return "read"
+    return None
+
+
+class _Limited:
+    """メソッド呼び出しをクォータ管理に通す共通部分"""
+
+    _not_idempotent = NOT_IDEMPOTENT
+
+    def __init__(self, target, limiter: QuotaLimiter):
+        self._target = target
+        self._limiter = limiter
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        kind = _kind(name)
+
+        def call(*args, **kwargs):
+            retry = THROTTLE_STATUS if name in self._not_idempotent else RETRY_STATUS
+            result = self._limiter.call_retrying(retry, kind, attr, *args, **kwargs)
+            if name in _RETURNS_WORKSHEETS:
+                if isinstance(result, list):
+                    return [self._limiter.wrap(w) for w in result]
+                return self._limiter.wrap(result)
+            return result
+
+        return call
+
+
+class LimitedWorksheet(_Limited):
+    """gspread.Worksheet（または同じ形のもの）の代わりに渡すラッパー"""
+
+    @property
+    def spreadsheet(self):
+        return _LimitedSpreadsheet(self._target.spreadsheet, self._limiter)
+
+
+class _LimitedSpreadsheet(_Limited):
+    """スプレッドシート側。batch_update は行の削除・シートの入れ替えなので繰り返せない"""
+
+    _not_idempotent = NOT_IDEMPOTENT | {"batch_update"}
+
+
+QUOTA = QuotaLimiter()
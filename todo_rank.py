@@ -0,0 +1,89 @@
+# todo_rank
+"""並び順キー（辞書順で比較できる 62 進の小数）
+
+キーは 0.xxxx の小数部分を 62 進で書いた文字列。どの 2 つのキーの間にも
+必ず新しいキーを作れるので、並べ替えや間への挿入は 1 セルの書き換えで済む。
+末尾が "0" のキーは作らない（"A" と "A0" の間が空になるため）。
+"""
+
+from typing import List, Optional
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+_INDEX = {ch: i for i, ch in enumerate(DIGITS)}
+
+# これより長いキーができたら順序列全体を振り直す
+MAX_RANK_LEN = 8
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """a < b となる 2 キーの間のキー（a は "" で最小、b は None で最大）"""
+    if b is not None:
+        # 共通の先頭部分はそのまま使う（a の足りない桁は 0 とみなす）
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    da = _INDEX[a[0]] if a else 0
+    db = _INDEX[b[0]] if b is not None else BASE
+    if db - da > 1:
+        return DIGITS[(da + db) // 2]
+    # 隣り合う桁: b が 2 桁以上なら b の 1 桁目だけで a < x < b になる
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[da] + _midpoint(a[1:], None)
+
+
+def rank_between(prev: Optional[str], next_: Optional[str]) -> str:
+    """prev と next_ の間に並ぶキー（None/"" は先頭・末尾）"""
+    a = prev or ""
+    b = next_ or None
+    if b is not None and a >= b:
+        raise ValueError(f"rank order broken: {prev!r} >= {next_!r}")
+    return _midpoint(a, b)
+
+
+def initial_ranks(n: int) -> List[str]:
+    """n 個のキーを等間隔に振る（振り直し・移行用）"""
+    if n <= 0:
+        return []
+    width = 1
+    while BASE ** width <= n:
+        width += 1
+    step = BASE ** width // (n + 1)
+    ranks = []
+    for i in range(1, n + 1):
+        v = i * step
+        digits = []
+        for _ in range(width):
+            v, rem = divmod(v, BASE)
+            digits.append(DIGITS[rem])
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+    return ranks
+
+
+def ranks_after(prev: Optional[str], n: int) -> List[str]:
+    """prev より後ろに n 個のキーを等間隔に振る（末尾への一括追加用。1 つずつ rank_between で
+    足すとキーが伸び続けるため）"""
+    if n <= 0:
+        return []
+    prev = prev or ""
+    width = max(len(prev), 1)
+    while True:
+        p = 0
+        for ch in prev[:width].ljust(width, "0"):
+            p = p * BASE + _INDEX[ch]
+        step = (BASE ** width - p) // (n + 1)
+        if step >= 1:
+            break
+        width += 1
+    ranks = []
+    for i in range(1, n + 1):
+        v = p + i * step
+        digits = []
+        for _ in range(width):
+            v, rem = divmod(v, BASE)
+            digits.append(DIGITS[rem])
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+    return ranks
@@ -0,0 +1,291 @@
+# todo_restore
+"""バックアップからの復元（読み込み -> 検証 -> 差分確認 -> 分割書き込み）
+
+- 読み込み : xlsx は openpyxl の read_only モードで 1 行ずつ、csv / jsonl(.gz) も逐次
+- 検証     : 列名の読み替え・締切日/完了の正規化・ID の採番と重複チェックを 1 回の走査で
+- 差分確認 : 今のシートと ID で突き合わせ、追加・変更・削除の件数を先に見せる
+- 書き込み : まず作業用シートに全行を書き終えてから、1 回の batchUpdate で本番シートと
+             入れ替える（本番を先に消すことはない）。作業用シートへの送信は CHUNK_BYTES 以下に
+             分け、書き込みの間隔も空ける。
+             途中で失敗しても RestoreJob.run をもう一度呼べば続きから再開する。
+"""
+
+import csv
+import gzip
+import io
+import json
+import time
+from datetime import date, datetime
+from typing import IO, Callable, Iterator, List, NamedTuple, Optional, Sequence
+
+from todo_rank import initial_ranks
+from todo_sheet import HEADERS, a1_range, column_index, new_task_id, note_write, swap_from_staging
+from todo_store import BAD_DUE, TaskStore, parse_done, parse_due
+
+STAGING_SUFFIX = "__restore"
+CHUNK_BYTES = 1_000_000  # 1 リクエストの目安（API の推奨上限 2MB より小さく）
+WRITE_INTERVAL_SEC = 1.0  # 書き込みの最小間隔（1 分あたり 60 リクエストの上限に収める）
+EMPTY_STRINGS = ("", "nan", "NaT", "None")
+
+
+class Issue(NamedTuple):
+    line: int  # ファイル上の行番号（ヘッダーが 1 行目）
+    message: str
+
+
+class RestoreData(NamedTuple):
+    rows: List[List[str]]  # シートの行（HEADERS の順、ヘッダーは含まない）
+    issues: List[Issue]
+
+
+class RestoreDiff(NamedTuple):
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+    unchanged: int
+
+
+# ======= 読み込み（ファイル形式ごとに、ヘッダー行から 1 行ずつ返す） =======
+def iter_xlsx_rows(fp: IO[bytes]) -> Iterator[Sequence]:
+    from openpyxl import load_workbook  # 使うときだけ読み込む
+
+    wb = load_workbook(fp, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def iter_csv_rows(fp: IO[bytes], delimiter: str = ",") -> Iterator[Sequence]:
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(text, delimiter=delimiter)
+    finally:
+        text.detach()
+
+
+def iter_jsonl_rows(fp: IO[bytes]) -> Iterator[Sequence]:
+    header: Optional[List[str]] = None
+    for line in fp:
+        line = line.strip()
+        if not line:
+            continue
+        obj = json.loads(line)
+        if header is None:
+            header = list(obj)
+            yield header
+        yield [obj.get(k) for k in header]
+
+
+def iter_backup_rows(name: str, fp: IO[bytes]) -> Iterator[Sequence]:
+    """ファイル名の拡張子で読み方を選ぶ"""
+    name = name.lower()
+    if name.endswith(".xlsx"):
+        return iter_xlsx_rows(fp)
+    if name.endswith(".csv"):
+        return iter_csv_rows(fp)
+    if name.endswith(".jsonl.gz"):
+        return iter_jsonl_rows(gzip.GzipFile(fileobj=fp, mode="rb"))
+    if name.endswith(".jsonl"):
+        return iter_jsonl_rows(fp)
+    raise ValueError(f"対応していない形式です: {name}")
+
+
+# ======= 検証・正規化（1 回の走査） =======
+def _text(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)  # Excel が数値として読んだ ID など
+    s = str(v).strip()
+    return "" if s in EMPTY_STRINGS else s
+
+
+def _due(v) -> str:
+    if isinstance(v, datetime):
+        return v.date().isoformat()
+    if isinstance(v, date):
+        return v.isoformat()
+    s = _text(v)
+    return s[:10] if parse_due(s[:10]) > 0 else s
+
+
+def iter_normalized(rows: Iterator[Sequence], issues: List[Issue]) -> Iterator[List[str]]:
+    """ヘッダー付きの行 -> シートに書く行（順序キーは空）を 1 行ずつ。注意点は issues に足す
+
+    列名は読み込み時と同じ読み替え（日本語 / 英語）。空行は飛ばし、タスクが空の行は
+    取り込まない。ID がない・重複している行には新しい ID を振る。
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("ファイルが空です")
+    index = column_index([_text(h) for h in header])
+    if "task" not in index:
+        raise ValueError("「タスク」列が見つかりません")
+    c_task, c_due, c_done, c_tag, c_id = (index.get(f) for f in ("task", "due", "done", "tag", "id"))
+
+    seen = set()
+    for line, row in enumerate(rows, start=2):
+        n = len(row)
+
+        def cell(c):
+            return row[c] if c is not None and c < n else None
+
+        if not any(_text(v) for v in row):
+            continue
+        task = _text(cell(c_task))
+        if not task:
+            issues.append(Issue(line, "タスクが空なので取り込みません"))
+            continue
+        due = _due(cell(c_due))
+        if parse_due(due) == BAD_DUE:
+            issues.append(Issue(line, f"締切日を日付として読めません: {due}"))
+        done = cell(c_done)
+        done = done if isinstance(done, bool) else parse_done(_text(done))
+        tag = _text(cell(c_tag)) if c_tag is not None else "未設定"
+        task_id = _text(cell(c_id))
+        if task_id in seen:
+            issues.append(Issue(line, f"ID が重複しているので振り直します: {task_id}"))
+            task_id = ""
+        task_id = task_id or new_task_id()
+        seen.add(task_id)
+        yield [task, due, str(done), tag, task_id, ""]
+
+
+def normalize_rows(rows: Iterator[Sequence]) -> RestoreData:
+    """ヘッダー付きの行 -> シートに書く行と注意点の一覧（順序キーはファイルの並び順）"""
+    issues: List[Issue] = []
+    out = list(iter_normalized(rows, issues))
+    for row, rank in zip(out, initial_ranks(len(out))):
+        row[5] = rank
+    return RestoreData(out, issues)
+
+
+def read_backup(name: str, fp: IO[bytes]) -> RestoreData:
+    return normalize_rows(iter_backup_rows(name, fp))
+
+
+# ======= 差分（ドライラン） =======
+def diff_restore(store: TaskStore, data: RestoreData) -> RestoreDiff:
+    """今の一覧と復元内容を ID で突き合わせる（順序の違いは数えない）"""
+    current = {store.ids[i]: i for i in range(len(store))}
+    added, changed = [], []
+    unchanged = 0
+    for row in data.rows:
+        i = current.pop(row[4], None)
+        if i is None:
+            added.append(row[4])
+        elif store.sheet_row(i)[:4] != row[:4]:
+            changed.append(row[4])
+        else:
+            unchanged += 1
+    return RestoreDiff(added, changed, list(current), unchanged)
+
+
+# ======= 書き込み =======
+def chunk_bounds(rows: List[List[str]], max_bytes: int = CHUNK_BYTES) -> List[range]:
+    """1 回の送信が max_bytes 以下になるように行を分ける（JSON 換算のおおよその大きさ）"""
+    chunks = []
+    start, size = 0, 0
+    for i, row in enumerate(rows):
+        n = sum(len(v.encode("utf-8")) + 4 for v in row) + 2
+        if size + n > max_bytes and i > start:
+            chunks.append(range(start, i))
+            start, size = i, 0
+        size += n
+    if start < len(rows) or not chunks:
+        chunks.append(range(start, len(rows)))
+    return chunks
+
+
+def staging_worksheet(ws, rows: int = 1, create: bool = True):
+    """作業用シート（本番シート名 + STAGING_SUFFIX）。なければ rows 行で作る"""
+    title = ws.title + STAGING_SUFFIX
+    for w in ws.spreadsheet.worksheets():
+        if w.title == title:
+            return w
+    if not create:
+        return None
+    return ws.spreadsheet.add_worksheet(title=title, rows=rows, cols=len(HEADERS))
+
+
+def _ensure_rows(target, rows: int) -> None:
+    """update はシートの行数を超えて書けないので、足りなければ先に行を足す"""
+    if target.row_count < rows:
+        target.add_rows(rows - target.row_count)
+
+
+class RestoreJob:
+    """検証済みの行をシートへ書き込む作業
+
+    段階: 作業用シートへ分割して書く -> 1 回の batchUpdate で本番シートと入れ替える
+    （todo_sheet.swap_from_staging。作業用シートもそこで消える）。
+    本番シートは入れ替えの瞬間まで元のままなので、途中で失敗しても読み手に半端な状態は見えない。
+    各分割の進み具合を持っているので、失敗したら run をもう一度呼べば続きから書く。
+    インスタンスは st.session_state に置く。
+    """
+
+    def __init__(self, rows: List[List[str]], chunk_bytes: int = CHUNK_BYTES, interval: float = WRITE_INTERVAL_SEC):
+        self.rows = rows
+        self.chunks = chunk_bounds(rows, chunk_bytes)
+        self.interval = interval
+        self.staged = 0  # 作業用シートに書き終えた分割の数
+        self.finished = False
+        self._last = 0.0
+
+    @property
+    def total_steps(self) -> int:
+        return len(self.chunks) + 1
+
+    def progress(self) -> float:
+        return (self.staged + int(self.finished)) / self.total_steps
+
+    def describe(self) -> str:
+        swapped = "済" if self.finished else "未"
+        return f"作業用シート {self.staged}/{len(self.chunks)}、入れ替え {swapped}"
+
+    def _pace(self) -> None:
+        wait = self._last + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last = time.monotonic()
+
+    def _write_chunk(self, target, k: int) -> None:
+        chunk = self.chunks[k]
+        values = self.rows[chunk.start:chunk.stop]
+        first = chunk.start + 2  # 1 行目はヘッダー
+        if k == 0:
+            values = [list(HEADERS)] + values
+            first = 1
+        self._pace()
+        if values:
+            target.update(range_name=a1_range(first, 1, first + len(values) - 1, len(HEADERS)), values=values)
+
+    def run(self, ws, progress: Optional[Callable[[float], None]] = None) -> None:
+        def step():
+            if progress is not None:
+                progress(self.progress())
+
+        # 1) 作業用シートに全行を書く（本番シートにはまだ触らない）
+        staging = None
+        if self.staged < len(self.chunks):
+            staging = staging_worksheet(ws, len(self.rows) + 1)
+            _ensure_rows(staging, len(self.rows) + 1)
+            while self.staged < len(self.chunks):
+                self._write_chunk(staging, self.staged)
+                self.staged += 1
+                step()
+
+        # 2) 本番シートと入れ替える（行数・値・作業用シートの削除を 1 回で）
+        if staging is None:
+            staging = staging_worksheet(ws, create=False)
+        try:
+            # 作業用シートがもうなければ、前回の入れ替えは届いていた（応答だけ失われた）
+            if staging is not None:
+                self._pace()
+                swap_from_staging(ws, staging, len(self.rows) + 1)
+        finally:
+            note_write(ws)
+        self.finished = True
+        step()
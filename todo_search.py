@@ -0,0 +1,140 @@
+# todo_search
+"""タスク本文の検索索引（文字 2-gram の転置索引）と属性・完了の集計
+
+日本語は単語の区切りがないので、本文を NFKC で正規化・小文字化し、空白で区切った
+かたまりごとに文字 2-gram（1 文字だけのかたまりはその 1 文字）に分けて索引にする。
+検索語も同じく分け、すべての gram を含むタスクを候補にしてから本文で確かめる
+（gram の並びまでは見ていないので、確かめないと余計なものが混ざる）。
+
+TaskStore が持ち、変更のたびに差分で更新する（todo_store の締切日索引と同じ）。
+コピーは中身を共有し、書き換えるときに書き換える部分だけを複製する。
+リランごとに一覧をコピーしても索引は作り直さない。
+"""
+
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+GRAM = 2
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def grams(text: str) -> Set[str]:
+    """正規化済みの text の gram"""
+    out: Set[str] = set()
+    for chunk in text.split():
+        if len(chunk) < GRAM:
+            out.add(chunk)
+        else:
+            out.update(chunk[k:k + GRAM] for k in range(len(chunk) - GRAM + 1))
+    return out
+
+
+def query_terms(query: str) -> List[str]:
+    return normalize(query).split()
+
+
+class SearchIndex:
+    """gram -> タスク ID、属性（番号）-> タスク ID、完了のタスク ID"""
+
+    __slots__ = ("_grams", "_tags", "_done", "_owned")
+
+    def __init__(self):
+        self._grams: Dict[str, Set[str]] = {}
+        self._tags: Dict[int, Set[str]] = {}
+        self._done: Set[str] = set()
+        # 自分だけが持っている（書き換えてよい）もの。コピーの直後は空（すべて共有）
+        self._owned: Set = {"grams", "tags", "done"}
+
+    def copy(self) -> "SearchIndex":
+        other = SearchIndex.__new__(SearchIndex)
+        other._grams, other._tags, other._done = self._grams, self._tags, self._done
+        other._owned = set()
+        self._owned = set()  # 元のほうも、次に書き換えるときは複製してから
+        return other
+
+    # --- 書き換え（共有している部分は複製してから） ---
+    def _posting(self, table: str, key) -> Set[str]:
+        if table not in self._owned:
+            setattr(self, "_" + table, dict(getattr(self, "_" + table)))
+            self._owned.add(table)
+        d = getattr(self, "_" + table)
+        owned_key = (table, key)
+        if owned_key not in self._owned:
+            d[key] = set(d.get(key, ()))
+            self._owned.add(owned_key)
+        return d[key]
+
+    def _done_set(self) -> Set[str]:
+        if "done" not in self._owned:
+            self._done = set(self._done)
+            self._owned.add("done")
+        return self._done
+
+    def add(self, tid: str, text: str, tag: int, done: bool) -> None:
+        for g in grams(normalize(text)):
+            self._posting("grams", g).add(tid)
+        self._posting("tags", tag).add(tid)
+        if done:
+            self._done_set().add(tid)
+
+    def discard(self, tid: str, text: str, tag: int, done: bool) -> None:
+        for g in grams(normalize(text)):
+            posting = self._posting("grams", g)
+            posting.discard(tid)
+            if not posting:
+                del self._grams[g]
+                self._owned.discard(("grams", g))
+        self._posting("tags", tag).discard(tid)
+        if done:
+            self._done_set().discard(tid)
+
+    # --- 読み出し ---
+    def candidates(self, terms: Iterable[str]) -> Optional[Set[str]]:
+        """すべての語の gram を含むタスク ID（語がなければ None = 絞り込まない）
+
+        1 文字の語は gram で引けない（2-gram の一部）ので、ここでは絞り込まず呼び出し側で確かめる。
+        """
+        postings = []
+        for term in terms:
+            for g in grams(term) if len(term) >= GRAM else ():
+                p = self._grams.get(g)
+                if p is None:
+                    return set()
+                postings.append(p)
+        if not postings:
+            return None
+        postings.sort(key=len)
+        out = set(postings[0])
+        for p in postings[1:]:
+            out &= p
+            if not out:
+                break
+        return out
+
+    def tagged(self, tags: Iterable[int]) -> Set[str]:
+        out: Set[str] = set()
+        for t in tags:
+            out |= self._tags.get(t, set())
+        return out
+
+    @property
+    def done(self) -> Set[str]:
+        return self._done
+
+    def tag_counts(self, within: Optional[Set[str]] = None, hide_done: bool = False) -> Dict[int, int]:
+        """属性（番号）ごとの件数。within（絞り込んだ結果）を渡すとその中だけを数える
+
+        within がなければ索引の集合の大きさだけで済む（hide_done なら完了の分を引く）。
+        """
+        counts = {}
+        for tag, ids in self._tags.items():
+            if within is not None:
+                n = len(ids & within)  # 小さいほうを回す
+            else:
+                n = len(ids) - (len(ids & self._done) if hide_done else 0)
+            if n:
+                counts[tag] = n
+        return counts
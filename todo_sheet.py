@@ -0,0 +1,573 @@
+# todo_sheet
+"""Google Sheets 読み書きエンジン（差分保存・行単位操作）
+
+追加・セル更新・削除は apply_mutations でまとめて送る。更新は変わったセルだけを
+1 回の ``update`` / ``batch_update`` で送る（同じ行のセルは 1 つの範囲にまとめる）。
+
+全体を置き換えるとき（復元）は作業用シートに書いてから
+1 回の batchUpdate で本番シートへ写す（swap_from_staging）。読み手には
+置き換え前か後のどちらかしか見えず、API 回数は件数によらず一定。
+
+書き込みはすべて note_write を通り、変更フィード（todo_feed）に「何を変えたか」を残す。
+読み込み側はそれを使って、他の画面の変更を全行の取り直しなしで一覧に当てる。
+
+追加・編集・削除・移動は、タスク ID で行を特定して
+その行（のセル）だけを操作する。表示順はシート上の行の並びではなく
+順序列（todo_rank のキー）で決まるので、移動は 1 セルの書き換えで済む。
+"""
+
+import uuid
+from datetime import date
+from typing import List, Dict, Optional, Sequence, Tuple
+
+from todo_cache import TASK_CACHE, cache_key
+from todo_feed import ADD, DEL, FEED, SET, Delta
+from todo_rank import MAX_RANK_LEN, initial_ranks, rank_between
+from todo_store import TaskStore, parse_done
+
+# 日本語列を正とするヘッダー
+HEADERS = ["タスク", "締切日", "完了", "属性", "ID", "順序", "完了日"]
+# 内部キー -> 列番号（1 始まり）
+FIELD_COLUMNS = {"task": 1, "due": 2, "done": 3, "tag": 4, "id": 5, "order": 6, "done_at": 7}
+ID_COLUMN = FIELD_COLUMNS["id"]
+ORDER_COLUMN = FIELD_COLUMNS["order"]
+DONE_AT_COLUMN = FIELD_COLUMNS["done_at"]
+
+
+# ======= A1 表記 =======
+def _col_letter(col: int) -> str:
+    """1 始まりの列番号 -> 列記号（1 -> A, 27 -> AA）"""
+    s = ""
+    while col > 0:
+        col, rem = divmod(col - 1, 26)
+        s = chr(65 + rem) + s
+    return s
+
+
+def a1_range(row1: int, col1: int, row2: int, col2: int) -> str:
+    return f"{_col_letter(col1)}{row1}:{_col_letter(col2)}{row2}"
+
+
+# ======= 行 <-> タスク =======
+def task_to_row(t: Dict) -> List[str]:
+    """内部キー(task/due/done/tag/id/order/done_at) -> シートの 1 行（文字列）"""
+    return [
+        str(t.get("task", "")),
+        str(t.get("due", "")),
+        str(bool(t.get("done", False))),
+        str(t.get("tag", "未設定")),
+        str(t.get("id", "")),
+        str(t.get("order", "")),
+        str(t.get("done_at", "")),
+    ]
+
+
+def stamp_done(fields: Dict, today: Optional[date] = None) -> Dict:
+    """完了を書き換えるときは完了日（アーカイブの判定に使う）も一緒に書く
+
+    完了なら今日、未完了に戻したら空。完了日を明示していればそのまま。
+    TaskStore は完了日を持たないので、シートに送る直前（apply_mutations）で付ける。
+    同じ行のセルは _cell_ranges で 1 範囲になるので、完了の切り替えは書き込み 1 範囲のまま。
+    """
+    if "done" not in fields or "done_at" in fields:
+        return fields
+    done = parse_done(fields["done"]) if isinstance(fields["done"], str) else bool(fields["done"])
+    return {**fields, "done_at": (today or date.today()).isoformat() if done else ""}
+
+
+def _cell_value(field: str, value) -> str:
+    return str(bool(value)) if field == "done" else str(value)
+
+
+def new_task_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _fit(row: List, width: int) -> List[str]:
+    """行を width 列に揃える（足りない分は空文字、はみ出しは無視）"""
+    row = ["" if v is None else str(v) for v in row[:width]]
+    return row + [""] * (width - len(row))
+
+
+# ======= 範囲の書き込み =======
+def write_ranges(ws, ranges: List[Tuple[str, List[List[Optional[str]]]]]) -> None:
+    """[(A1範囲, 値の2次元リスト)] を API 呼び出し 1 回（なければ 0 回）で送る"""
+    if not ranges:
+        return
+    if len(ranges) == 1:
+        rng, values = ranges[0]
+        ws.update(range_name=rng, values=values)
+    else:
+        ws.batch_update([{"range": rng, "values": values} for rng, values in ranges])
+
+
+# ======= 読み書き（日本語列を正として統一） =======
+# 内部キー -> 受け付ける列名（日本語が正、英語は旧形式）
+COLUMN_ALIASES = {
+    "task": ("タスク", "task"),
+    "due": ("締切日", "due"),
+    "done": ("完了", "done"),
+    "tag": ("属性", "tag"),
+    "id": ("ID", "id"),
+    "order": ("順序", "order"),
+    "done_at": ("完了日", "done_at"),
+}
+_FIELDS = ("task", "due", "done", "tag", "id", "order")
+# 列そのものがないときの既定値（列はあってセルが空なら空文字）
+_MISSING_DEFAULTS = ("", "", "", "未設定", "", "")
+
+
+def column_index(header: List[str]) -> Dict[str, int]:
+    """ヘッダー行 -> 内部キーごとの列位置（0 始まり）。ない列は含まない"""
+    header = [str(h).strip() for h in header]
+    index = {}
+    for field, names in COLUMN_ALIASES.items():
+        for name in names:
+            if name in header:
+                index[field] = header.index(name)
+                break
+    return index
+
+
+def store_from_values(values: List[List[str]]) -> TaskStore:
+    """get_all_values の結果 -> TaskStore（順序キー順）。行ごとの dict は作らない"""
+    if not values:
+        return TaskStore()
+    index = column_index(values[0])
+    rows = values[1:]
+
+    def column(field: str, missing: str) -> List[str]:
+        c = index.get(field)
+        if c is None:
+            return [missing] * len(rows)
+        return [str(r[c]) if c < len(r) else "" for r in rows]
+
+    texts, dues, dones, tags, ids, orders = (column(f, d) for f, d in zip(_FIELDS, _MISSING_DEFAULTS))
+    store = TaskStore.from_columns(texts, dues, (v.lower() == "true" for v in dones), tags, ids, orders)
+    store.sort_by_order()
+    return store
+
+
+# ======= 範囲を指定した読み込み =======
+# get_all_values の代わりに、アプリの列（HEADERS にある列）だけを書式なしの値（UNFORMATTED_VALUE）で読む。
+# ヘッダーから列の位置を決めるのはシートごとに 1 回（row_values）。以降は読むたびに
+# ヘッダー行も同じ batch_get で受け取り、変わっていたら位置を決め直して読み直す。
+# 書式なしの値は型つき（真偽値・数値）で届くことがあるので、その行だけ文字列にそろえる
+# （手入力で日付になった締切日はシリアル値 -> YYYY-MM-DD）。
+_SERIAL_EPOCH = date(1899, 12, 30).toordinal()
+_DATE_FIELDS = ("due", "done_at")
+# シートごとに (ヘッダー, 読む列の並び（0 始まりの [開始, 終了) の組）)
+_LAYOUTS: Dict[Tuple[str, str], Tuple[List[str], List[Tuple[int, int]]]] = {}
+
+
+def _layout(header: List[str]) -> List[Tuple[int, int]]:
+    """ヘッダー -> 読む列（内部キーのある列。完了日を含む）を連続する区間にまとめたもの"""
+    index = column_index(header)
+    cols = sorted(index.values())
+    runs: List[Tuple[int, int]] = []
+    for c in cols:
+        if runs and runs[-1][1] == c:
+            runs[-1] = (runs[-1][0], c + 1)
+        else:
+            runs.append((c, c + 1))
+    return runs
+
+
+def _converters(header: List[str], width: int) -> List:
+    """列ごとの「文字列でない値 -> シートに書いた形の文字列」"""
+    index = column_index(header)
+    dates = {index[f] for f in _DATE_FIELDS if f in index}
+
+    def as_text(v) -> str:
+        if v is None:
+            return ""
+        if isinstance(v, bool):
+            return "TRUE" if v else "FALSE"
+        if isinstance(v, float) and v.is_integer():
+            return str(int(v))
+        return str(v)
+
+    def as_date(v) -> str:
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            return date.fromordinal(_SERIAL_EPOCH + int(v)).isoformat()
+        return as_text(v)
+
+    return [as_date if c in dates else as_text for c in range(width)]
+
+
+def read_values(ws, start: int = 0, count: Optional[int] = None) -> List[List[str]]:
+    """アプリの列だけを読む（get_all_values と同じ形: ヘッダー行 + 行。値は文字列）
+
+    start / count でデータ行の範囲（シート上の行の位置で 0 始まり。ヘッダーは含めない）を絞れる。
+    表示は順序キー順なので、この範囲は画面のページとは一致しない。
+    アプリの列の間にある他の列は空のまま返す（位置は get_all_values と同じ）。
+    """
+    key = cache_key(ws)
+    for _ in range(2):
+        layout = _LAYOUTS.get(key)
+        if layout is None:
+            header = [str(h) for h in ws.row_values(1)]
+            if not header:
+                return []
+            layout = _LAYOUTS[key] = (header, _layout(header))
+        header, runs = layout
+        if not runs:
+            return [header]
+        width = runs[-1][1]
+        first = start + 2
+        last = "" if count is None else str(first + count - 1)
+        ranges = [a1_range(1, 1, 1, width)] + [
+            f"{_col_letter(c1 + 1)}{first}:{_col_letter(c2)}{last}" for c1, c2 in runs
+        ]
+        got = ws.batch_get(ranges, value_render_option="UNFORMATTED_VALUE")
+        if [str(h) for h in (got[0][0] if got[0] else [])] == header[:width]:
+            break
+        _LAYOUTS.pop(key, None)  # ヘッダーが変わった（列の追加・移行）: 位置を決め直す
+    else:
+        raise RuntimeError(f"header of {ws.title} keeps changing")
+
+    conv = _converters(header, width)
+    if len(runs) == 1 and runs[0][0] == 0:
+        # よくある形（A 列から続けて並んでいる）: 受け取った行をそのまま使い、文字列でない値の
+        # ある行だけを作り直す（この app が書いた行は文字列のまま届く）
+        rows = got[1]
+        for i, r in enumerate(rows):
+            if not all(isinstance(v, str) for v in r):
+                rows[i] = [v if isinstance(v, str) else conv[c](v) for c, v in enumerate(r)]
+    else:
+        n = max((len(g) for g in got[1:]), default=0)
+        rows = [[""] * width for _ in range(n)]
+        for (c1, _), part in zip(runs, got[1:]):
+            for row, r in zip(rows, part):
+                for c, v in enumerate(r, c1):
+                    row[c] = v if v.__class__ is str else conv[c](v)
+    return [header[:width]] + rows
+
+
+# シートごとに (キャッシュの値, それから作った TaskStore)。値が同じオブジェクトの間は
+# 解析し直さず、コピーを返す（締切日の解析と索引づくりは取得 1 回につき 1 回だけ）
+_PARSED: Dict[Tuple[str, str], Tuple[List[List[str]], TaskStore]] = {}
+
+
+def load_data(ws, ttl: Optional[float] = None) -> TaskStore:
+    """シート -> TaskStore（順序キー順）。読み込みはプロセス共有キャッシュ経由（取り直しは read_values）
+
+    返す store は呼び出し側のもの（書き換えてよい）。
+    """
+    values = TASK_CACHE.get_values(ws, ttl=ttl, feed=SHEET_FEED, fetch=read_values)
+    if _needs_migration(values):
+        values = migrate_columns(ws, values)
+    key = cache_key(ws)
+    parsed = _PARSED.get(key)
+    if parsed is None or parsed[0] is not values:
+        # 前に解析した一覧からの変更が分かれば、それだけを当てる（解析し直さない）
+        deltas = None if parsed is None else TASK_CACHE.deltas_since(ws, parsed[0])
+        if deltas is None:
+            store = store_from_values(values)
+            store.due_index  # 索引もここで作っておき、コピーに含める
+            store.search_index
+        else:
+            store = parsed[1].copy()  # 他のスレッドがコピー中かもしれないので元は書き換えない
+            apply_deltas(store, deltas)
+        parsed = _PARSED[key] = (values, store)
+    return parsed[1].copy()
+
+
+def _rows_need_keys(values: List[List[str]]) -> bool:
+    return any(len(r) < ORDER_COLUMN or not r[ID_COLUMN - 1] or not r[ORDER_COLUMN - 1] for r in values[1:])
+
+
+def _needs_migration(values: List[List[str]]) -> bool:
+    if not values:
+        return False
+    if [str(h).strip() for h in values[0][:len(HEADERS)]] != HEADERS:
+        return True
+    return _rows_need_keys(values)
+
+
+def migrate_columns(ws, values: List[List[str]]) -> List[List[str]]:
+    """見出し行を HEADERS（完了日まで）にそろえ、ID・順序が空の行を埋める（旧シートの移行用）
+
+    書き込みは見出し行と、埋めた行の ID・順序の 2 列だけ（1 回の batch_update）。
+    """
+    fill = _rows_need_keys(values)
+    rows = [_fit(r, max(len(r), ORDER_COLUMN)) for r in values[1:]]
+    if fill:
+        for r in rows:
+            r[ID_COLUMN - 1] = r[ID_COLUMN - 1] or new_task_id()
+        if any(not r[ORDER_COLUMN - 1] for r in rows):
+            # 順序のある行はその順、ない行はシート上の並びのまま末尾へ置き、全体を振り直す
+            ordered = sorted(range(len(rows)), key=lambda i: (rows[i][ORDER_COLUMN - 1] == "", rows[i][ORDER_COLUMN - 1]))
+            for i, rank in zip(ordered, initial_ranks(len(rows))):
+                rows[i][ORDER_COLUMN - 1] = rank
+    data = [{"range": a1_range(1, 1, 1, len(HEADERS)), "values": [list(HEADERS)]}]
+    if fill and rows:
+        data.append({
+            "range": a1_range(2, ID_COLUMN, len(rows) + 1, ORDER_COLUMN),
+            "values": [r[ID_COLUMN - 1:ORDER_COLUMN] for r in rows],
+        })
+    try:
+        ws.batch_update(data)
+    finally:
+        note_write(ws)
+    return [list(HEADERS) + [str(h) for h in values[0][len(HEADERS):]]] + rows
+
+
+# ======= 変更フィード =======
+def _delta(op: str, task_id: str, fields: Optional[Dict] = None) -> Delta:
+    """ログに残す変更（完了は真偽値にそろえる）"""
+    fields = {
+        k: parse_done(v) if k == "done" and isinstance(v, str) else v
+        for k, v in (fields or {}).items()
+        if k != "id"
+    }
+    return Delta(op, task_id, fields or None)
+
+
+def patch_values(values: List[List[str]], deltas: List[Delta]) -> List[List[str]]:
+    """シートの値（ヘッダー行込み）に変更を当てた新しい一覧（変わらない行は元と共有する）"""
+    out: List[Optional[List[str]]] = list(values)
+    width = max(len(HEADERS), len(values[0]) if values else 0)
+    pos = {r[ID_COLUMN - 1]: i for i, r in enumerate(values) if i > 0 and len(r) >= ID_COLUMN}
+    dropped = False
+    for d in deltas:
+        i = pos.get(d.id)
+        if d.op == DEL:
+            if i is not None:
+                out[i] = None
+                del pos[d.id]
+                dropped = True
+        elif i is not None:
+            row = _fit(out[i], width)
+            for k, v in (d.fields or {}).items():
+                row[FIELD_COLUMNS[k] - 1] = _cell_value(k, v)
+            out[i] = row
+        elif d.op == ADD:
+            if not out:
+                out.append(list(HEADERS))
+            pos[d.id] = len(out)
+            out.append(_fit(task_to_row({**(d.fields or {}), "id": d.id}), width))
+        # SET で行がない: 他の画面で消された行なので何もしない
+    return [r for r in out if r is not None] if dropped else out
+
+
+def apply_deltas(store: TaskStore, deltas: List[Delta]) -> None:
+    """変更を store に当てる（その場で書き換える。削除は続く分をまとめて 1 回で）"""
+    gone: List[str] = []
+    reorder = False
+    for d in deltas:
+        if d.op == DEL:
+            gone.append(d.id)
+            continue
+        if gone:
+            store.remove(gone)
+            gone = []
+        fields = d.fields or {}
+        try:
+            store.set(store.index_of(d.id), fields)
+        except KeyError:
+            if d.op != ADD:
+                continue
+            store.append({**fields, "id": d.id})
+        reorder = reorder or d.op == ADD or "order" in fields
+    if gone:
+        store.remove(gone)
+    if reorder:
+        store.sort_by_order()
+
+
+class _SheetFeed:
+    """TASK_CACHE に渡す変更フィード（ログの読み出しと、シートの値への当て方）"""
+
+    @staticmethod
+    def read(ws) -> Optional[List[Delta]]:
+        return FEED.read(ws)
+
+    @staticmethod
+    def patch(values: List[List[str]], deltas: List[Delta]) -> List[List[str]]:
+        return patch_values(values, deltas)
+
+
+SHEET_FEED = _SheetFeed()
+
+
+def note_write(ws, deltas: Optional[List[Delta]] = None) -> None:
+    """書き込みのあとに呼ぶ: キャッシュに当てて、変更ログに残し、プロセス内に知らせる
+
+    deltas がなければ（全体の書き換え・途中で失敗した書き込み）キャッシュを捨て、ログには
+    reset を残す。ログへの記録に失敗しても書き込み自体は済んでいるので、キャッシュを捨てて
+    知らせるだけにする（他のプロセスはログで追えない変更として全行を取り直す。
+    同時に別の変更がログに残っていた場合の取りこぼしは FULL_RESYNC_SEC までに直る）。
+    """
+    if deltas is None or not TASK_CACHE.apply(ws, deltas, SHEET_FEED):
+        TASK_CACHE.invalidate(ws)
+    try:
+        FEED.record(ws, deltas)
+    except Exception:
+        TASK_CACHE.invalidate(ws)
+        FEED.publish(ws)
+
+
+# ======= 作業用シートからの入れ替え =======
+def _grid_range(sheet_id: int, rows: int) -> Dict:
+    return {"sheetId": sheet_id, "startRowIndex": 0, "endRowIndex": rows,
+            "startColumnIndex": 0, "endColumnIndex": len(HEADERS)}
+
+
+def swap_from_staging(ws, staging, rows: int) -> None:
+    """作業用シートの先頭 rows 行（ヘッダー込み）で本番シートを置き換え、作業用シートを消す
+
+    行数の変更・値の貼り付け・作業用シートの削除を 1 回の batchUpdate で送る。
+    batchUpdate は全部反映されるか何も起きないかのどちらかなので、途中の状態は見えない。
+    """
+    ws.spreadsheet.batch_update({"requests": [
+        {"updateSheetProperties": {
+            "properties": {"sheetId": ws.id, "gridProperties": {"rowCount": rows}},
+            "fields": "gridProperties.rowCount",
+        }},
+        {"copyPaste": {
+            "source": _grid_range(staging.id, rows),
+            "destination": _grid_range(ws.id, rows),
+            "pasteType": "PASTE_VALUES",
+        }},
+        {"deleteSheet": {"sheetId": staging.id}},
+    ]})
+
+
+# ======= 行単位の操作（ID 指定） =======
+def _field_cells(row: int, fields: Dict) -> List[Tuple[int, int, str]]:
+    """1 行分の fields -> [(行, 列, 値)]（列順）"""
+    return sorted((row, FIELD_COLUMNS[k], _cell_value(k, v)) for k, v in fields.items() if k != "id")
+
+
+def _cell_ranges(cells: List[Tuple[int, int, str]]) -> List[Tuple[str, List[List[Optional[str]]]]]:
+    """同じ行のセルは 1 つの範囲にまとめる
+
+    間の列は None（JSON の null）で埋める。Sheets API は null のセルを書かずに元の値を残すので、
+    完了と完了日（C と G）も C:G の 1 範囲で送れる（D〜F は変わらない）。
+    """
+    groups: List[List] = []
+    for row, col, value in cells:
+        if groups and groups[-1][0] == row:
+            groups[-1][3] += [None] * (col - groups[-1][2] - 1) + [value]
+            groups[-1][2] = col
+        else:
+            groups.append([row, col, col, [value]])
+    return [(a1_range(row, c1, row, c2), [vals]) for row, c1, c2, vals in groups]
+
+
+def row_runs(rows: List[int]) -> List[Tuple[int, int]]:
+    """降順の行番号を、続いた行ごとの (先頭, 末尾) にまとめる（降順のまま）"""
+    runs: List[Tuple[int, int]] = []
+    for r in rows:
+        if runs and runs[-1][0] == r + 1:
+            runs[-1] = (r, runs[-1][1])
+        else:
+            runs.append((r, r))
+    return runs
+
+
+def apply_mutations(
+    ws,
+    inserts: Optional[List[Dict]] = None,
+    updates: Optional[Dict[str, Dict]] = None,
+    deletes: Optional[List[str]] = None,
+) -> List[str]:
+    """追加・セル更新・削除をまとめて反映し、シート上に見つからなかった ID を返す
+
+    API 呼び出しは ID 列の読み 1 回 + 種類ごとに書き 1 回 + 変更ログへの追記 1 回（最大 5 回）で、
+    件数によらない。
+    """
+    inserts, updates, deletes = inserts or [], updates or {}, deletes or []
+    missing: List[str] = []
+    cells: List[Tuple[int, int, str]] = []
+    deltas: List[Delta] = []
+    try:
+        ids: List[str] = []
+        row_of: Dict[str, int] = {}
+        if updates or deletes:
+            ids = ws.col_values(ID_COLUMN)
+            row_of = {tid: i + 1 for i, tid in enumerate(ids) if i > 0}
+
+        for tid, fields in updates.items():
+            if tid not in row_of:
+                missing.append(tid)
+                continue
+            fields = stamp_done(fields)
+            cells += _field_cells(row_of[tid], fields)
+            deltas.append(_delta(SET, tid, fields))
+        write_ranges(ws, _cell_ranges(cells))
+
+        rows = sorted({row_of[t] for t in deletes if t in row_of}, reverse=True)
+        missing += [t for t in deletes if t not in row_of]
+        deltas += [_delta(DEL, t) for t in dict.fromkeys(deletes) if t in row_of]
+        if rows:
+            # 下の行から消せば、同じリクエスト内で行番号がずれない。続いた行は 1 つの範囲にまとめる
+            requests = [
+                {
+                    "deleteDimension": {
+                        "range": {"sheetId": ws.id, "dimension": "ROWS", "startIndex": start - 1, "endIndex": end}
+                    }
+                }
+                for start, end in row_runs(rows)
+            ]
+            ws.spreadsheet.batch_update({"requests": requests})
+
+        if inserts:
+            inserts = [stamp_done(t) for t in inserts]
+            ws.append_rows([task_to_row(t) for t in inserts], table_range="A1")
+            deltas += [_delta(ADD, t["id"], t) for t in inserts]
+    except Exception:
+        note_write(ws)
+        raise
+    # キャッシュには ID で当てるので、行の位置がずれていても全行を取り直さずに済む
+    if deltas:
+        note_write(ws, deltas)
+    return missing
+
+
+def rebalance_orders(ws, store: TaskStore, order: Optional[Sequence[int]] = None) -> None:
+    """順序キーを等間隔で振り直す（順序列を 1 回で書き込む）
+
+    order（行番号の並び）を渡すとその順に、省略すると今の順序キー順のまま振り直す。
+    store の行そのものは動かさないので、呼び出し側の行番号（view）はそのまま使える。
+    store にない行（他の画面で追加された直後など）は空にしておき、次回読み込み時に末尾へ回す。
+    """
+    if order is None:
+        order = sorted(range(len(store)), key=lambda i: (store.orders[i], store.ids[i]))
+    for i, rank in zip(order, initial_ranks(len(order))):
+        store.orders[i] = rank
+    by_id = dict(zip(store.ids, store.orders))
+    ids = ws.col_values(ID_COLUMN)
+    col = [[HEADERS[ORDER_COLUMN - 1]]] + [[by_id.get(i, "")] for i in ids[1:]]
+    try:
+        ws.update(range_name=a1_range(1, ORDER_COLUMN, len(col), ORDER_COLUMN), values=col)
+    finally:
+        note_write(ws)
+
+
+def plan_move(store: TaskStore, view: List[int], src: int, dest: int) -> Optional[str]:
+    """表示中の並び view（行番号のリスト）で src を dest へ移し、新しい順序キーを設定して返す
+
+    キーが長くなりすぎた・前後のキーが壊れている（同時操作）ときは None を返すので、
+    呼び出し側で rebalance_orders すること。
+    """
+    view.insert(dest, view.pop(src))
+    prev = store.orders[view[dest - 1]] if dest > 0 else None
+    nxt = store.orders[view[dest + 1]] if dest + 1 < len(view) else None
+    try:
+        rank = rank_between(prev, nxt)
+    except ValueError:
+        return None
+    if len(rank) > MAX_RANK_LEN:
+        return None
+    store.orders[view[dest]] = rank
+    return rank
+
+
+def build_task(store: TaskStore, task: Dict) -> Dict:
+    """ID と末尾の順序キーを振った新しいタスク（シートにはまだ書かない）"""
+    task = dict(task)
+    task["id"] = task.get("id") or new_task_id()
+    task["order"] = rank_between(store.orders[-1] if len(store) else None, None)
+    return task
@@ -0,0 +1,287 @@
+# todo_store
+"""列指向のタスク置き場（読み込んだ一覧の唯一の持ち主）
+
+タスク 1 件ごとに dict を作らず、列ごとの配列で持つ。
+- 締切日は読み込み時に 1 回だけ解析して日付の序数（date.toordinal）で保持（なしは 0）
+- 完了はビット列（1 件 1 ビット）
+- 属性は小さな整数に置き換え、名前の表は 1 つだけ持つ
+- 未完了タスクの締切日索引（todo_due.DueIndex）と検索索引（todo_search.SearchIndex）を持ち、
+  変更のたびに差分で更新する
+画面・並び替え・期限切れ判定・バックアップは行番号でこれを読む。
+"""
+
+from array import array
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from todo_due import DueIndex
+from todo_search import SearchIndex
+
+NO_DUE = 0
+BAD_DUE = -1  # 日付として読めない締切日（元の文字列は _bad_due に残す）
+
+TRUE_STRINGS = ("true", "1", "t", "y", "yes", "真", "完了")
+
+
+def parse_due(s: str) -> int:
+    s = (s or "").strip()
+    if not s:
+        return NO_DUE
+    try:
+        return date.fromisoformat(s[:10]).toordinal()
+    except ValueError:
+        return BAD_DUE
+
+
+def parse_done(s) -> bool:
+    return str(s).strip().lower() in TRUE_STRINGS
+
+
+class TaskStore:
+    __slots__ = ("ids", "texts", "due", "tags", "orders", "_done", "_tag_names", "_tag_codes", "_bad_due", "_pos", "_due_index", "_search")
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.due = array("i")
+        self.tags = array("H")
+        self.orders: List[str] = []
+        self._done = bytearray()
+        self._tag_names: List[str] = []
+        self._tag_codes: Dict[str, int] = {}
+        self._bad_due: Dict[str, str] = {}  # タスク ID -> 読めなかった締切日の文字列
+        self._pos: Optional[Dict[str, int]] = None
+        self._due_index: Optional[DueIndex] = None
+        self._search: Optional[SearchIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- 属性の表 ---
+    def tag_code(self, name: str) -> int:
+        code = self._tag_codes.get(name)
+        if code is None:
+            code = self._tag_codes[name] = len(self._tag_names)
+            self._tag_names.append(name)
+        return code
+
+    @property
+    def tag_names(self) -> List[str]:
+        return self._tag_names
+
+    # --- 完了ビット ---
+    def is_done(self, i: int) -> bool:
+        return bool(self._done[i >> 3] >> (i & 7) & 1)
+
+    def _set_done(self, i: int, value: bool) -> None:
+        if value:
+            self._done[i >> 3] |= 1 << (i & 7)
+        else:
+            self._done[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    # --- 読み取り ---
+    def tag_name(self, i: int) -> str:
+        return self._tag_names[self.tags[i]]
+
+    def due_str(self, i: int) -> str:
+        d = self.due[i]
+        if d > 0:
+            return date.fromordinal(d).isoformat()
+        if d == BAD_DUE:
+            return self._bad_due.get(self.ids[i], "")
+        return ""
+
+    @property
+    def due_index(self) -> DueIndex:
+        """締切日の索引（初回に 1 回だけ作り、以降は変更に合わせて差分で更新）"""
+        if self._due_index is None:
+            due, ids = self.due, self.ids
+            self._due_index = DueIndex(
+                (due[i], ids[i]) for i in range(len(ids)) if due[i] > 0 and not self.is_done(i)
+            )
+        return self._due_index
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """本文・属性・完了の検索索引（締切日の索引と同じく、初回に作って差分で更新）"""
+        if self._search is None:
+            index = SearchIndex()
+            for i, tid in enumerate(self.ids):
+                index.add(tid, self.texts[i], self.tags[i], self.is_done(i))
+            self._search = index
+        return self._search
+
+    def _unindex(self, i: int) -> None:
+        if self._due_index is not None and self.due[i] > 0 and not self.is_done(i):
+            self._due_index.discard(self.due[i], self.ids[i])
+        if self._search is not None:
+            self._search.discard(self.ids[i], self.texts[i], self.tags[i], self.is_done(i))
+
+    def _reindex(self, i: int) -> None:
+        if self._due_index is not None and self.due[i] > 0 and not self.is_done(i):
+            self._due_index.add(self.due[i], self.ids[i])
+        if self._search is not None:
+            self._search.add(self.ids[i], self.texts[i], self.tags[i], self.is_done(i))
+
+    def index_of(self, task_id: str) -> int:
+        if self._pos is None:
+            self._pos = {tid: i for i, tid in enumerate(self.ids)}
+        return self._pos[task_id]
+
+    def to_dict(self, i: int) -> Dict:
+        """1 件分の dict（編集フォームなど、必要なときだけ作る）"""
+        return {
+            "task": self.texts[i],
+            "due": self.due_str(i),
+            "done": self.is_done(i),
+            "tag": self.tag_name(i),
+            "id": self.ids[i],
+            "order": self.orders[i],
+        }
+
+    def sheet_row(self, i: int) -> List[str]:
+        return [
+            self.texts[i],
+            self.due_str(i),
+            str(self.is_done(i)),
+            self.tag_name(i),
+            self.ids[i],
+            self.orders[i],
+        ]
+
+    def sheet_rows(self, order: Optional[Iterable[int]] = None) -> Iterator[List[str]]:
+        for i in range(len(self)) if order is None else order:
+            yield self.sheet_row(i)
+
+    @classmethod
+    def from_columns(
+        cls,
+        texts: List[str],
+        dues: Iterable[str],
+        dones: Iterable[bool],
+        tags: Iterable[str],
+        ids: List[str],
+        orders: List[str],
+    ) -> "TaskStore":
+        """列ごとのリストからまとめて作る（シート読み込み用。並びは渡された順のまま）"""
+        store = cls()
+        store.ids = ids
+        store.texts = texts
+        store.orders = orders
+        # 締切日・属性は同じ値がくり返し出てくるので、値ごとに 1 回だけ変換する
+        parsed: Dict[str, int] = {}
+        due = store.due
+        for i, s in enumerate(dues):
+            d = parsed.get(s)
+            if d is None:
+                d = parsed[s] = parse_due(s)
+            due.append(d)
+            if d == BAD_DUE:
+                store._bad_due[ids[i]] = s
+        store.tags = array("H", map(store.tag_code, tags))
+        bits = store._done = bytearray((len(ids) + 7) >> 3)
+        for i, v in enumerate(dones):
+            if v:
+                bits[i >> 3] |= 1 << (i & 7)
+        return store
+
+    def copy(self) -> "TaskStore":
+        """列ごとの浅いコピー（読み込み済みの一覧をリランごとに作り直さずに使い回す）"""
+        other = TaskStore()
+        other.ids = list(self.ids)
+        other.texts = list(self.texts)
+        other.due = array("i", self.due)
+        other.tags = array("H", self.tags)
+        other.orders = list(self.orders)
+        other._done = bytearray(self._done)
+        other._tag_names = list(self._tag_names)
+        other._tag_codes = dict(self._tag_codes)
+        other._bad_due = dict(self._bad_due)
+        other._pos = None if self._pos is None else dict(self._pos)
+        other._due_index = None if self._due_index is None else self._due_index.copy()
+        other._search = None if self._search is None else self._search.copy()
+        return other
+
+    # --- 書き込み ---
+    def append(self, task: Dict) -> int:
+        return self.append_values(
+            str(task.get("task", "")),
+            str(task.get("due", "")),
+            bool(task.get("done", False)),
+            str(task.get("tag", "未設定")),
+            str(task.get("id", "")),
+            str(task.get("order", "")),
+        )
+
+    def append_values(self, text: str, due: str, done: bool, tag: str, task_id: str, order: str) -> int:
+        i = len(self.ids)
+        self.ids.append(task_id)
+        self.texts.append(text)
+        self.due.append(NO_DUE)
+        self.tags.append(self.tag_code(tag))
+        self.orders.append(order)
+        if i >> 3 >= len(self._done):
+            self._done.append(0)
+        if done:
+            self._set_done(i, True)
+        if due:
+            self._set_due(i, due)
+        if self._pos is not None:
+            self._pos[task_id] = i
+        self._reindex(i)
+        return i
+
+    def _set_due(self, i: int, s: str) -> None:
+        d = parse_due(s)
+        self.due[i] = d
+        if d == BAD_DUE:
+            self._bad_due[self.ids[i]] = s
+        else:
+            self._bad_due.pop(self.ids[i], None)
+
+    def set(self, i: int, fields: Dict) -> None:
+        """内部キー(task/due/done/tag/order)で 1 件を書き換える"""
+        indexed = not fields.keys() <= {"order"}
+        if indexed:
+            self._unindex(i)
+        for k, v in fields.items():
+            if k == "task":
+                self.texts[i] = str(v)
+            elif k == "due":
+                self._set_due(i, str(v))
+            elif k == "done":
+                self._set_done(i, bool(v))
+            elif k == "tag":
+                self.tags[i] = self.tag_code(str(v))
+            elif k == "order":
+                self.orders[i] = str(v)
+        if indexed:
+            self._reindex(i)
+
+    def permute(self, order: Sequence[int]) -> None:
+        """行を order（残す行番号の並び）どおりに並べ直す。含まれない行は消える"""
+        done = [self.is_done(i) for i in order]
+        self.ids = [self.ids[i] for i in order]
+        self.texts = [self.texts[i] for i in order]
+        self.due = array("i", (self.due[i] for i in order))
+        self.tags = array("H", (self.tags[i] for i in order))
+        self.orders = [self.orders[i] for i in order]
+        self._done = bytearray((len(order) + 7) >> 3)
+        for i, v in enumerate(done):
+            if v:
+                self._set_done(i, True)
+        kept = set(self.ids)
+        self._bad_due = {k: v for k, v in self._bad_due.items() if k in kept}
+        self._pos = None
+
+    def remove(self, task_ids: Iterable[str]) -> None:
+        drop = set(task_ids)
+        if drop:
+            for i, tid in enumerate(self.ids):
+                if tid in drop:
+                    self._unindex(i)
+            self.permute([i for i, tid in enumerate(self.ids) if tid not in drop])
+
+    def sort_by_order(self) -> None:
+        # 同時操作で同じキーになった場合は ID で順序を固定する
+        self.permute(sorted(range(len(self)), key=lambda i: (self.orders[i], self.ids[i])))
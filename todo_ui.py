@@ -0,0 +1,272 @@
+# todo_ui
+"""タスク一覧の描画
+
+表示中のページの行だけを widget にする。widget のキーはタスク ID なので、
+並べ替えやページ移動をしても状態が入れ替わらない。
+
+1 行ずつ st.fragment にしてあり、行の中の操作（完了・編集・保存）ではその行だけを
+再実行する（シートの読み込みや他の行の描画はしない）。変更は待ち行列に積むのと同時に
+画面用の store にも当てる。ただし、変えた項目が一覧の絞り込み・並びに効くとき
+（view_fields）と、削除・移動のように並び自体が変わるときは全体を再実行する。
+締切の集計バーは行の外なので、次に全体を再実行したときに更新される。
+
+複数選択モードでは行に選択チェックを出し、一括操作（完了・削除・属性の変更・締切日をずらす）は
+選んだ分を待ち行列にまとめて積む。次の送信で 1 回の apply_mutations（種類ごとに 1 リクエスト）になる。
+完了の変更は完了日も一緒に書くが、同じ行のセルは 1 範囲にまとめるので 1 行 1 範囲のまま。
+"""
+
+from datetime import date
+from typing import AbstractSet, Callable, Dict, List, Optional
+
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+from todo_store import TaskStore
+from todo_view import tag_choices
+
+# 行ごとの fragment を使うか（False なら行の操作でも全体を再実行する。比較用）
+ROW_FRAGMENTS = True
+FULL_RERUN_KEY = "row_full_rerun"
+BULK_MODE_KEY = "bulk_mode"
+SELECTED_KEY = "bulk_selected"  # 選んだタスク ID（ページをまたいで残す）
+BULK_SHIFT_MAX_DAYS = 3650  # 締切日を一度にずらせる日数（前後とも）
+
+
+def render_due_summary(store: TaskStore, today: int, upcoming: int = 3) -> None:
+    """締切の集計バー（締切日の索引から数えるので件数によらず一定の手間）"""
+    summary = store.due_index.summary(today)
+    m1, m2, m3, m4 = st.columns([0.2, 0.2, 0.2, 0.4])
+    m1.metric("⚠️ 期限切れ", summary["overdue"])
+    m2.metric("📌 今日締切", summary["today"])
+    m3.metric("🗓️ 今週", summary["week"])
+    with m4:
+        nxt = store.due_index.upcoming(today, upcoming)
+        if nxt:
+            st.caption("次の締切")
+            for d, tid in nxt:
+                st.caption(f"{date.fromordinal(d).isoformat()}｜{store.texts[store.index_of(tid)]}")
+
+
+def _update_row(store: TaskStore, i: int, queue, fields: Dict, view_fields: AbstractSet[str]) -> bool:
+    """1 行の変更を待ち行列に積み、画面用の store にも当てる。全体の再実行が要るなら True"""
+    queue.update(store.ids[i], fields)
+    store.set(i, fields)
+    return not view_fields.isdisjoint(fields)
+
+
+def _rerun_row(full: bool) -> None:
+    """行の fragment だけ（full なら全体）を再実行する"""
+    if not full:
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            pass  # 全体の実行中（AppTest など）は fragment だけの再実行はできない
+    st.rerun()
+
+
+def _toggle_done(store: TaskStore, i: int, queue, view_fields: AbstractSet[str]) -> None:
+    """完了チェックの変更を行列に積む（送るのはその行の「完了」と「完了日」を C:G の 1 範囲で。間の列は書かない）"""
+    full = _update_row(store, i, queue, {"done": st.session_state[f"chk{store.ids[i]}"]}, view_fields)
+    if full and ROW_FRAGMENTS:
+        # コールバックの中では再実行できないので、行の fragment に伝える
+        st.session_state[FULL_RERUN_KEY] = True
+
+
+# --- 複数選択 ---
+def _toggle_selected(tid: str) -> None:
+    selected = st.session_state.setdefault(SELECTED_KEY, set())
+    if st.session_state[f"sel{tid}"]:
+        selected.add(tid)
+    else:
+        selected.discard(tid)
+
+
+def _select(task_ids: List[str]) -> None:
+    st.session_state.setdefault(SELECTED_KEY, set()).update(task_ids)
+    for tid in task_ids:
+        st.session_state[f"sel{tid}"] = True
+
+
+def clear_selection() -> None:
+    for tid in st.session_state.pop(SELECTED_KEY, ()):
+        st.session_state.pop(f"sel{tid}", None)
+
+
+def _bulk(store: TaskStore, queue, action: str) -> None:
+    """選んだタスクへの一括操作を待ち行列にまとめて積む（画面は次の再実行で反映）"""
+    rows = {}
+    for tid in st.session_state.get(SELECTED_KEY, ()):
+        try:
+            rows[tid] = store.index_of(tid)
+        except KeyError:
+            pass  # 他の画面で削除済み
+    if action == "delete":
+        queue.delete_many(rows)
+        message = f"{len(rows)} 件を削除しました"
+    else:
+        if action == "done":
+            # 完了済みは送らない（完了日を付け直さない）
+            updates = {tid: {"done": True} for tid, i in rows.items() if not store.is_done(i)}
+            for tid in updates:
+                st.session_state.pop(f"chk{tid}", None)  # 完了チェックを store の値から作り直す
+            message = f"{len(updates)} 件を完了にしました"
+        elif action == "tag":
+            tag = st.session_state["bulk_tag"]
+            updates = {tid: {"tag": tag} for tid in rows}
+            message = f"{len(updates)} 件の属性を「{tag}」にしました"
+        else:
+            days = int(st.session_state["bulk_days"])
+            dated = [(tid, store.due[i] + days) for tid, i in rows.items() if store.due[i] > 0]
+            # date の範囲（1〜9999 年）を出る分は送らない
+            updates = {
+                tid: {"due": date.fromordinal(d).isoformat()}
+                for tid, d in dated
+                if 1 <= d <= date.max.toordinal()
+            }
+            message = f"{len(updates)} 件の締切日を {days:+d} 日ずらしました"
+            if len(dated) < len(rows):
+                message += f"（締切日のない {len(rows) - len(dated)} 件はそのまま）"
+            if len(updates) < len(dated):
+                message += f"（日付の範囲を超える {len(dated) - len(updates)} 件はそのまま）"
+        queue.update_many(updates)
+    st.session_state["edit_id"] = None
+    clear_selection()
+    st.toast(message)
+
+
+def render_bulk_bar(store: TaskStore, queue, page_ids: List[str]) -> None:
+    """複数選択モードの操作バー。page_ids は表示中のページのタスク ID"""
+    b1, b2, b3, b4, b5, b6 = st.columns([0.15, 0.15, 0.15, 0.15, 0.2, 0.2])
+    b1.button("☑️ ページ内を選択", key="bulk_select_page", on_click=_select, args=(page_ids,))
+    b2.button("選択を解除", key="bulk_clear", on_click=clear_selection)
+    b3.button("✅ 完了にする", key="bulk_done", on_click=_bulk, args=(store, queue, "done"))
+    b4.button("🗑️ 削除", key="bulk_delete", on_click=_bulk, args=(store, queue, "delete"))
+    with b5:
+        st.selectbox("属性", tag_choices(store), key="bulk_tag", label_visibility="collapsed")
+        st.button("🔖 属性を変更", key="bulk_retag", on_click=_bulk, args=(store, queue, "tag"))
+    with b6:
+        st.number_input(
+            "日数",
+            min_value=-BULK_SHIFT_MAX_DAYS,
+            max_value=BULK_SHIFT_MAX_DAYS,
+            value=1,
+            step=1,
+            key="bulk_days",
+            label_visibility="collapsed",
+        )
+        st.button("📅 締切日をずらす", key="bulk_shift", on_click=_bulk, args=(store, queue, "shift"))
+
+
+def render_task_row(
+    store: TaskStore,
+    i: int,
+    pos: int,
+    view: List[int],
+    queue,
+    on_move: Optional[Callable[[List[int], int, int], None]],
+    today: int,
+    view_fields: AbstractSet[str] = frozenset(),
+) -> None:
+    """1 行分（5 列）の描画。i は store 上の行番号、pos は view 上の位置、today は日付の序数"""
+    tid = store.ids[i]
+    edit_id = st.session_state.get("edit_id")
+    col1, col2, col3, col4, col5 = st.columns([0.4, 0.15, 0.15, 0.15, 0.15])
+
+    done = store.is_done(i)
+    due = store.due_str(i)
+    is_overdue = (not done) and 0 < store.due[i] < today
+    display_task = f"🔖 {store.tag_name(i)}｜{store.texts[i]}（締切: {due}）"
+    style = "color:red;" if is_overdue else ""
+
+    with col1:
+        if tid == edit_id:
+            tag = store.tag_name(i)
+            choices = tag_choices(store)
+            edited_task = st.text_input("タスク編集", value=store.texts[i], key=f"edit_task_{tid}")
+            _edit_due_init = date.fromordinal(store.due[i]) if store.due[i] > 0 else date.today()
+            edited_due = st.date_input("締切日編集", value=_edit_due_init, key=f"edit_due_{tid}")
+            edited_tag = st.selectbox(
+                "属性編集",
+                choices,
+                index=choices.index(tag) if tag in choices else 0,
+                key=f"edit_tag_{tid}",
+            )
+        else:
+            if st.session_state.get(BULK_MODE_KEY):
+                if tid in st.session_state.get(SELECTED_KEY, ()):
+                    # 他のページで選んで widget の状態が消えていても、選択を表示に戻す
+                    st.session_state.setdefault(f"sel{tid}", True)
+                st.checkbox(
+                    "選択",
+                    key=f"sel{tid}",
+                    on_change=_toggle_selected,
+                    args=(tid,),
+                )
+            st.markdown(f"<span style='{style}'>{display_task}</span>", unsafe_allow_html=True)
+            st.checkbox(
+                "完了",
+                value=done,
+                key=f"chk{tid}",
+                on_change=_toggle_done,
+                args=(store, i, queue, view_fields),
+            )
+
+    with col2:
+        if tid == edit_id:
+            if st.button("💾 保存", key=f"save{tid}"):
+                st.session_state["edit_id"] = None
+                fields = {"task": edited_task, "due": edited_due.isoformat(), "tag": edited_tag}
+                full = _update_row(store, i, queue, fields, view_fields)
+                _rerun_row(full)
+        else:
+            if st.button("✏️ 編集", key=f"edit{tid}"):
+                st.session_state["edit_id"] = tid
+                # 他の行が編集中なら、その行も戻すので全体を再実行
+                _rerun_row(edit_id is not None)
+
+    with col3:
+        if st.button("🗑️ 削除", key=f"del{tid}"):
+            st.session_state["edit_id"] = None
+            queue.delete(tid)
+            st.rerun()
+
+    # 表示上の並び替え中は順序キーを動かせないので、上下ボタンは出さない
+    if on_move is None:
+        return
+
+    with col4:
+        if st.button("⬆️ 上へ", key=f"up{tid}") and pos > 0:
+            on_move(view, pos, pos - 1)
+
+    with col5:
+        if st.button("⬇️ 下へ", key=f"down{tid}") and pos < len(view) - 1:
+            on_move(view, pos, pos + 1)
+
+
+def render_task_list(
+    store: TaskStore,
+    view: List[int],
+    rows: List[int],
+    start: int,
+    queue,
+    on_move: Optional[Callable[[List[int], int, int], None]] = None,
+    view_fields: AbstractSet[str] = frozenset(),
+) -> None:
+    """view（絞り込み・並び替え済みの行番号）のうち、表示ページの rows だけを描画する
+
+    view_fields は一覧の絞り込み・並びに効いている項目（task/due/done/tag）。
+    """
+    if "edit_id" not in st.session_state:
+        st.session_state["edit_id"] = None
+    today = date.today().toordinal()
+    row = _task_row if ROW_FRAGMENTS else render_task_row
+    for offset, i in enumerate(rows):
+        row(store, i, start + offset, view, queue, on_move, today, view_fields)
+
+
+@st.fragment
+def _task_row(*args) -> None:
+    """1 行ぶんの fragment（行の中の操作ではここだけを再実行する）"""
+    if st.session_state.pop(FULL_RERUN_KEY, False):
+        st.rerun()
+    render_task_row(*args)
@@ -0,0 +1,108 @@
+# todo_view
+"""一覧の表示条件（絞り込み -> 並び替え -> ページ分け）
+
+Streamlit に依存しない純粋な関数だけを置く。ページ分けは最後に行うので、
+絞り込みや並び替えの結果はページをまたいで一貫する。
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from todo_search import normalize, query_terms
+from todo_store import TaskStore
+
+# 表示上の並び（シートの順序キーは変えない）
+SORT_MANUAL = "手動（順序）"
+SORT_DUE = "締切日"
+SORT_OPTIONS = [SORT_MANUAL, SORT_DUE]
+
+PAGE_SIZES = [20, 50, 100]
+
+# 追加・編集・絞り込みで最初から選べる属性（データにある属性はこの後ろに足す）
+DEFAULT_TAGS = ["仕事", "プライベート", "その他"]
+
+
+def tag_choices(store: TaskStore) -> List[str]:
+    """選べる属性（既定の属性 + 一覧に 1 件以上ある属性）"""
+    names = store.tag_names
+    present = sorted(names[c] for c in store.search_index.tag_counts())
+    return DEFAULT_TAGS + [t for t in present if t not in DEFAULT_TAGS]
+
+
+def filter_tasks(
+    store: TaskStore,
+    hide_done: bool = False,
+    tags: Optional[Iterable[str]] = None,
+    query: str = "",
+    due_from: Optional[int] = None,
+    due_to: Optional[int] = None,
+) -> List[int]:
+    """条件に合う行番号のリスト（順序キー順）
+
+    query は空白区切りの語（すべてを含むもの）、due_from / due_to は日付の序数（両端を含む。
+    締切日なしは範囲に入らない）。本文と属性は検索索引で候補を絞ってから行を確かめる。
+    """
+    terms = query_terms(query)
+    due_range = due_from is not None or due_to is not None
+    if not hide_done and not tags and not terms and not due_range:
+        return list(range(len(store)))
+    index = store.search_index
+    ids = index.candidates(terms)
+    if tags:
+        # 属性は番号で引く（名前の表にない属性は 1 件もない）
+        codes = [store.tag_names.index(t) for t in set(tags) if t in store.tag_names]
+        tagged = index.tagged(codes)
+        ids = tagged if ids is None else ids & tagged
+    rows: Iterable[int] = range(len(store)) if ids is None else sorted(map(store.index_of, ids))
+    lo = due_from if due_from is not None else 1
+    hi = due_to if due_to is not None else date.max.toordinal()
+    due, texts = store.due, store.texts
+    return [
+        i for i in rows
+        if not (hide_done and store.is_done(i))
+        and (not due_range or lo <= due[i] <= hi)
+        and (not terms or all(t in normalize(texts[i]) for t in terms))
+    ]
+
+
+def tag_facets(
+    store: TaskStore,
+    hide_done: bool = False,
+    query: str = "",
+    due_from: Optional[int] = None,
+    due_to: Optional[int] = None,
+) -> Dict[str, int]:
+    """属性ごとの件数（属性以外の条件で絞り込んだうえで）
+
+    本文・締切日の条件がなければ索引の集合の大きさだけで数えるので、件数によらずほぼ一定。
+    """
+    index = store.search_index
+    if query_terms(query) or due_from is not None or due_to is not None:
+        rows = filter_tasks(store, hide_done=hide_done, query=query, due_from=due_from, due_to=due_to)
+        counts = index.tag_counts(within={store.ids[i] for i in rows})
+    else:
+        counts = index.tag_counts(hide_done=hide_done)
+    names = store.tag_names
+    return {names[c]: n for c, n in counts.items()}
+
+
+def sort_tasks(store: TaskStore, view: List[int], sort_by: str = SORT_MANUAL) -> List[int]:
+    """store は順序キー順で読み込まれているので、手動のときは何もしない
+
+    締切日順では日付の序数で比べ、締切日なし・読めない締切日は末尾に回す。
+    """
+    if sort_by == SORT_DUE:
+        due = store.due
+        return sorted(view, key=lambda i: (due[i] <= 0, due[i]))
+    return view
+
+
+def page_count(total: int, page_size: int) -> int:
+    return max(1, -(-total // page_size))
+
+
+def page_slice(view: List[int], page: int, page_size: int) -> Tuple[List[int], int]:
+    """page（1 始まり）の行と、その先頭の view 上の位置を返す"""
+    page = min(max(1, page), page_count(len(view), page_size))
+    start = (page - 1) * page_size
+    return view[start:start + page_size], start